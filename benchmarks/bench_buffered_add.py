@@ -0,0 +1,84 @@
+"""Per-call overhead of EventStore.add_event with and without buffering.
+
+Each thread traces its own system instance, allocating a partition and adding
+a closed event per step, against a store that locks on every call and against
+one with per-thread buffering enabled. Buffered events are flushed inside the
+timed region, so both modes pay for getting every event into the store.
+
+Usage:
+    python benchmarks/bench_buffered_add.py [--threads 1 8 64] [--steps 2000]
+"""
+
+import argparse
+import threading
+import time
+
+from synth_sdk.tracing.abstractions import Event
+from synth_sdk.tracing.events.store import EventStore
+
+
+def run(store: EventStore, threads: int, steps: int) -> float:
+    """Return the wall time for all threads to record their steps."""
+    barrier = threading.Barrier(threads + 1)
+
+    def agent(number: int) -> None:
+        system_instance_id = f"instance-{number}"
+        barrier.wait()
+        for _ in range(steps):
+            partition_index = store.increment_partition(
+                "bench", "bench-id", system_instance_id
+            )
+            store.add_event(
+                "bench",
+                "bench-id",
+                system_instance_id,
+                Event(
+                    system_instance_id=system_instance_id,
+                    event_type="step",
+                    opened=0.0,
+                    closed=1.0,
+                    partition_index=partition_index,
+                    agent_compute_step=None,
+                    environment_compute_steps=[],
+                ),
+            )
+
+    workers = [threading.Thread(target=agent, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    store.flush_buffers()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for threads in args.threads:
+        calls = threads * args.steps
+        for label, buffering in (("locked", False), ("buffered", True)):
+
+            def make_store() -> EventStore:
+                store = EventStore()
+                if buffering:
+                    store.enable_buffering()
+                return store
+
+            elapsed = min(
+                run(make_store(), threads, args.steps) for _ in range(args.repeat)
+            )
+            print(
+                f"{threads:>3} threads {label:>9}: "
+                f"{elapsed / calls * 1e6:.2f} us/step, {calls / elapsed:,.0f} steps/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Per-call overhead of trace_event_sync/trace_event_async on a no-op method.
+
+Times a no-op method undecorated and decorated, for the sync and the async
+decorator, and reports the difference as the decorator's overhead. Each
+traced call creates, closes and stores an event; the store is drained
+between repeats so it does not grow across them.
+
+Run it on two revisions (e.g. before and after a decorator change, with
+git stash or a checkout of the parent commit) to compare them.
+
+Usage:
+    python benchmarks/bench_decorator_overhead.py [--calls 20000]
+"""
+
+import argparse
+import asyncio
+import time
+
+from synth_sdk.tracing.decorators import trace_event_async, trace_event_sync
+from synth_sdk.tracing.events.store import event_store
+
+
+class Agent:
+    def __init__(self):
+        self.system_name = "bench"
+        self.system_instance_id = "bench-instance"
+
+    def noop(self):
+        return None
+
+    @trace_event_sync(event_type="noop")
+    def traced_noop(self):
+        return None
+
+    async def anoop(self):
+        return None
+
+    @trace_event_async(event_type="anoop")
+    async def traced_anoop(self):
+        return None
+
+
+def time_sync(method, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        method()
+    return time.perf_counter() - start
+
+
+def time_async(method, calls: int) -> float:
+    async def run() -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            await method()
+        return time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def best_of(repeat: int, timer, method, calls: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        best = min(best, timer(method, calls))
+        event_store.drain()
+    return best / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    agent = Agent()
+    for label, timer, raw, traced in (
+        ("sync", time_sync, agent.noop, agent.traced_noop),
+        ("async", time_async, agent.anoop, agent.traced_anoop),
+    ):
+        raw_time = best_of(args.repeat, timer, raw, args.calls)
+        traced_time = best_of(args.repeat, timer, traced, args.calls)
+        print(
+            f"{label:>5}: raw {raw_time * 1e6:.2f} us/call, "
+            f"decorated {traced_time * 1e6:.2f} us/call, "
+            f"overhead {(traced_time - raw_time) * 1e6:.2f} us/call"
+        )
+
+
+if __name__ == "__main__":
+    main()
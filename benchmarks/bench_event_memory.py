@@ -0,0 +1,191 @@
+"""Memory benchmark for trace objects and tracker records.
+
+Compares the slotted Event, compute step and input/output dataclasses with
+the dict-backed dataclasses they replaced, reimplemented inline below, and
+the tuple-backed tracker records with the dicts they replaced. Bytes are
+measured with tracemalloc while building --events objects, so they include
+the message payloads each event references; the difference between the two
+layouts is the per-instance __dict__ overhead.
+
+Usage:
+    python benchmarks/bench_event_memory.py [--events 100000]
+"""
+
+import argparse
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from synth_sdk.tracing import abstractions
+from synth_sdk.tracing.trackers import LMInputRecord, StateRecord
+
+
+@dataclass
+class DictMessageInputs:
+    messages: List[Dict[str, str]]
+
+
+@dataclass
+class DictArbitraryInputs:
+    inputs: Dict[str, Any]
+
+
+@dataclass
+class DictMessageOutputs:
+    messages: List[Dict[str, str]]
+
+
+@dataclass
+class DictArbitraryOutputs:
+    outputs: Dict[str, Any]
+
+
+@dataclass
+class DictComputeStep:
+    event_order: int
+    compute_ended: float
+    compute_began: float
+    compute_input: List[Any]
+    compute_output: List[Any]
+
+
+@dataclass
+class DictAgentComputeStep(DictComputeStep):
+    model_name: Optional[str] = None
+    model_params: Optional[Dict[str, Any]] = None
+    should_learn: Optional[bool] = None
+
+
+@dataclass
+class DictEnvironmentComputeStep(DictComputeStep):
+    pass
+
+
+@dataclass
+class DictEvent:
+    system_instance_id: str
+    event_type: str
+    opened: float
+    closed: Optional[float]
+    partition_index: int
+    agent_compute_step: DictAgentComputeStep
+    environment_compute_steps: List[DictEnvironmentComputeStep]
+    system_name: Optional[str] = None
+    system_id: Optional[str] = None
+
+
+DICT_TYPES = dict(
+    Event=DictEvent,
+    AgentComputeStep=DictAgentComputeStep,
+    EnvironmentComputeStep=DictEnvironmentComputeStep,
+    MessageInputs=DictMessageInputs,
+    MessageOutputs=DictMessageOutputs,
+    ArbitraryInputs=DictArbitraryInputs,
+    ArbitraryOutputs=DictArbitraryOutputs,
+)
+SLOTTED_TYPES = {name: getattr(abstractions, name) for name in DICT_TYPES}
+
+
+def make_event(types: Dict[str, type], number: int):
+    """One agent step with a short conversation and one environment step."""
+    now = float(number)
+    return types["Event"](
+        system_instance_id="instance",
+        event_type="step",
+        opened=now,
+        closed=now + 1,
+        partition_index=number,
+        agent_compute_step=types["AgentComputeStep"](
+            event_order=1,
+            compute_began=now,
+            compute_ended=now + 0.5,
+            compute_input=[
+                types["MessageInputs"](
+                    messages=[
+                        {"role": "system", "content": "You are an agent."},
+                        {"role": "user", "content": f"step {number}"},
+                    ]
+                )
+            ],
+            compute_output=[
+                types["MessageOutputs"](
+                    messages=[{"role": "assistant", "content": "move left"}]
+                )
+            ],
+            model_name="gpt-4o-mini",
+        ),
+        environment_compute_steps=[
+            types["EnvironmentComputeStep"](
+                event_order=2,
+                compute_began=now + 0.5,
+                compute_ended=now + 1,
+                compute_input=[types["ArbitraryInputs"](inputs={"action": "left"})],
+                compute_output=[types["ArbitraryOutputs"](outputs={"reward": 0.0})],
+            )
+        ],
+    )
+
+
+def make_dict_record(number: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "origin": "agent",
+            "messages": None,
+            "model_name": "gpt-4o-mini",
+            "model_params": None,
+            "finetune": False,
+        },
+        {
+            "origin": "environment",
+            "variable_name": "reward",
+            "variable_value": number,
+            "annotation": None,
+        },
+    ]
+
+
+def make_tuple_record(number: int) -> List[tuple]:
+    return [
+        LMInputRecord("agent", None, "gpt-4o-mini", None, False),
+        StateRecord("environment", "reward", number, None),
+    ]
+
+
+def bytes_per_object(make: Callable[[int], Any], count: int) -> float:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [make(number) for number in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = [
+        (
+            "events",
+            bytes_per_object(lambda n: make_event(DICT_TYPES, n), args.events),
+            bytes_per_object(lambda n: make_event(SLOTTED_TYPES, n), args.events),
+        ),
+        (
+            "input+state records",
+            bytes_per_object(make_dict_record, args.events),
+            bytes_per_object(make_tuple_record, args.events),
+        ),
+    ]
+    for label, before, after in rows:
+        print(
+            f"{label:>19}: {before:,.0f} -> {after:,.0f} bytes each "
+            f"({before - after:,.0f} saved, {after / before:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Partition lookup benchmark with 10k partitions per trace.
+
+Compares the linear scan EventStore.add_event used to run over
+SystemTrace.partition with the partition index map behind
+SystemTrace.get_partition, and times add_event itself on a store whose trace
+already holds that many partitions.
+
+Usage:
+    python benchmarks/bench_partition_lookup.py [--partitions 10000]
+"""
+
+import argparse
+import random
+import time
+
+from synth_sdk.tracing.abstractions import Event, EventPartitionElement, SystemTrace
+from synth_sdk.tracing.events.store import EventStore
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--partitions", type=int, default=10_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    trace = SystemTrace(
+        system_name="bench",
+        system_id="bench-id",
+        system_instance_id="instance",
+        metadata={},
+        partition=[
+            EventPartitionElement(partition_index=i, events=[])
+            for i in range(1, args.partitions + 1)
+        ],
+        current_partition_index=args.partitions,
+    )
+    targets = [random.randint(1, args.partitions) for _ in range(args.lookups)]
+
+    def scan() -> None:
+        for index in targets:
+            next(p for p in trace.partition if p.partition_index == index)
+
+    def mapped() -> None:
+        for index in targets:
+            trace.get_partition(index)
+
+    for label, fn in (("linear scan", scan), ("index map", mapped)):
+        elapsed = best_of(args.repeat, fn)
+        print(f"{label:>12}: {elapsed / args.lookups * 1e6:.3f} us/lookup")
+
+    store = EventStore()
+    for _ in range(args.partitions):
+        store.increment_partition("bench", "bench-id", "instance")
+    events = [
+        Event(
+            system_instance_id="instance",
+            event_type="step",
+            opened=0.0,
+            closed=1.0,
+            partition_index=index,
+            agent_compute_step=None,
+            environment_compute_steps=[],
+        )
+        for index in targets
+    ]
+
+    def add_events() -> None:
+        for event in events:
+            store.add_event("bench", "bench-id", "instance", event)
+
+    elapsed = best_of(1, add_events)
+    print(
+        f"   add_event: {elapsed / len(events) * 1e6:.3f} us/event "
+        f"with {args.partitions} partitions"
+    )
+
+
+if __name__ == "__main__":
+    main()
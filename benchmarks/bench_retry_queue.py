@@ -0,0 +1,133 @@
+"""Retry queue benchmark with 100k queued failures.
+
+Compares the heap-backed RetryQueue with the deque it replaced, reimplemented
+inline below: duplicates were found by scanning the whole queue, and a pass
+took events from the front until the first one still backing off.
+
+With --queued failures already queued, reports the cost of queuing new
+failures and re-queuing ones already queued, and what one retry pass takes
+when the oldest failure is backing off while the rest are due.
+
+Usage:
+    python benchmarks/bench_retry_queue.py [--queued 100000] [--adds 1000]
+"""
+
+import argparse
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from synth_sdk.tracing.abstractions import Event
+from synth_sdk.tracing.config import TracingConfig
+from synth_sdk.tracing.retry_queue import QueuedEvent, RetryQueue, _event_key
+
+
+class DequeRetryQueue:
+    """The previous list-scanning retry queue, without its worker."""
+
+    def __init__(self, config: TracingConfig):
+        self.config = config
+        self.queue: deque = deque()
+
+    def add_failed_event(self, event: Event, system_info: Dict[str, str]) -> None:
+        for queued in self.queue:
+            if (
+                queued.event.system_instance_id == event.system_instance_id
+                and queued.event.event_type == event.event_type
+                and queued.event.opened == event.opened
+            ):
+                return
+        self.queue.append(
+            QueuedEvent(event=event, system_info=system_info, last_attempt=time.time())
+        )
+
+    def get_retryable_events(
+        self, max_events: Optional[int] = None
+    ) -> List[QueuedEvent]:
+        now = time.time()
+        retryable = []
+        for _ in range(len(self.queue)):
+            if max_events and len(retryable) >= max_events:
+                break
+            event = self.queue[0]
+            backoff = self.config.retry_backoff**event.attempt_count
+            if now - event.last_attempt >= backoff:
+                retryable.append(self.queue.popleft())
+            else:
+                break
+        return retryable
+
+
+def make_events(count: int, offset: int = 0) -> List[Event]:
+    return [
+        Event(
+            system_instance_id=f"instance-{n % 1000}",
+            event_type="step",
+            opened=float(n),
+            closed=float(n) + 1,
+            partition_index=n,
+            agent_compute_step=None,
+            environment_compute_steps=[],
+        )
+        for n in range(offset, offset + count)
+    ]
+
+
+def fill(queue, events: List[Event]) -> None:
+    """Queue events as failures, all due except the oldest one."""
+    past = time.time() - 60
+    queued = [
+        QueuedEvent(event=event, system_info={}, last_attempt=past) for event in events
+    ]
+    # The oldest failure has failed often and is backing off for a while
+    queued[0].attempt_count = 30
+    queued[0].last_attempt = time.time()
+    if isinstance(queue, DequeRetryQueue):
+        queue.queue.extend(queued)
+    else:
+        with queue._lock:
+            for item in queued:
+                queue._keys.add(_event_key(item.event))
+                queue._push(item)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queued", type=int, default=100_000)
+    parser.add_argument("--adds", type=int, default=1_000)
+    args = parser.parse_args()
+
+    config = TracingConfig(api_key="", max_retries=3)
+    events = make_events(args.queued)
+    new_events = make_events(args.adds, offset=args.queued)
+
+    for label, make_queue in (("deque", DequeRetryQueue), ("heap", RetryQueue)):
+        queue = make_queue(config)
+        # Keep the background worker from retrying while timing
+        queue.start_worker = lambda: None
+        fill(queue, events)
+
+        start = time.perf_counter()
+        for event in new_events:
+            queue.add_failed_event(event, {})
+        add_time = (time.perf_counter() - start) / args.adds
+
+        start = time.perf_counter()
+        for event in events[-args.adds :]:
+            queue.add_failed_event(event, {})
+        duplicate_time = (time.perf_counter() - start) / args.adds
+
+        start = time.perf_counter()
+        taken = queue.get_retryable_events()
+        take_time = time.perf_counter() - start
+
+        print(
+            f"{label:>5}: add {add_time * 1e6:,.1f} us, "
+            f"duplicate add {duplicate_time * 1e6:,.1f} us, "
+            f"pass took {len(taken):,} of {args.queued + args.adds:,} "
+            f"in {take_time * 1e3:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Upload serialization throughput per TraceSerializer backend.
+
+Encodes a synthetic trace of agent steps with a growing conversation, the
+shape the upload path sends, and reports MB/s of JSON output for every
+installed backend against the previous to_dict() + json.dumps path.
+
+Usage:
+    python benchmarks/bench_serializer.py [--events 2000] [--messages 20]
+"""
+
+import argparse
+import json
+import time
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryOutputs,
+    Event,
+    EventPartitionElement,
+    MessageInputs,
+    MessageOutputs,
+    SystemTrace,
+)
+from synth_sdk.tracing.serialization import BACKENDS, TraceSerializer
+
+
+def build_trace(events: int, messages: int) -> SystemTrace:
+    history = [
+        {"role": "user" if n % 2 else "assistant", "content": f"message {n} " * 20}
+        for n in range(messages)
+    ]
+    partitions = []
+    for index in range(1, events + 1):
+        step = AgentComputeStep(
+            event_order=index,
+            compute_began=float(index),
+            compute_ended=float(index) + 0.5,
+            compute_input=[MessageInputs(messages=history)],
+            compute_output=[
+                MessageOutputs(messages=[{"role": "assistant", "content": "ok"}]),
+                ArbitraryOutputs(outputs={"reward": 1.0, "done": False}),
+            ],
+            model_name="gpt-4o-mini",
+        )
+        event = Event(
+            system_instance_id="instance",
+            event_type="step",
+            opened=float(index),
+            closed=float(index) + 1,
+            partition_index=index,
+            agent_compute_step=step,
+            environment_compute_steps=[],
+        )
+        partitions.append(EventPartitionElement(partition_index=index, events=[event]))
+    return SystemTrace(
+        system_name="bench",
+        system_id="bench-id",
+        system_instance_id="instance",
+        metadata={},
+        partition=partitions,
+        current_partition_index=events,
+    )
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    trace = build_trace(args.events, args.messages)
+    payload = {"traces": [trace]}
+
+    def baseline() -> bytes:
+        return json.dumps({"traces": [trace.to_dict()]}).encode("utf-8")
+
+    runs = [("to_dict+json", baseline)]
+    for backend in BACKENDS:
+        try:
+            serializer = TraceSerializer(backend)
+        except ValueError:
+            print(f"{backend:>12}: not installed")
+            continue
+        runs.append((backend, lambda serializer=serializer: serializer.dumps(payload)))
+
+    for label, fn in runs:
+        size = len(fn())
+        elapsed = best_of(args.repeat, fn)
+        print(
+            f"{label:>12}: {size / elapsed / 1e6:8.1f} MB/s "
+            f"({elapsed * 1e3:.1f} ms for {size / 1e6:.1f} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Contention benchmark for the sharded EventStore.
+
+Runs 64 threads, each tracing its own system instance, against the original
+global-lock store, reimplemented inline below (one RLock around every trace,
+partitions found by scanning the trace), and against the default sharded
+store. Every step allocates a partition and adds a closed event, as the
+tracing decorators do.
+
+Usage:
+    python benchmarks/bench_store_contention.py [--threads 64] [--steps 2000]
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    Event,
+    EventPartitionElement,
+)
+from synth_sdk.tracing.events.store import DEFAULT_NUM_SHARDS, EventStore
+
+
+class _BaselineTrace:
+    __slots__ = ("current_partition_index", "partition")
+
+    def __init__(self):
+        self.current_partition_index = 0
+        self.partition: List[EventPartitionElement] = []
+
+
+class GlobalLockEventStore:
+    """The previous EventStore write path: one lock for every system instance."""
+
+    def __init__(self):
+        self._traces: Dict[str, _BaselineTrace] = {}
+        self._lock = threading.RLock()
+
+    def get_or_create_system_trace(self, system_instance_id: str) -> _BaselineTrace:
+        with self._lock:
+            if system_instance_id not in self._traces:
+                self._traces[system_instance_id] = _BaselineTrace()
+            return self._traces[system_instance_id]
+
+    def increment_partition(
+        self, system_name: str, system_id: str, system_instance_id: str
+    ) -> int:
+        with self._lock:
+            trace = self.get_or_create_system_trace(system_instance_id)
+            trace.current_partition_index += 1
+            trace.partition.append(
+                EventPartitionElement(
+                    partition_index=trace.current_partition_index, events=[]
+                )
+            )
+            return trace.current_partition_index
+
+    def add_event(
+        self, system_name: str, system_id: str, system_instance_id: str, event: Event
+    ) -> None:
+        if not self._lock.acquire(timeout=5):
+            return
+        try:
+            trace = self.get_or_create_system_trace(system_instance_id)
+            partition = next(
+                (
+                    p
+                    for p in trace.partition
+                    if p.partition_index == event.partition_index
+                ),
+                None,
+            )
+            if partition is None:
+                raise ValueError(
+                    f"No partition found for index {event.partition_index}"
+                )
+            partition.events.append(event)
+        finally:
+            self._lock.release()
+
+
+def run(store, threads: int, steps: int) -> float:
+    """Return the wall time for all threads to record their steps."""
+    barrier = threading.Barrier(threads + 1)
+
+    def agent(number: int) -> None:
+        system_instance_id = f"instance-{number}"
+        barrier.wait()
+        for step in range(steps):
+            partition_index = store.increment_partition(
+                "bench", "bench-id", system_instance_id
+            )
+            now = time.time()
+            store.add_event(
+                "bench",
+                "bench-id",
+                system_instance_id,
+                Event(
+                    system_instance_id=system_instance_id,
+                    event_type="step",
+                    opened=now,
+                    closed=now,
+                    partition_index=partition_index,
+                    agent_compute_step=AgentComputeStep(
+                        event_order=step,
+                        compute_began=now,
+                        compute_ended=now,
+                        compute_input=[],
+                        compute_output=[],
+                    ),
+                    environment_compute_steps=[],
+                ),
+            )
+
+    workers = [threading.Thread(target=agent, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    calls = args.threads * args.steps
+    for label, make_store in (
+        ("global lock", GlobalLockEventStore),
+        (f"{DEFAULT_NUM_SHARDS} shards", EventStore),
+    ):
+        elapsed = min(
+            run(make_store(), args.threads, args.steps) for _ in range(args.repeat)
+        )
+        print(
+            f"{label:>12}: {elapsed:.2f} s, {calls / elapsed:,.0f} steps/s, "
+            f"{elapsed / calls * 1e6:.2f} us/step over {args.threads} threads"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Encode time and payload size of the msgpack wire format against JSON.
+
+Builds the two payloads the clients send, one streamed event (as
+ImmediateLogClient sends it) and an upload of a whole trace, from agent
+steps with a conversation of up to --messages messages and environment
+steps. Each payload is
+encoded with BaseLogClient._encode_payload under wire_format="msgpack"
+("SYNT" header + positional msgpack) and with json.dumps of its to_dict()
+form, the encoding used before the binary format.
+
+Usage:
+    python benchmarks/bench_wire_format.py [--events 500] [--messages 20]
+"""
+
+import argparse
+import json
+import time
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    EnvironmentComputeStep,
+    Event,
+    EventPartitionElement,
+    MessageInputs,
+    MessageOutputs,
+    SystemTrace,
+)
+from synth_sdk.tracing.config import TracingConfig
+from synth_sdk.tracing.log_client_base import BaseLogClient
+
+
+def build_events(events: int, messages: int) -> list:
+    history = [{"role": "system", "content": "You are an agent playing a game."}]
+    built = []
+    for index in range(1, events + 1):
+        history.append({"role": "user", "content": f"observation {index} " * 10})
+        if len(history) > messages:
+            del history[1:3]
+        began = 1_700_000_000.0 + index
+        built.append(
+            Event(
+                system_instance_id="instance",
+                event_type="step",
+                opened=began,
+                closed=began + 1,
+                partition_index=index,
+                agent_compute_step=AgentComputeStep(
+                    event_order=1,
+                    compute_began=began,
+                    compute_ended=began + 0.5,
+                    compute_input=[MessageInputs(messages=list(history))],
+                    compute_output=[
+                        MessageOutputs(
+                            messages=[{"role": "assistant", "content": "move left"}]
+                        ),
+                        ArbitraryOutputs(
+                            outputs={
+                                "usage": {
+                                    "prompt_tokens": 40 * len(history),
+                                    "completion_tokens": 3,
+                                }
+                            }
+                        ),
+                    ],
+                    model_name="gpt-4o-mini",
+                    model_params={"temperature": 0.0},
+                ),
+                environment_compute_steps=[
+                    EnvironmentComputeStep(
+                        event_order=2,
+                        compute_began=began + 0.5,
+                        compute_ended=began + 1,
+                        compute_input=[ArbitraryInputs(inputs={"action": "left"})],
+                        compute_output=[
+                            ArbitraryOutputs(
+                                outputs={"reward": 0.0, "done": False, "x": index}
+                            )
+                        ],
+                    )
+                ],
+            )
+        )
+    return built
+
+
+def build_trace(events: list) -> SystemTrace:
+    return SystemTrace(
+        system_name="bench",
+        system_id="bench-id",
+        system_instance_id="instance",
+        metadata={},
+        partition=[
+            EventPartitionElement(partition_index=event.partition_index, events=[event])
+            for event in events
+        ],
+        current_partition_index=len(events),
+    )
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    client = BaseLogClient(
+        TracingConfig(api_key="bench", base_url="http://bench", wire_format="msgpack")
+    )
+    events = build_events(args.events, args.messages)
+    system_info = {"system_name": "bench", "system_id": "bench-id"}
+    # The last event carries the longest conversation
+    event_payload = client._prepare_payload(events[-1], system_info)
+    upload_payload = {"traces": [build_trace(events)], "dataset": {}}
+
+    cases = [
+        ("event", event_payload, args.repeat * 200),
+        ("upload", upload_payload, args.repeat),
+    ]
+    for label, payload, calls in cases:
+        # Both encoders convert traces with to_dict(), as the upload path does
+        def encode_json(payload=payload) -> bytes:
+            dicts = dict(payload)
+            if "traces" in dicts:
+                dicts["traces"] = [trace.to_dict() for trace in dicts["traces"]]
+            return json.dumps(dicts).encode("utf-8")
+
+        def encode_msgpack(payload=payload) -> bytes:
+            return client._encode_payload(payload)[0]
+
+        sizes = {}
+        for name, fn in (("json", encode_json), ("msgpack", encode_msgpack)):
+            sizes[name] = len(fn())
+            loops = max(1, calls // args.repeat)
+            elapsed = best_of(args.repeat, lambda fn=fn: [fn() for _ in range(loops)])
+            print(
+                f"{label:>6} {name:>7}: {elapsed / loops * 1e6:10.1f} us, "
+                f"{sizes[name]:>10,} bytes"
+            )
+        print(
+            f"{label:>6}    size: msgpack is {sizes['msgpack'] / sizes['json']:.0%} of json"
+        )
+
+
+if __name__ == "__main__":
+    main()
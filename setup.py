@@ -23,6 +23,11 @@ setup(
         "botocore>=1.35.71",
         "tqdm>=4.66.4",
     ],
+    extras_require={
+        "fast": ["orjson>=3.8"],
+        "columnar": ["numpy"],
+        "msgpack": ["msgpack>=1.0"],
+    },
     author="Synth AI",
     author_email="josh@usesynth.ai",
     description="",
@@ -15,6 +15,7 @@ from synth_sdk.tracing.decorators import (
     synth_tracker_sync,
     synth_tracker_async,
 )
+from synth_sdk.tracing.kill_switch import disable_tracing, enable_tracing
 from synth_sdk.tracing.trackers import (
     track_messages_async,
     track_messages_sync,
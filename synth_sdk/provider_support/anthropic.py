@@ -29,6 +29,7 @@ from langfuse.utils.langfuse_singleton import LangfuseSingleton
 from wrapt import wrap_function_wrapper
 
 from synth_sdk.provider_support.suppress_logging import *
+from synth_sdk.tracing.kill_switch import tracing_switch
 from synth_sdk.tracing.trackers import (
     synth_tracker_async,
     synth_tracker_sync,
@@ -125,6 +126,8 @@ class AnthropicArgsExtractor:
 def _langfuse_wrapper(func):
     def _with_langfuse(anthropic_resource, initialize):
         def wrapper(wrapped, instance, args, kwargs):
+            if tracing_switch.disabled:
+                return wrapped(*args, **kwargs)
             return func(anthropic_resource, initialize, wrapped, args, kwargs)
 
         return wrapper
@@ -813,6 +816,19 @@ class AnthropicLangfuse:
         return self._langfuse.auth_check()
 
     def register_tracing(self):
+        setattr(anthropic, "langfuse_public_key", None)
+        setattr(anthropic, "langfuse_secret_key", None)
+        setattr(anthropic, "langfuse_host", None)
+        setattr(anthropic, "langfuse_debug", None)
+        setattr(anthropic, "langfuse_enabled", True)
+        setattr(anthropic, "langfuse_sample_rate", None)
+        setattr(anthropic, "langfuse_auth_check", self.langfuse_auth_check)
+        setattr(anthropic, "flush_langfuse", self.flush)
+
+        # Leave the clients unpatched if tracing is disabled from the start
+        if tracing_switch.disabled:
+            return
+
         # Patch anthropic.Client to wrap both completions and messages methods
         original_client_init = anthropic.Client.__init__
 
@@ -940,15 +956,6 @@ class AnthropicLangfuse:
 
         anthropic.AsyncClient.__init__ = new_async_init
 
-        setattr(anthropic, "langfuse_public_key", None)
-        setattr(anthropic, "langfuse_secret_key", None)
-        setattr(anthropic, "langfuse_host", None)
-        setattr(anthropic, "langfuse_debug", None)
-        setattr(anthropic, "langfuse_enabled", True)
-        setattr(anthropic, "langfuse_sample_rate", None)
-        setattr(anthropic, "langfuse_auth_check", self.langfuse_auth_check)
-        setattr(anthropic, "flush_langfuse", self.flush)
-
 
 modifier = AnthropicLangfuse()
 modifier.register_tracing()
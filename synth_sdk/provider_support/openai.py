@@ -18,6 +18,7 @@ from wrapt import wrap_function_wrapper
 
 from synth_sdk.provider_support.suppress_logging import *
 from synth_sdk.tracing.abstractions import MessageInputs
+from synth_sdk.tracing.kill_switch import tracing_switch
 from synth_sdk.tracing.trackers import synth_tracker_async, synth_tracker_sync
 
 try:
@@ -168,6 +169,8 @@ class OpenAiArgsExtractor:
 def _langfuse_wrapper(func):
     def _with_langfuse(open_ai_definitions, initialize):
         def wrapper(wrapped, instance, args, kwargs):
+            if tracing_switch.disabled:
+                return wrapped(*args, **kwargs)
             return func(open_ai_definitions, initialize, wrapped, args, kwargs)
 
         return wrapper
@@ -793,6 +796,20 @@ class OpenAILangfuse:
         return self._langfuse.auth_check()
 
     def register_tracing(self):
+        setattr(openai, "langfuse_public_key", None)
+        setattr(openai, "langfuse_secret_key", None)
+        setattr(openai, "langfuse_host", None)
+        setattr(openai, "langfuse_debug", None)
+        setattr(openai, "langfuse_enabled", True)
+        setattr(openai, "langfuse_sample_rate", None)
+        setattr(openai, "langfuse_mask", None)
+        setattr(openai, "langfuse_auth_check", self.langfuse_auth_check)
+        setattr(openai, "flush_langfuse", self.flush)
+
+        # Leave the clients unpatched if tracing is disabled from the start
+        if tracing_switch.disabled:
+            return
+
         resources = OPENAI_METHODS_V1 if _is_openai_v1() else OPENAI_METHODS_V0
 
         for resource in resources:
@@ -809,16 +826,6 @@ class OpenAILangfuse:
                 else _wrap_async(resource, self.initialize),
             )
 
-        setattr(openai, "langfuse_public_key", None)
-        setattr(openai, "langfuse_secret_key", None)
-        setattr(openai, "langfuse_host", None)
-        setattr(openai, "langfuse_debug", None)
-        setattr(openai, "langfuse_enabled", True)
-        setattr(openai, "langfuse_sample_rate", None)
-        setattr(openai, "langfuse_mask", None)
-        setattr(openai, "langfuse_auth_check", self.langfuse_auth_check)
-        setattr(openai, "flush_langfuse", self.flush)
-
 
 modifier = OpenAILangfuse()
 modifier.register_tracing()
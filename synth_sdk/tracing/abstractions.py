@@ -1,64 +1,150 @@
+import bisect
 import logging
-from dataclasses import dataclass
+import threading
+from collections import Counter
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+
+from synth_sdk.tracing.message_deltas import DeltaMessages
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageInputs:
     messages: List[Dict[str, str]]  # {"role": "", "content": ""}
 
 
-@dataclass
+@dataclass(slots=True)
 class ArbitraryInputs:
     inputs: Dict[str, Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageOutputs:
     messages: List[Dict[str, str]]
 
 
-@dataclass
+@dataclass(slots=True)
 class ArbitraryOutputs:
     outputs: Dict[str, Any]
 
 
-@dataclass
+def _expand_item_dict(data: Dict[str, Any]) -> Dict[str, Any]:
+    messages = data.get("messages")
+    if isinstance(messages, DeltaMessages):
+        return {**data, "messages": messages.expand()}
+    return data
+
+
+def _copy_item_dict(data: Dict[str, Any]) -> Dict[str, Any]:
+    messages = data.get("messages")
+    if isinstance(messages, DeltaMessages):
+        return {**data, "messages": messages.expand()}
+    return dict(data)
+
+
+def _copy_step_dict(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Copies, so callers rewriting the result (e.g. delta encoding) cannot
+    # change a cached form
+    return {
+        **data,
+        "compute_input": [_copy_item_dict(item) for item in data["compute_input"]],
+        "compute_output": [_copy_item_dict(item) for item in data["compute_output"]],
+    }
+
+
+def _item_to_dict(item) -> Dict[str, Any]:
+    """Serialize a compute input/output, expanding delta-encoded messages."""
+    return _expand_item_dict({name: getattr(item, name) for name in item.__slots__})
+
+
+# (kind, type name) -> number of compute inputs/outputs left out of to_dict()
+skipped_item_counts: Counter = Counter()
+_skipped_item_lock = threading.Lock()
+
+
+def _count_skipped_item(kind: str, item: Any) -> None:
+    key = (kind, type(item).__name__)
+    with _skipped_item_lock:
+        skipped_item_counts[key] += 1
+        first = skipped_item_counts[key] == 1
+    if first:
+        logger.warning(
+            f"Skipping non-serializable {kind} of type {key[1]}; further ones "
+            "are only counted in skipped_item_counts"
+        )
+
+
+def _serialize_items(items, serializable_types, kind: str) -> List[Dict[str, Any]]:
+    serialized = []
+    for item in items:
+        if isinstance(item, serializable_types):
+            # Delta-encoded messages stay compact here; to_dict expands them
+            serialized.append({name: getattr(item, name) for name in item.__slots__})
+        else:
+            _count_skipped_item(kind, item)
+    return serialized
+
+
+def _state_without_cache(obj) -> Dict[str, Any]:
+    # Leave cached serialized forms out of spill and WAL records
+    return {
+        f.name: getattr(obj, f.name) for f in fields(obj) if f.name != "_dict_cache"
+    }
+
+
+def _restore_state(obj, state: Dict[str, Any]) -> None:
+    obj._dict_cache = None
+    for name, value in state.items():
+        setattr(obj, name, value)
+
+
+@dataclass(slots=True)
 class ComputeStep:
     event_order: int
     compute_ended: datetime  # time step
     compute_began: datetime  # time step
     compute_input: Dict[str, Any]  # {variable_name: value}
     compute_output: Dict[str, Any]  # {variable_name: value}
+    # (cache key, serialized form) of the last serialization
+    _dict_cache: Optional[tuple] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def to_dict(self):
-        # Serialize compute_input
-        serializable_input = [
-            input_item.__dict__
-            for input_item in self.compute_input
-            if isinstance(input_item, (MessageInputs, ArbitraryInputs))
-        ]
-
-        # Serialize compute_output
-        serializable_output = [
-            output_item.__dict__
-            for output_item in self.compute_output
-            if isinstance(output_item, (MessageOutputs, ArbitraryOutputs))
-        ]
-
-        # Warn about non-serializable inputs/outputs
-        for item in self.compute_input:
-            if not isinstance(item, (MessageInputs, ArbitraryInputs)):
-                logger.warning(f"Skipping non-serializable input: {item}")
-        for item in self.compute_output:
-            if not isinstance(item, (MessageOutputs, ArbitraryOutputs)):
-                logger.warning(f"Skipping non-serializable output: {item}")
-
+        return _copy_step_dict(self._serialized())
+
+    def _serialized(self) -> Dict[str, Any]:
+        """Return the cached serialized form, rebuilding it if the step changed.
+
+        Steps are recorded once their computation has ended, so the form is
+        usually built once. It is shared and keeps delta-encoded messages
+        compact; to_dict() returns an expanded copy. Inputs and outputs are
+        referenced, not copied: edits inside an item show up, but reassigning
+        an item's field is only noticed once the item itself is replaced.
+        """
+        key = self._cache_key()
+        cache = self._dict_cache
+        if cache is None or cache[0] != key:
+            cache = self._dict_cache = (key, self._build_dict())
+        return cache[1]
+
+    def _cache_key(self) -> tuple:
+        # Compared with ==, which short-circuits on identity, so reassigning
+        # a field or adding, removing or replacing an item is noticed
+        return (
+            self.event_order,
+            self.compute_ended,
+            self.compute_began,
+            tuple(self.compute_input),
+            tuple(self.compute_output),
+        )
+
+    def _build_dict(self) -> Dict[str, Any]:
         return {
             "event_order": self.event_order,
             "compute_ended": self.compute_ended.isoformat()
@@ -67,12 +153,19 @@ class ComputeStep:
             "compute_began": self.compute_began.isoformat()
             if isinstance(self.compute_began, datetime)
             else self.compute_began,
-            "compute_input": serializable_input,
-            "compute_output": serializable_output,
+            "compute_input": _serialize_items(
+                self.compute_input, (MessageInputs, ArbitraryInputs), "input"
+            ),
+            "compute_output": _serialize_items(
+                self.compute_output, (MessageOutputs, ArbitraryOutputs), "output"
+            ),
         }
 
+    __getstate__ = _state_without_cache
+    __setstate__ = _restore_state
 
-@dataclass
+
+@dataclass(slots=True)
 class AgentComputeStep(ComputeStep):
     model_name: Optional[str] = None
     model_params: Optional[Dict[str, Any]] = None
@@ -80,19 +173,24 @@ class AgentComputeStep(ComputeStep):
     compute_input: List[Union[MessageInputs, ArbitraryInputs]]
     compute_output: List[Union[MessageOutputs, ArbitraryOutputs]]
 
-    def to_dict(self):
-        base_dict = super().to_dict()  # Get the parent class serialization
+    # Zero-argument super() does not work in slotted dataclasses, which are
+    # rebuilt by the decorator, so the parent methods are called directly
+    def _cache_key(self) -> tuple:
+        return (*ComputeStep._cache_key(self), self.model_name)
+
+    def _build_dict(self) -> Dict[str, Any]:
+        base_dict = ComputeStep._build_dict(self)
         base_dict["model_name"] = self.model_name  # Add model_name
         return base_dict
 
 
-@dataclass
+@dataclass(slots=True)
 class EnvironmentComputeStep(ComputeStep):
     compute_input: List[ArbitraryInputs]
     compute_output: List[ArbitraryOutputs]
 
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     system_instance_id: str
     event_type: str
@@ -103,9 +201,56 @@ class Event:
     environment_compute_steps: List["EnvironmentComputeStep"]
     system_name: Optional[str] = None
     system_id: Optional[str] = None
+    # Assigned by the backend once the event is uploaded immediately
+    id: Optional[str] = field(default=None, repr=False, compare=False)
+    # (cache key, serialized form), kept once closed
+    _dict_cache: Optional[tuple] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def to_dict(self):
+        """Serialize the event.
+
+        A closed event's form is memoized and rebuilt if a field is
+        reassigned or a compute step changes; each call returns a copy.
+        """
+        serialized = self._serialized()
+        agent_step = serialized["agent_compute_step"]
         return {
+            **serialized,
+            "agent_compute_step": _copy_step_dict(agent_step)
+            if agent_step is not None
+            else None,
+            "environment_compute_steps": [
+                _copy_step_dict(step)
+                for step in serialized["environment_compute_steps"]
+            ],
+        }
+
+    def _serialized(self) -> Dict[str, Any]:
+        """Return the shared serialized form; see ComputeStep._serialized."""
+        agent_step = (
+            self.agent_compute_step._serialized()
+            if self.agent_compute_step is not None
+            else None
+        )
+        environment_steps = [
+            step._serialized() for step in self.environment_compute_steps
+        ]
+        # Unchanged steps return the same cached dicts, so == short-circuits
+        key = (
+            self.event_type,
+            self.opened,
+            self.closed,
+            self.partition_index,
+            agent_step,
+            *environment_steps,
+        )
+        cache = self._dict_cache
+        if cache is not None and cache[0] == key:
+            return cache[1]
+
+        serialized = {
             "event_type": self.event_type,
             "opened": self.opened.isoformat()
             if isinstance(self.opened, datetime)
@@ -114,11 +259,15 @@ class Event:
             if isinstance(self.closed, datetime)
             else self.closed,
             "partition_index": self.partition_index,
-            "agent_compute_step": self.agent_compute_step.to_dict(),
-            "environment_compute_steps": [
-                step.to_dict() for step in self.environment_compute_steps
-            ],
+            "agent_compute_step": agent_step,
+            "environment_compute_steps": environment_steps,
         }
+        if self.closed is not None:
+            self._dict_cache = (key, serialized)
+        return serialized
+
+    __getstate__ = _state_without_cache
+    __setstate__ = _restore_state
 
     # backwards compatibility
     @property
@@ -127,7 +276,7 @@ class Event:
         return [self.agent_compute_step] if self.agent_compute_step is not None else []
 
 
-@dataclass
+@dataclass(slots=True)
 class EventPartitionElement:
     partition_index: int
     events: List[Event]
@@ -147,6 +296,41 @@ class SystemTrace:
     metadata: Optional[Dict[str, Any]]
     partition: List[EventPartitionElement]
     current_partition_index: int = 0  # Track current partition
+    # partition_index -> element, kept alongside the ordered partition list
+    _partition_map: Dict[int, EventPartitionElement] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        self._reindex_partitions()
+
+    def _reindex_partitions(self) -> None:
+        self._partition_map = {p.partition_index: p for p in self.partition}
+
+    def add_partition(self, element: EventPartitionElement) -> None:
+        """Add a partition element, keeping the index map in sync."""
+        if (
+            self.partition
+            and self.partition[-1].partition_index > element.partition_index
+        ):
+            # Created out of order (e.g. merged from buffers); keep the list sorted
+            bisect.insort(self.partition, element, key=lambda p: p.partition_index)
+        else:
+            self.partition.append(element)
+        self._partition_map[element.partition_index] = element
+
+    def remove_partition(self, element: EventPartitionElement) -> None:
+        """Remove a partition element from the list and the index map."""
+        self.partition.remove(element)
+        if self._partition_map.get(element.partition_index) is element:
+            del self._partition_map[element.partition_index]
+
+    def get_partition(self, partition_index: int) -> Optional[EventPartitionElement]:
+        """Return the partition element with the given index in constant time."""
+        if len(self._partition_map) != len(self.partition):
+            # The partition list was modified directly; rebuild the index
+            self._reindex_partitions()
+        return self._partition_map.get(partition_index)
 
     def to_dict(self):
         return {
@@ -196,6 +380,66 @@ class RewardSignal(BaseModel):
         }
 
 
+class _DatasetIndex:
+    """Indexes over a Dataset's questions and reward signals.
+
+    Elements appended to the lists directly are indexed on the next sync; if
+    a list was replaced or shortened, its index is rebuilt.
+    """
+
+    __slots__ = (
+        "questions",
+        "question_count",
+        "questions_by_id",
+        "reward_signals",
+        "signal_count",
+        "signals_by_instance",
+        "signals_by_question",
+    )
+
+    def __init__(self):
+        self.questions: Optional[list] = None
+        self.question_count = 0
+        self.questions_by_id: Dict[str, TrainingQuestion] = {}
+        self.reward_signals: Optional[list] = None
+        self.signal_count = 0
+        self.signals_by_instance: Dict[str, List[RewardSignal]] = {}
+        self.signals_by_question: Dict[str, List[RewardSignal]] = {}
+
+    def sync(
+        self, questions: List[TrainingQuestion], reward_signals: List[RewardSignal]
+    ) -> None:
+        if questions is not self.questions or self.question_count > len(questions):
+            self.questions = questions
+            self.question_count = 0
+            self.questions_by_id = {}
+        if self.question_count < len(questions):
+            for question in questions[self.question_count :]:
+                self.add_question(question)
+
+        if reward_signals is not self.reward_signals or self.signal_count > len(
+            reward_signals
+        ):
+            self.reward_signals = reward_signals
+            self.signal_count = 0
+            self.signals_by_instance = {}
+            self.signals_by_question = {}
+        if self.signal_count < len(reward_signals):
+            for signal in reward_signals[self.signal_count :]:
+                self.add_reward_signal(signal)
+
+    def add_question(self, question: TrainingQuestion) -> None:
+        self.questions_by_id.setdefault(question.id, question)
+        self.question_count += 1
+
+    def add_reward_signal(self, signal: RewardSignal) -> None:
+        self.signals_by_instance.setdefault(signal.system_instance_id, []).append(
+            signal
+        )
+        self.signals_by_question.setdefault(signal.question_id, []).append(signal)
+        self.signal_count += 1
+
+
 class Dataset(BaseModel):
     """
     A dataset is a collection of training questions and reward signals.
@@ -205,6 +449,60 @@ class Dataset(BaseModel):
     questions: List[TrainingQuestion]
     reward_signals: List[RewardSignal]
 
+    _index: _DatasetIndex = PrivateAttr(default_factory=_DatasetIndex)
+
+    def _indexes(self) -> _DatasetIndex:
+        index = self._index
+        index.sync(self.questions, self.reward_signals)
+        return index
+
+    def add_question(self, question: TrainingQuestion) -> None:
+        """Append a question, keeping the indexes in sync."""
+        index = self._indexes()
+        self.questions.append(question)
+        index.add_question(question)
+
+    def add_reward_signal(self, signal: RewardSignal) -> None:
+        """Append a reward signal, keeping the indexes in sync."""
+        index = self._indexes()
+        self.reward_signals.append(signal)
+        index.add_reward_signal(signal)
+
+    def add_reward_signals(self, signals: Iterable[RewardSignal]) -> None:
+        """Append many reward signals, keeping the indexes in sync."""
+        self.reward_signals.extend(signals)
+        self._indexes()
+
+    def get_question(self, question_id: str) -> Optional[TrainingQuestion]:
+        """Return the first question with the given id in constant time."""
+        return self._indexes().questions_by_id.get(question_id)
+
+    def get_reward_signals(
+        self,
+        system_instance_id: Optional[str] = None,
+        question_id: Optional[str] = None,
+    ) -> List[RewardSignal]:
+        """Return the reward signals matching the given ids, in insertion order."""
+        index = self._indexes()
+        if system_instance_id is None and question_id is None:
+            return list(self.reward_signals)
+        if system_instance_id is None:
+            return list(index.signals_by_question.get(question_id, ()))
+        signals = index.signals_by_instance.get(system_instance_id, ())
+        if question_id is None:
+            return list(signals)
+        return [signal for signal in signals if signal.question_id == question_id]
+
+    def join_traces(
+        self, traces: List[SystemTrace]
+    ) -> List[Tuple[SystemTrace, List[RewardSignal]]]:
+        """Pair each trace with its reward signals, in one pass over the traces."""
+        signals_by_instance = self._indexes().signals_by_instance
+        return [
+            (trace, list(signals_by_instance.get(trace.system_instance_id, ())))
+            for trace in traces
+        ]
+
     def to_dict(self):
         return {
             "questions": [question.to_dict() for question in self.questions],
@@ -8,6 +8,15 @@ import httpx
 
 from synth_sdk.tracing.config import TracingConfig
 
+# Settings the pooled HTTP clients are built from
+_CONNECTION_FIELDS = (
+    "api_key",
+    "base_url",
+    "timeout",
+    "max_connections",
+    "keepalive_expiry",
+)
+
 
 class ClientManager:
     """Singleton manager for HTTP clients with both sync and async support"""
@@ -35,17 +44,26 @@ class ClientManager:
         """Initialize or return the singleton instance synchronously"""
         if cls._instance is None:
             cls._instance = cls()
-        cls._instance.configure(config)
+        if cls._instance._config is not config:
+            cls._instance.configure(config)
         return cls._instance
 
     def configure(self, config: TracingConfig) -> None:
-        """Configure the client manager with new settings"""
+        """Configure the client manager with new settings.
+
+        Open clients are kept unless a setting they were built from changed.
+        """
+        previous = self._config
         self._config = config
         self._credentials_cache = {
             "api_key": config.api_key,
             "api_secret": getattr(config, "api_secret", None),
         }
-        self._close_clients()
+        if previous is None or any(
+            getattr(previous, name) != getattr(config, name)
+            for name in _CONNECTION_FIELDS
+        ):
+            self._close_clients()
 
     def get_sync_client(self) -> httpx.Client:
         """Get or create synchronized HTTP client with connection pooling"""
@@ -0,0 +1,169 @@
+import math
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    ComputeStep,
+    Dataset,
+    MessageInputs,
+    MessageOutputs,
+    RewardSignal,
+    SystemTrace,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Column = Union[array, List[Any]]
+
+# Numeric columns and their array typecodes: "q" is int64, "d" is float64.
+# Missing integers are -1, missing floats are NaN.
+NUMERIC_COLUMNS = {
+    "partition_index": "q",
+    "event_order": "q",
+    "event_opened": "d",
+    "event_closed": "d",
+    "compute_began": "d",
+    "compute_ended": "d",
+    "duration": "d",
+    "input_messages": "q",
+    "output_messages": "q",
+    "input_tokens": "q",
+    "output_tokens": "q",
+    "reward": "d",
+}
+
+STRING_COLUMNS = (
+    "system_name",
+    "system_instance_id",
+    "event_type",
+    "origin",
+    "model_name",
+    "question_id",
+)
+
+# Token count keys of OpenAI and Anthropic usage objects
+_INPUT_TOKEN_KEYS = ("prompt_tokens", "input_tokens")
+_OUTPUT_TOKEN_KEYS = ("completion_tokens", "output_tokens")
+
+
+def _seconds(value: Any) -> float:
+    if value is None:
+        return math.nan
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _message_count(items: List[Any], message_type: type) -> int:
+    return sum(len(item.messages) for item in items if isinstance(item, message_type))
+
+
+def _usage_tokens(step: ComputeStep, keys) -> int:
+    """Token count from a tracked "usage" dict, or -1 if none was tracked."""
+    for item in step.compute_output + step.compute_input:
+        if isinstance(item, ArbitraryOutputs):
+            usage = item.outputs.get("usage")
+        elif isinstance(item, ArbitraryInputs):
+            usage = item.inputs.get("usage")
+        else:
+            continue
+        if isinstance(usage, dict):
+            for key in keys:
+                if usage.get(key) is not None:
+                    return int(usage[key])
+    return -1
+
+
+def traces_to_columns(
+    traces: List[SystemTrace], dataset: Optional[Dataset] = None
+) -> Dict[str, Column]:
+    """Flatten traces into columns with one row per compute step.
+
+    Numeric columns (see NUMERIC_COLUMNS) are contiguous array.array buffers,
+    so they can be wrapped by NumPy without copying; string columns are lists.
+    If a dataset is given, rows are joined with its reward signals on
+    system_instance_id: a step is repeated once per reward signal of its
+    instance, and steps of instances without one get reward NaN.
+    Token counts come from a tracked "usage" dict, e.g.
+    track_state("usage", response.usage, origin="agent").
+    """
+    columns: Dict[str, Column] = {
+        name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()
+    }
+    columns.update({name: [] for name in STRING_COLUMNS})
+
+    if dataset is not None:
+        traces_with_signals = dataset.join_traces(traces)
+    else:
+        traces_with_signals = [(trace, []) for trace in traces]
+    unrewarded: List[Optional[RewardSignal]] = [None]
+
+    # Bind the append methods once; this loop runs for every step of every trace
+    append = {name: column.append for name, column in columns.items()}
+    for trace, signals in traces_with_signals:
+        signals = signals or unrewarded
+        for partition in trace.partition:
+            for event in partition.events:
+                opened = _seconds(event.opened)
+                closed = _seconds(event.closed)
+                for step in event.agent_compute_steps + event.environment_compute_steps:
+                    began = _seconds(step.compute_began)
+                    ended = _seconds(step.compute_ended)
+                    is_agent = isinstance(step, AgentComputeStep)
+                    row = {
+                        "partition_index": partition.partition_index,
+                        "event_order": step.event_order,
+                        "event_opened": opened,
+                        "event_closed": closed,
+                        "compute_began": began,
+                        "compute_ended": ended,
+                        "duration": ended - began,
+                        "input_messages": _message_count(
+                            step.compute_input, MessageInputs
+                        ),
+                        "output_messages": _message_count(
+                            step.compute_output, MessageOutputs
+                        ),
+                        "input_tokens": _usage_tokens(step, _INPUT_TOKEN_KEYS),
+                        "output_tokens": _usage_tokens(step, _OUTPUT_TOKEN_KEYS),
+                        "system_name": trace.system_name,
+                        "system_instance_id": trace.system_instance_id,
+                        "event_type": event.event_type,
+                        "origin": "agent" if is_agent else "environment",
+                        "model_name": step.model_name if is_agent else None,
+                    }
+                    for signal in signals:
+                        for name, value in row.items():
+                            append[name](value)
+                        if signal is None:
+                            append["reward"](math.nan)
+                            append["question_id"](None)
+                        else:
+                            append["reward"](float(signal.reward))
+                            append["question_id"](signal.question_id)
+    return columns
+
+
+def columns_to_numpy(columns: Dict[str, Column]) -> Dict[str, Any]:
+    """Wrap columns from traces_to_columns as NumPy arrays.
+
+    Numeric columns share memory with the array.array buffers; string
+    columns become object arrays.
+    """
+    if np is None:
+        raise ModuleNotFoundError(
+            "Please install numpy to use this feature: 'pip install numpy'"
+        )
+    return {
+        name: np.frombuffer(column, dtype=column.typecode)
+        if isinstance(column, array)
+        else np.array(column, dtype=object)
+        for name, column in columns.items()
+    }
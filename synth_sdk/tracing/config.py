@@ -1,6 +1,9 @@
 import json
+import logging
+import os
+import threading
 from enum import Enum
-from typing import Dict, List, Sequence
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence
 
 from opentelemetry import trace
 from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
@@ -11,6 +14,8 @@ from opentelemetry.sdk.trace.export import (
 )
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
 
 class InMemoryExporter(SpanExporter):
     def __init__(self):
@@ -82,15 +87,20 @@ class LoggingMode(Enum):
     DEFERRED = "deferred"
 
 
+DEFAULT_BASE_URL = "https://agent-learning.onrender.com"
+
+
 class TracingConfig(BaseModel):
     mode: LoggingMode = Field(default=LoggingMode.DEFERRED)
     api_key: str
-    base_url: str = Field(default="https://agent-learning.onrender.com")
+    base_url: str = Field(default=DEFAULT_BASE_URL)
     max_retries: int = Field(default=3)
     retry_backoff: float = Field(default=1.5)  # exponential backoff multiplier
     batch_size: int = Field(default=1)  # for future batching support
     timeout: float = Field(default=5.0)  # seconds
     sdk_version: str = Field(default="0.1.0")  # Added sdk_version field
+    # "json" or "msgpack" (binary, see synth_sdk.tracing.wire) for event uploads
+    wire_format: Literal["json", "msgpack"] = Field(default="json")
 
     # Connection settings
     max_connections: int = Field(
@@ -105,3 +115,120 @@ class TracingConfig(BaseModel):
 
         validate_assignment = True
         extra = "forbid"  # Prevent additional fields
+
+
+def tracing_config_from_env(**settings: Any) -> TracingConfig:
+    """Build a TracingConfig from the SYNTH_* environment variables.
+
+    Keyword arguments are TracingConfig fields that take precedence over the
+    environment.
+    """
+    fields: Dict[str, Any] = {
+        "mode": LoggingMode.INSTANT
+        if os.getenv("SYNTH_LOGGING_MODE") == "instant"
+        else LoggingMode.DEFERRED,
+        "api_key": os.getenv("SYNTH_API_KEY", ""),
+        "base_url": os.getenv("SYNTH_ENDPOINT_OVERRIDE", DEFAULT_BASE_URL),
+    }
+    fields.update(settings)
+    return TracingConfig(**fields)
+
+
+class TracingConfigManager:
+    """Resolves the tracing config once and hands out the cached instance.
+
+    The config is read from the environment on first use. configure() sets
+    fields explicitly, reload() re-reads the environment, and watch() polls
+    it in a background thread. Listeners registered with add_listener() are
+    called with the new config whenever it changes, so long-lived objects
+    such as the retry queue are updated in place instead of being replaced.
+    """
+
+    def __init__(self):
+        self._config: Optional[TracingConfig] = None
+        self._settings: Dict[str, Any] = {}
+        self._listeners: List[Callable[[TracingConfig], None]] = []
+        self._lock = threading.RLock()
+        self._watch_stop: Optional[threading.Event] = None
+
+    def get(self) -> TracingConfig:
+        """Return the current config, resolving it on first use."""
+        config = self._config
+        if config is None:
+            config = self.reload()
+        return config
+
+    def configure(
+        self, config: Optional[TracingConfig] = None, **settings: Any
+    ) -> TracingConfig:
+        """Set config fields explicitly; they take precedence over the environment.
+
+        Settings accumulate across calls. Passing a TracingConfig pins all of
+        its fields. Invalid settings raise and are not kept, so the current
+        config stays in effect.
+        """
+        with self._lock:
+            merged = dict(config) if config is not None else dict(self._settings)
+            merged.update(settings)
+            resolved = tracing_config_from_env(**merged)
+            self._settings = merged
+            return self._set(resolved)
+
+    def reload(self) -> TracingConfig:
+        """Re-read the environment and notify listeners if the config changed."""
+        with self._lock:
+            config = tracing_config_from_env(**self._settings)
+        return self._set(config)
+
+    def _set(self, config: TracingConfig) -> TracingConfig:
+        """Make config current and notify listeners, unless it is unchanged."""
+        with self._lock:
+            previous = self._config
+            if previous is not None and previous == config:
+                return previous
+            self._config = config
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(config)
+        return config
+
+    def reset(self) -> None:
+        """Drop explicit settings; the environment is read again on next use."""
+        with self._lock:
+            self._settings = {}
+            self._config = None
+
+    def add_listener(self, listener: Callable[[TracingConfig], None]) -> None:
+        """Call listener with every new config, and now if one is resolved."""
+        with self._lock:
+            self._listeners.append(listener)
+            config = self._config
+        if config is not None:
+            listener(config)
+
+    def watch(self, interval: float = 5.0) -> None:
+        """Reload the config from the environment every interval seconds."""
+        with self._lock:
+            if self._watch_stop is not None:
+                return
+            self._watch_stop = stop = threading.Event()
+
+        def poll() -> None:
+            while not stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"Failed to reload tracing config: {e}")
+
+        threading.Thread(target=poll, name="synth-config-watch", daemon=True).start()
+
+    def stop_watching(self) -> None:
+        """Stop the thread started by watch()."""
+        with self._lock:
+            stop, self._watch_stop = self._watch_stop, None
+        if stop is not None:
+            stop.set()
+
+
+# Global config manager used by the decorators, event scopes and retry queue
+tracing_config_manager = TracingConfigManager()
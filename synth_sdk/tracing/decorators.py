@@ -1,10 +1,9 @@
 # synth_sdk/tracing/decorators.py
 import inspect
 import logging
-import os
 import time
 from functools import wraps
-from typing import Any, Callable, Dict, List, Literal
+from typing import Any, Callable, Dict, List, Literal, Optional
 
 from synth_sdk.tracing.abstractions import (
     AgentComputeStep,
@@ -15,20 +14,28 @@ from synth_sdk.tracing.abstractions import (
     MessageInputs,
     MessageOutputs,
 )
-from synth_sdk.tracing.config import LoggingMode, TracingConfig
-from synth_sdk.tracing.context import get_current_context, trace_context
+from synth_sdk.tracing.config import (
+    LoggingMode,
+    TracingConfig,
+    tracing_config_manager,
+)
+from synth_sdk.tracing.context import trace_context
 from synth_sdk.tracing.events.manage import set_current_event
 from synth_sdk.tracing.events.store import event_store
 from synth_sdk.tracing.immediate_client import (
     AsyncImmediateLogClient,
     ImmediateLogClient,
 )
+from synth_sdk.tracing.interning import message_interner
+from synth_sdk.tracing.kill_switch import tracing_switch
 from synth_sdk.tracing.local import (
     _local,
     active_events_var,
     logger,
 )
-from synth_sdk.tracing.retry_queue import initialize_retry_queue, retry_queue
+from synth_sdk.tracing.message_deltas import conversation_delta_encoder
+from synth_sdk.tracing.retry_queue import retry_queue
+from synth_sdk.tracing.sampling import head_sampler
 from synth_sdk.tracing.trackers import (
     synth_tracker_async,
     synth_tracker_sync,
@@ -60,24 +67,17 @@ def clear_current_event(event_type: str) -> None:
             del _local.active_events[event_type]
 
 
-# Cache the config to avoid repeated env lookups
 def get_tracing_config() -> TracingConfig:
-    config = TracingConfig(
-        mode=LoggingMode.INSTANT
-        if os.getenv("SYNTH_LOGGING_MODE") == "instant"
-        else LoggingMode.DEFERRED,
-        api_key=os.getenv("SYNTH_API_KEY", ""),
-        base_url=os.getenv(
-            "SYNTH_ENDPOINT_OVERRIDE", "https://agent-learning.onrender.com"
-        ),
-    )
-    # Initialize retry queue with config if needed
-    initialize_retry_queue(config)
-    return config
+    """Return the cached tracing config; see TracingConfigManager."""
+    return tracing_config_manager.get()
 
 
 def process_retry_queue_sync() -> None:
-    """Process the retry queue synchronously."""
+    """Process the retry queue synchronously.
+
+    Traced calls leave retries to the queue's background worker; call this to
+    flush the queue on demand.
+    """
     try:
         success, failure = retry_queue.process_sync()
         if success or failure:
@@ -96,6 +96,193 @@ async def process_retry_queue_async() -> None:
         logger.error(f"Error processing retry queue: {e}")
 
 
+def _record_error(context: Dict[str, str], event_type: str, error: Exception) -> None:
+    """Note an error in the trace metadata while a TailSampler judges by errors.
+
+    Nested traced functions re-raise the same exception; it is recorded once
+    per system instance, by the innermost traced function it passed through.
+    """
+    if not event_store.recording_errors:
+        return
+    recorded_in = error.__dict__.setdefault("_synth_recorded_in", set())
+    if context["system_instance_id"] in recorded_in:
+        return
+    recorded_in.add(context["system_instance_id"])
+    event_store.record_error(
+        context["system_name"],
+        context["system_id"],
+        context["system_instance_id"],
+        event_type,
+        error,
+    )
+
+
+class _OriginSteps:
+    """Traced inputs and outputs of one origin, gathered into a compute step."""
+
+    __slots__ = ("inputs", "outputs", "finetune", "model_name", "model_params")
+
+    def __init__(self):
+        self.inputs: List[Any] = []
+        self.outputs: List[Any] = []
+        self.finetune = False
+        self.model_name = None
+        self.model_params = None
+
+
+def _instance_context(self_instance: Any) -> Dict[str, str]:
+    """Return the tracing context of the instance a traced method runs on."""
+    try:
+        system_instance_id = self_instance.system_instance_id
+        system_name = self_instance.system_name
+    except AttributeError:
+        for attr in ("system_instance_id", "system_name"):
+            if not hasattr(self_instance, attr):
+                raise ValueError(
+                    f"Instance of class '{self_instance.__class__.__name__}' missing required attribute '{attr}'"
+                )
+        raise
+    return {
+        "system_name": system_name,
+        "system_id": get_system_id(system_name),
+        "system_instance_id": system_instance_id,
+    }
+
+
+def _create_event(
+    event_type: str,
+    context: Dict[str, str],
+    opened: float,
+    increment_partition: bool,
+    decorator_type: Literal["sync", "async"],
+) -> Event:
+    """Open a new event in the given context and make it the current one."""
+    event = Event(
+        system_instance_id=context["system_instance_id"],
+        event_type=event_type,
+        opened=opened,
+        closed=None,
+        partition_index=0,
+        agent_compute_step=None,
+        environment_compute_steps=[],
+        system_name=context["system_name"],
+        system_id=context["system_id"],
+    )
+    if increment_partition:
+        event.partition_index = event_store.increment_partition(
+            context["system_name"],
+            context["system_id"],
+            context["system_instance_id"],
+        )
+        logger.debug(f"Incremented partition to: {event.partition_index}")
+    set_current_event(event, decorator_type=decorator_type)
+    return event
+
+
+def _add_compute_steps(
+    event: Optional[Event],
+    traced_inputs: List[Any],
+    traced_outputs: List[Any],
+    system_instance_id: str,
+    finetune_step: bool,
+    compute_began: float,
+    compute_ended: float,
+    variable_model_info: bool,
+    message_outputs_only: bool,
+) -> None:
+    """Group traced data by origin and attach one compute step per origin to event.
+
+    variable_model_info also takes finetune and model info from tracked
+    variables, and message_outputs_only drops tracked output variables; the
+    sync decorator does both, the async one neither.
+    """
+    if not traced_inputs and not traced_outputs:
+        return
+
+    steps_by_origin = {"agent": _OriginSteps(), "environment": _OriginSteps()}
+
+    for item in traced_inputs:
+        steps = steps_by_origin[item["origin"]]
+        if "variable_value" in item and "variable_name" in item:
+            # Standard variable input
+            steps.inputs.append(
+                ArbitraryInputs(inputs={item["variable_name"]: item["variable_value"]})
+            )
+            if variable_model_info:
+                steps.finetune = item["finetune"] if "finetune" in item else False
+                steps.model_name = item["model_name"] if "model_name" in item else None
+                steps.model_params = (
+                    item["model_params"] if "model_params" in item else None
+                )
+        elif "messages" in item:
+            # Message input from track_lm
+            steps.inputs.append(
+                MessageInputs(
+                    messages=conversation_delta_encoder.encode(
+                        system_instance_id,
+                        message_interner.intern_messages(item["messages"]),
+                    )
+                )
+            )
+            steps.finetune = finetune_step or item["finetune"]
+            steps.model_name = item["model_name"]
+            steps.model_params = item["model_params"]
+        else:
+            logger.warning(f"Unhandled traced input item: {item}")
+
+    for item in traced_outputs:
+        # Temporary Kludge
+        if message_outputs_only and "messages" not in item:
+            continue
+        steps = steps_by_origin[item["origin"]]
+        if "variable_value" in item and "variable_name" in item:
+            # Standard variable output
+            steps.outputs.append(
+                ArbitraryOutputs(
+                    outputs={item["variable_name"]: item["variable_value"]}
+                )
+            )
+        elif "messages" in item:
+            # Message output from track_lm
+            steps.outputs.append(
+                MessageOutputs(
+                    messages=message_interner.intern_messages(item["messages"])
+                )
+            )
+        else:
+            logger.warning(f"Unhandled traced output item: {item}")
+
+    # Create compute steps grouped by origin
+    for var_origin, steps in steps_by_origin.items():
+        if not steps.inputs and not steps.outputs:
+            continue
+        event_order = 1 + len(event.environment_compute_steps) + 1 if event else 1
+        if var_origin == "agent":
+            compute_step = AgentComputeStep(
+                model_name=steps.model_name,
+                model_params=steps.model_params,
+                should_learn=steps.finetune,
+                event_order=event_order,
+                compute_began=compute_began,
+                compute_ended=compute_ended,
+                compute_input=steps.inputs,
+                compute_output=steps.outputs,
+            )
+        else:
+            compute_step = EnvironmentComputeStep(
+                event_order=event_order,
+                compute_began=compute_began,
+                compute_ended=compute_ended,
+                compute_input=steps.inputs,
+                compute_output=steps.outputs,
+            )
+        if event:
+            if var_origin == "agent":
+                event.agent_compute_step = compute_step
+            else:
+                event.environment_compute_steps.append(compute_step)
+
+
 # # This decorator is used to trace synchronous functions
 def trace_event_sync(
     event_type: str,
@@ -112,215 +299,77 @@ def trace_event_sync(
     """
 
     def decorator(func: Callable) -> Callable:
+        if tracing_switch.disabled:
+            return func
+
+        # Resolve everything that does not change between calls once
+        bound_self = getattr(func, "__self__", None)
+        creates_event = manage_event in ("create", "create_and_end")
+        ends_event = manage_event in ("end", "create_and_end")
+
         @wraps(func)
         def wrapper(*args, **kwargs):
+            if tracing_switch.disabled:
+                return func(*args, **kwargs)
+
             # Determine the instance (self) if it's a method
-            if not hasattr(func, "__self__") or not func.__self__:
-                if not args:
-                    raise ValueError(
-                        "Instance method expected, but no arguments were passed."
-                    )
+            if bound_self:
+                self_instance = bound_self
+            elif args:
                 self_instance = args[0]
             else:
-                self_instance = func.__self__
-
-            # Ensure required attributes are present
-            required_attrs = ["system_instance_id", "system_name"]
-            for attr in required_attrs:
-                if not hasattr(self_instance, attr):
-                    raise ValueError(
-                        f"Instance of class '{self_instance.__class__.__name__}' missing required attribute '{attr}'"
-                    )
+                raise ValueError(
+                    "Instance method expected, but no arguments were passed."
+                )
+            context = _instance_context(self_instance)
+            if head_sampler.active and not head_sampler.sample(
+                context["system_instance_id"], event_type, new_event=creates_event
+            ):
+                # Unsampled calls run untraced and capture no messages
+                synth_tracker_sync.finalize()
+                return func(*args, **kwargs)
 
             # Use context manager for setup/cleanup
-            with trace_context(
-                system_name=self_instance.system_name,
-                system_id=get_system_id(self_instance.system_name),
-                system_instance_id=self_instance.system_instance_id,
-            ):
+            with trace_context(**context):
                 # Initialize Trace
                 synth_tracker_sync.initialize()
 
                 event = None
                 compute_began = time.time()
                 try:
-                    if manage_event in ["create", "create_and_end"]:
-                        # Create new event
-                        context = get_current_context()
-                        event = Event(
-                            system_instance_id=context["system_instance_id"],
-                            event_type=event_type,
-                            opened=compute_began,
-                            closed=None,
-                            partition_index=0,
-                            agent_compute_step=None,
-                            environment_compute_steps=[],
-                            system_name=context["system_name"],
-                            system_id=context["system_id"],
+                    if creates_event:
+                        event = _create_event(
+                            event_type,
+                            context,
+                            compute_began,
+                            increment_partition,
+                            decorator_type="sync",
                         )
-                        if increment_partition:
-                            event.partition_index = event_store.increment_partition(
-                                context["system_name"],
-                                context["system_id"],
-                                context["system_instance_id"],
-                            )
-                            logger.debug(
-                                f"Incremented partition to: {event.partition_index}"
-                            )
-                        set_current_event(event, decorator_type="sync")
-
-                    # Automatically trace function inputs
-                    bound_args = inspect.signature(func).bind(*args, **kwargs)
-                    bound_args.apply_defaults()
-                    for param, value in bound_args.arguments.items():
-                        if param == "self":
-                            continue
-                        # print("Tracking state - 178")
-                        # synth_tracker_sync.track_state(
-                        #     variable_name=param, variable_value=value, origin=origin
-                        # )
 
                     # Execute the function
                     result = func(*args, **kwargs)
 
-                    # Automatically trace function output
-                    # track_result(result, synth_tracker_sync, origin)
-
                     # Collect traced inputs and outputs
                     traced_inputs, traced_outputs = synth_tracker_sync.get_traced_data()
-
-                    compute_steps_by_origin: Dict[
-                        Literal["agent", "environment"], Dict[str, List[Any]]
-                    ] = {
-                        "agent": {"inputs": [], "outputs": []},
-                        "environment": {"inputs": [], "outputs": []},
-                    }
-
-                    # Organize traced data by origin
-                    # print("N items in traced inputs: ", len(traced_inputs), ["messages" in item for item in traced_inputs], [item.keys() for item in traced_inputs])
-                    for item in traced_inputs:
-                        # print("Item: ", item)
-                        var_origin = item["origin"]
-                        if "variable_value" in item and "variable_name" in item:
-                            # Standard variable input
-                            compute_steps_by_origin[var_origin]["inputs"].append(
-                                ArbitraryInputs(
-                                    inputs={
-                                        item["variable_name"]: item["variable_value"]
-                                    }
-                                )
-                            )
-                            compute_steps_by_origin[var_origin]["finetune"] = (
-                                item["finetune"] if "finetune" in item else False
-                            )
-                            compute_steps_by_origin[var_origin]["model_name"] = (
-                                item["model_name"] if "model_name" in item else None
-                            )
-                            compute_steps_by_origin[var_origin]["model_params"] = (
-                                item["model_params"] if "model_params" in item else None
-                            )
-                        elif "messages" in item:
-                            # Message input from track_lm
-                            compute_steps_by_origin[var_origin]["inputs"].append(
-                                MessageInputs(messages=item["messages"])
-                            )
-                            finetune = finetune_step or item["finetune"]
-                            compute_steps_by_origin[var_origin]["finetune"] = finetune
-
-                            model_name = item["model_name"]
-                            model_params = item["model_params"]
-                            compute_steps_by_origin[var_origin]["model_name"] = (
-                                model_name
-                            )
-                            compute_steps_by_origin[var_origin]["model_params"] = (
-                                model_params
-                            )
-                        else:
-                            logger.warning(f"Unhandled traced input item: {item}")
-
-                    # print("N items in traced outputs: ", len(traced_outputs), ["messages" in item for item in traced_outputs], [item.keys() for item in traced_outputs])
-
-                    # Temporary Kludge
-                    for item in [i for i in traced_outputs if "messages" in i]:
-                        var_origin = item["origin"]
-                        if "variable_value" in item and "variable_name" in item:
-                            # Standard variable output
-                            compute_steps_by_origin[var_origin]["outputs"].append(
-                                ArbitraryOutputs(
-                                    outputs={
-                                        item["variable_name"]: item["variable_value"]
-                                    }
-                                )
-                            )
-                        elif "messages" in item:
-                            # Message output from track_lm
-                            compute_steps_by_origin[var_origin]["outputs"].append(
-                                MessageOutputs(messages=item["messages"])
-                            )
-                        else:
-                            logger.warning(f"Unhandled traced output item: {item}")
-
-                    # Capture compute end time
                     compute_ended = time.time()
-
-                    # Create compute steps grouped by origin
-                    for var_origin in ["agent", "environment"]:
-                        inputs = compute_steps_by_origin[var_origin]["inputs"]
-                        outputs = compute_steps_by_origin[var_origin]["outputs"]
-                        should_learn = (
-                            compute_steps_by_origin[var_origin]["finetune"]
-                            if "finetune" in compute_steps_by_origin[var_origin]
-                            else False
-                        )
-                        model_name = (
-                            compute_steps_by_origin[var_origin]["model_name"]
-                            if "model_name" in compute_steps_by_origin[var_origin]
-                            else None
-                        )
-                        model_params = (
-                            compute_steps_by_origin[var_origin]["model_params"]
-                            if "model_params" in compute_steps_by_origin[var_origin]
-                            else None
-                        )
-                        if inputs or outputs:
-                            event_order = (
-                                1 + len(event.environment_compute_steps) + 1
-                                if event
-                                else 1
-                            )
-                            compute_step = (
-                                AgentComputeStep(
-                                    model_name=model_name,
-                                    model_params=model_params,
-                                    should_learn=should_learn,
-                                    event_order=event_order,
-                                    compute_began=compute_began,
-                                    compute_ended=compute_ended,
-                                    compute_input=inputs,
-                                    compute_output=outputs,
-                                )
-                                if var_origin == "agent"
-                                else EnvironmentComputeStep(
-                                    event_order=event_order,
-                                    compute_began=compute_began,
-                                    compute_ended=compute_ended,
-                                    compute_input=inputs,
-                                    compute_output=outputs,
-                                )
-                            )
-                            if event:
-                                if var_origin == "agent":
-                                    event.agent_compute_step = compute_step
-                                else:
-                                    event.environment_compute_steps.append(compute_step)
+                    _add_compute_steps(
+                        event,
+                        traced_inputs,
+                        traced_outputs,
+                        context["system_instance_id"],
+                        finetune_step,
+                        compute_began,
+                        compute_ended,
+                        variable_model_info=True,
+                        message_outputs_only=True,
+                    )
 
                     # Optionally log the function result
                     if log_result:
                         logger.info(f"Function result: {result}")
 
                     # Handle event management after function execution
-                    if manage_event in ("end", "create_and_end"):
-                        context = get_current_context()
+                    if ends_event:
                         current_event = _local.active_events.get(event_type)
                         if current_event:
                             current_event.closed = compute_ended
@@ -328,7 +377,6 @@ def trace_event_sync(
                             if config.mode == LoggingMode.INSTANT:
                                 client = ImmediateLogClient(config)
                                 client.send_event(current_event, context)
-                            # print("Adding this event: ", current_event)
                             event_store.add_event(
                                 context["system_name"],
                                 context["system_id"],
@@ -336,12 +384,10 @@ def trace_event_sync(
                                 current_event,
                             )
 
-                    # Process retry queue after successful execution
-                    process_retry_queue_sync()
-
                     return result
                 except Exception as e:
                     logger.error(f"Exception in traced function '{func.__name__}': {e}")
+                    _record_error(context, event_type, e)
                     raise
 
         return wrapper
@@ -364,210 +410,81 @@ def trace_event_async(
     """
 
     def decorator(func: Callable) -> Callable:
+        if tracing_switch.disabled:
+            return func
+
+        # Resolve everything that does not change between calls once
+        bound_self = getattr(func, "__self__", None)
+        creates_event = manage_event in ("create", "create_and_end")
+        ends_event = manage_event in ("end", "create_and_end")
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
+            if tracing_switch.disabled:
+                return await func(*args, **kwargs)
+
             # Determine the instance (self) if it's a method
-            if not hasattr(func, "__self__") or not func.__self__:
-                if not args:
-                    raise ValueError(
-                        "Instance method expected, but no arguments were passed."
-                    )
+            if bound_self:
+                self_instance = bound_self
+            elif args:
                 self_instance = args[0]
             else:
-                self_instance = func.__self__
-
-            # Ensure required attributes are present
-            required_attrs = ["system_instance_id", "system_name"]
-            for attr in required_attrs:
-                if not hasattr(self_instance, attr):
-                    raise ValueError(
-                        f"Instance of class '{self_instance.__class__.__name__}' missing required attribute '{attr}'"
-                    )
+                raise ValueError(
+                    "Instance method expected, but no arguments were passed."
+                )
+            context = _instance_context(self_instance)
+            if head_sampler.active and not head_sampler.sample(
+                context["system_instance_id"], event_type, new_event=creates_event
+            ):
+                # Unsampled calls run untraced and capture no messages
+                synth_tracker_async.finalize()
+                return await func(*args, **kwargs)
 
             # Use context manager for setup/cleanup
-            with trace_context(
-                system_name=self_instance.system_name,
-                system_id=get_system_id(self_instance.system_name),
-                system_instance_id=self_instance.system_instance_id,
-            ):
+            with trace_context(**context):
                 # Initialize AsyncTrace
                 synth_tracker_async.initialize()
 
                 event = None
                 compute_began = time.time()
                 try:
-                    if manage_event in ["create", "create_and_end"]:
-                        # Create new event
-                        context = get_current_context()
-                        event = Event(
-                            system_instance_id=context["system_instance_id"],
-                            event_type=event_type,
-                            opened=compute_began,
-                            closed=None,
-                            partition_index=0,
-                            agent_compute_step=None,
-                            environment_compute_steps=[],
-                            system_name=context["system_name"],
-                            system_id=context["system_id"],
+                    if creates_event:
+                        event = _create_event(
+                            event_type,
+                            context,
+                            compute_began,
+                            increment_partition,
+                            decorator_type="async",
                         )
-                        if increment_partition:
-                            event.partition_index = event_store.increment_partition(
-                                context["system_name"],
-                                context["system_id"],
-                                context["system_instance_id"],
-                            )
-                            logger.debug(
-                                f"Incremented partition to: {event.partition_index}"
-                            )
-                        set_current_event(event, decorator_type="async")
-
-                    # Automatically trace function inputs
-                    bound_args = inspect.signature(func).bind(*args, **kwargs)
-                    bound_args.apply_defaults()
-                    for param, value in bound_args.arguments.items():
-                        if param == "self":
-                            continue
-                        # print("Tracking state - 412")
-                        # synth_tracker_async.track_state(
-                        #     variable_name=param,
-                        #     variable_value=value,
-                        #     origin=origin,
-                        #     io_type="input",
-                        # )
 
                     # Execute the coroutine
                     result = await func(*args, **kwargs)
 
-                    # Automatically trace function output
-                    # track_result(result, synth_tracker_async, origin)
-
                     # Collect traced inputs and outputs
                     traced_inputs, traced_outputs = (
                         synth_tracker_async.get_traced_data()
                     )
-
-                    compute_steps_by_origin: Dict[
-                        Literal["agent", "environment"], Dict[str, List[Any]]
-                    ] = {
-                        "agent": {"inputs": [], "outputs": []},
-                        "environment": {"inputs": [], "outputs": []},
-                    }
-
-                    # Organize traced data by origin
-                    for item in traced_inputs:
-                        var_origin = item["origin"]
-                        if "variable_value" in item and "variable_name" in item:
-                            # Standard variable input
-                            compute_steps_by_origin[var_origin]["inputs"].append(
-                                ArbitraryInputs(
-                                    inputs={
-                                        item["variable_name"]: item["variable_value"]
-                                    }
-                                )
-                            )
-                        elif "messages" in item:
-                            # Message input from track_lm
-                            compute_steps_by_origin[var_origin]["inputs"].append(
-                                MessageInputs(messages=item["messages"])
-                            )
-                            # compute_steps_by_origin[var_origin]["inputs"].append(
-                            #     ArbitraryInputs(
-                            #         inputs={"model_name": item["model_name"]}
-                            #     )
-                            # )
-                            finetune = finetune_step or item["finetune"]
-                            compute_steps_by_origin[var_origin]["finetune"] = finetune
-
-                            model_name = item["model_name"]
-                            model_params = item["model_params"]
-                            compute_steps_by_origin[var_origin]["model_name"] = (
-                                model_name
-                            )
-                            compute_steps_by_origin[var_origin]["model_params"] = (
-                                model_params
-                            )
-                        else:
-                            logger.warning(f"Unhandled traced input item: {item}")
-
-                    for item in traced_outputs:
-                        var_origin = item["origin"]
-                        if "variable_value" in item and "variable_name" in item:
-                            # Standard variable output
-                            compute_steps_by_origin[var_origin]["outputs"].append(
-                                ArbitraryOutputs(
-                                    outputs={
-                                        item["variable_name"]: item["variable_value"]
-                                    }
-                                )
-                            )
-                        elif "messages" in item:
-                            # Message output from track_lm
-                            compute_steps_by_origin[var_origin]["outputs"].append(
-                                MessageOutputs(messages=item["messages"])
-                            )
-                        else:
-                            logger.warning(f"Unhandled traced output item: {item}")
-
                     compute_ended = time.time()
-                    # Create compute steps grouped by origin
-                    for var_origin in ["agent", "environment"]:
-                        inputs = compute_steps_by_origin[var_origin]["inputs"]
-                        outputs = compute_steps_by_origin[var_origin]["outputs"]
-                        model_name = (
-                            compute_steps_by_origin[var_origin]["model_name"]
-                            if "model_name" in compute_steps_by_origin[var_origin]
-                            else None
-                        )
-                        model_params = (
-                            compute_steps_by_origin[var_origin]["model_params"]
-                            if "model_params" in compute_steps_by_origin[var_origin]
-                            else None
-                        )
-                        should_learn = (
-                            compute_steps_by_origin[var_origin]["finetune"]
-                            if "finetune" in compute_steps_by_origin[var_origin]
-                            else False
-                        )
-                        if inputs or outputs:
-                            event_order = (
-                                1 + len(event.environment_compute_steps) + 1
-                                if event
-                                else 1
-                            )
-                            compute_step = (
-                                AgentComputeStep(
-                                    model_name=model_name,
-                                    model_params=model_params,
-                                    should_learn=should_learn,
-                                    event_order=event_order,
-                                    compute_began=compute_began,
-                                    compute_ended=compute_ended,
-                                    compute_input=inputs,
-                                    compute_output=outputs,
-                                )
-                                if var_origin == "agent"
-                                else EnvironmentComputeStep(
-                                    event_order=event_order,
-                                    compute_began=compute_began,
-                                    compute_ended=compute_ended,
-                                    compute_input=inputs,
-                                    compute_output=outputs,
-                                )
-                            )
-                            if event:
-                                if var_origin == "agent":
-                                    event.agent_compute_step = compute_step
-                                else:
-                                    event.environment_compute_steps.append(compute_step)
+                    _add_compute_steps(
+                        event,
+                        traced_inputs,
+                        traced_outputs,
+                        context["system_instance_id"],
+                        finetune_step,
+                        compute_began,
+                        compute_ended,
+                        variable_model_info=False,
+                        message_outputs_only=False,
+                    )
 
                     # Optionally log the function result
                     if log_result:
                         logger.info(f"Function result: {result}")
 
                     # Handle event management after function execution
-                    if manage_event in ["end", "create_and_end"]:
-                        context = get_current_context()
-                        current_event = active_events_var.get().get(event_type)
+                    if ends_event:
+                        active_events = active_events_var.get()
+                        current_event = active_events.get(event_type)
                         if current_event:
                             current_event.closed = compute_ended
 
@@ -586,16 +503,13 @@ def trace_event_async(
                                 context["system_instance_id"],
                                 current_event,
                             )
-                            active_events = active_events_var.get()
                             del active_events[event_type]
                             active_events_var.set(active_events)
 
-                    # Process retry queue after successful execution
-                    await process_retry_queue_async()
-
                     return result
                 except Exception as e:
                     logger.error(f"Exception in traced function '{func.__name__}': {e}")
+                    _record_error(context, event_type, e)
                     raise
 
         return async_wrapper
@@ -0,0 +1,275 @@
+import bisect
+from datetime import datetime
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from synth_sdk.tracing.abstractions import Event
+
+DEFAULT_TIME_BUCKET_SECONDS = 60.0
+# Approximate memory the indexes hold per event (tracemalloc, CPython 3.11),
+# counted against the event store's byte budget while indexing is enabled
+INDEX_BYTES_PER_EVENT = 620
+
+# Order of the keys each event is indexed under
+_INDEX_NAMES = (
+    "event_type",
+    "model_name",
+    "system_name",
+    "system_instance_id",
+    "opened_bucket",
+    "closed_bucket",
+)
+_EQUALITY_NAMES = _INDEX_NAMES[:4]
+
+Timestamp = Union[float, datetime]
+
+
+def _to_seconds(value: Optional[Timestamp]) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def _model_name(event: Event) -> Optional[str]:
+    step = event.agent_compute_step
+    return step.model_name if step is not None else None
+
+
+class EventIndex:
+    """Secondary indexes over stored events, maintained incrementally.
+
+    Events are indexed by event_type, agent model_name, system_name,
+    system_instance_id and by the time bucket of their opened/closed
+    timestamps. Each posting is an insertion-ordered dict keyed by id(event),
+    so events can also be removed in constant time. The time bucket keys are
+    also kept sorted, so time-range queries bisect to the matching buckets.
+    Adding an event again re-keys it, e.g. once it has been closed.
+    """
+
+    def __init__(self, time_bucket_seconds: float = DEFAULT_TIME_BUCKET_SECONDS):
+        self.time_bucket_seconds = time_bucket_seconds
+        self._indexes: Dict[str, Dict[Hashable, Dict[int, Event]]] = {
+            name: {} for name in _INDEX_NAMES
+        }
+        # id(event) -> keys it was indexed under, in _INDEX_NAMES order, so
+        # removal matches insertion
+        self._event_keys: Dict[int, Tuple[Hashable, ...]] = {}
+        # Sorted non-null keys of the time bucket indexes
+        self._sorted_buckets: Dict[str, List[int]] = {
+            "opened_bucket": [],
+            "closed_bucket": [],
+        }
+
+    def _bucket(self, timestamp: Optional[Timestamp]) -> Optional[int]:
+        seconds = _to_seconds(timestamp)
+        if seconds is None:
+            return None
+        return int(seconds // self.time_bucket_seconds)
+
+    def _keys(
+        self, event: Event, system_name: Optional[str], system_instance_id: str
+    ) -> Tuple[Hashable, ...]:
+        return (
+            event.event_type,
+            _model_name(event),
+            system_name,
+            system_instance_id,
+            self._bucket(event.opened),
+            self._bucket(event.closed),
+        )
+
+    def add(
+        self,
+        event: Event,
+        system_name: Optional[str] = None,
+        system_instance_id: Optional[str] = None,
+    ) -> None:
+        """Index an event stored under the given system, or re-key it if changed."""
+        keys = self._keys(
+            event,
+            system_name or event.system_name,
+            system_instance_id or event.system_instance_id,
+        )
+        previous = self._event_keys.get(id(event))
+        if previous is not None:
+            if previous == keys:
+                return
+            # e.g. closed since it was indexed
+            self.remove(event)
+        self._event_keys[id(event)] = keys
+        for name, key in zip(_INDEX_NAMES, keys):
+            postings = self._indexes[name].get(key)
+            if postings is None:
+                postings = self._indexes[name][key] = {}
+                if name in self._sorted_buckets and key is not None:
+                    bisect.insort(self._sorted_buckets[name], key)
+            postings[id(event)] = event
+
+    def remove(self, event: Event) -> None:
+        """Remove an event previously passed to add."""
+        keys = self._event_keys.pop(id(event), None)
+        if keys is None:
+            return
+        for name, key in zip(_INDEX_NAMES, keys):
+            postings = self._indexes[name].get(key)
+            if postings is not None:
+                postings.pop(id(event), None)
+                if not postings:
+                    del self._indexes[name][key]
+                    if name in self._sorted_buckets and key is not None:
+                        sorted_keys = self._sorted_buckets[name]
+                        del sorted_keys[bisect.bisect_left(sorted_keys, key)]
+
+    def _bucket_range(
+        self,
+        name: str,
+        after: Optional[float],
+        before: Optional[float],
+    ) -> Iterable[Event]:
+        """Yield events bucketed within [after, before]; None is unbounded."""
+        buckets = self._indexes[name]
+        sorted_keys = self._sorted_buckets[name]
+        start = (
+            0 if after is None else bisect.bisect_left(sorted_keys, self._bucket(after))
+        )
+        stop = (
+            len(sorted_keys)
+            if before is None
+            else bisect.bisect_right(sorted_keys, self._bucket(before))
+        )
+        for key in sorted_keys[start:stop]:
+            yield from buckets[key].values()
+
+    def query(
+        self,
+        event_type: Optional[str] = None,
+        model_name: Optional[str] = None,
+        system_name: Optional[str] = None,
+        system_instance_id: Optional[str] = None,
+        opened_after: Optional[Timestamp] = None,
+        opened_before: Optional[Timestamp] = None,
+        closed_after: Optional[Timestamp] = None,
+        closed_before: Optional[Timestamp] = None,
+    ) -> List[Event]:
+        """Return indexed events matching every given criterion.
+
+        Time bounds are inclusive. The smallest matching posting is scanned
+        and the remaining criteria are checked per event, so cost grows with
+        the size of the narrowest criterion rather than with the store.
+        """
+        opened_after, opened_before = (
+            _to_seconds(opened_after),
+            _to_seconds(opened_before),
+        )
+        closed_after, closed_before = (
+            _to_seconds(closed_after),
+            _to_seconds(closed_before),
+        )
+
+        equality = {
+            "event_type": event_type,
+            "model_name": model_name,
+            "system_name": system_name,
+            "system_instance_id": system_instance_id,
+        }
+        candidates: Optional[Iterable[Event]] = None
+        smallest = None
+        for name, value in equality.items():
+            if value is None:
+                continue
+            postings = self._indexes[name].get(value, {})
+            if smallest is None or len(postings) < len(smallest):
+                smallest = postings
+        if smallest is not None:
+            candidates = smallest.values()
+        elif opened_after is not None or opened_before is not None:
+            candidates = self._bucket_range(
+                "opened_bucket", opened_after, opened_before
+            )
+        elif closed_after is not None or closed_before is not None:
+            candidates = self._bucket_range(
+                "closed_bucket", closed_after, closed_before
+            )
+        else:
+            candidates = (
+                event
+                for postings in self._indexes["event_type"].values()
+                for event in postings.values()
+            )
+
+        return _select(
+            ((event, self._event_keys[id(event)]) for event in candidates),
+            equality,
+            opened_after,
+            opened_before,
+            closed_after,
+            closed_before,
+        )
+
+    def __len__(self) -> int:
+        return len(self._event_keys)
+
+
+def _select(
+    entries: Iterable[Tuple[Event, Tuple[Hashable, ...]]],
+    equality: Dict[str, Optional[Hashable]],
+    opened_after: Optional[float],
+    opened_before: Optional[float],
+    closed_after: Optional[float],
+    closed_before: Optional[float],
+) -> List[Event]:
+    """Return the events whose keys and timestamps match every given criterion."""
+    wanted = [
+        (position, equality[name])
+        for position, name in enumerate(_EQUALITY_NAMES)
+        if equality[name] is not None
+    ]
+    results = []
+    for event, keys in entries:
+        if any(keys[position] != value for position, value in wanted):
+            continue
+        opened = _to_seconds(event.opened)
+        closed = _to_seconds(event.closed)
+        if opened_after is not None and (opened is None or opened < opened_after):
+            continue
+        if opened_before is not None and (opened is None or opened > opened_before):
+            continue
+        if closed_after is not None and (closed is None or closed < closed_after):
+            continue
+        if closed_before is not None and (closed is None or closed > closed_before):
+            continue
+        results.append(event)
+    return results
+
+
+def scan_events(
+    entries: Iterable[Tuple[Event, Optional[str], str]],
+    event_type: Optional[str] = None,
+    model_name: Optional[str] = None,
+    system_name: Optional[str] = None,
+    system_instance_id: Optional[str] = None,
+    opened_after: Optional[Timestamp] = None,
+    opened_before: Optional[Timestamp] = None,
+    closed_after: Optional[Timestamp] = None,
+    closed_before: Optional[Timestamp] = None,
+) -> List[Event]:
+    """Filter (event, system_name, system_instance_id) entries like EventIndex.query.
+
+    Used when no index is maintained; cost grows with the number of entries.
+    """
+    equality = {
+        "event_type": event_type,
+        "model_name": model_name,
+        "system_name": system_name,
+        "system_instance_id": system_instance_id,
+    }
+    return _select(
+        (
+            (event, (event.event_type, _model_name(event), name, instance_id))
+            for event, name, instance_id in entries
+        ),
+        equality,
+        _to_seconds(opened_after),
+        _to_seconds(opened_before),
+        _to_seconds(closed_after),
+        _to_seconds(closed_before),
+    )
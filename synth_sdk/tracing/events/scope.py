@@ -14,6 +14,7 @@ from synth_sdk.tracing.immediate_client import (
     AsyncImmediateLogClient,
     ImmediateLogClient,
 )
+from synth_sdk.tracing.kill_switch import tracing_switch
 from synth_sdk.tracing.local import (
     system_id_var,
     system_instance_id_var,
@@ -29,7 +30,22 @@ def event_scope(event_type: str):
     Usage:
         with event_scope("my_event_type"):
             # do stuff
+
+    While tracing is disabled the event is yielded but neither made current
+    nor stored.
     """
+    if tracing_switch.disabled:
+        yield Event(
+            system_instance_id=None,
+            event_type=event_type,
+            opened=time.time(),
+            closed=None,
+            partition_index=0,
+            agent_compute_step=None,
+            environment_compute_steps=[],
+        )
+        return
+
     # Check if we're in an async context
     try:
         import asyncio
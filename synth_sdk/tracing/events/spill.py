@@ -0,0 +1,127 @@
+import logging
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import weakref
+from dataclasses import dataclass
+from threading import Lock
+from typing import List, Optional
+
+from synth_sdk.tracing.abstractions import EventPartitionElement
+
+logger = logging.getLogger(__name__)
+
+# Records are stored as a 4-byte big-endian length followed by a pickled partition
+_LENGTH_PREFIX = struct.Struct(">I")
+
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SpillRef:
+    """Location of a spilled partition inside a segment file."""
+
+    segment_path: str
+    offset: int
+    length: int
+    partition_index: int
+
+
+def _remove_segments(paths: List[str], spill_dir: str, owns_dir: bool) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if owns_dir:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+class SpillSegments:
+    """Append-only segment files holding partitions spilled out of memory.
+
+    The segment files are deleted by close(), or at interpreter exit if the
+    segments are never closed.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES,
+    ):
+        self._owns_dir = spill_dir is None
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="synth_sdk_spill_")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = Lock()
+        self._segment_number = 0
+        self._segment_path: Optional[str] = None
+        self._segment_file = None
+        self._segment_size = 0
+        self._paths: List[str] = []
+        self._remove = weakref.finalize(
+            self, _remove_segments, self._paths, self.spill_dir, self._owns_dir
+        )
+
+    def _roll_segment(self) -> None:
+        if self._segment_file is not None:
+            self._segment_file.close()
+        self._segment_number += 1
+        self._segment_path = os.path.join(
+            self.spill_dir, f"segment-{os.getpid()}-{self._segment_number:06d}.bin"
+        )
+        self._segment_file = open(self._segment_path, "ab")
+        self._paths.append(self._segment_path)
+        self._segment_size = 0
+
+    def write(self, partition: EventPartitionElement) -> SpillRef:
+        """Append a partition to the current segment and return its location."""
+        record = pickle.dumps(partition, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if (
+                self._segment_file is None
+                or self._segment_size + len(record) > self.segment_max_bytes
+            ):
+                self._roll_segment()
+            offset = self._segment_size
+            self._segment_file.write(_LENGTH_PREFIX.pack(len(record)))
+            self._segment_file.write(record)
+            # Flush so readers opening the segment see the complete record
+            self._segment_file.flush()
+            self._segment_size += _LENGTH_PREFIX.size + len(record)
+            return SpillRef(
+                segment_path=self._segment_path,
+                offset=offset,
+                length=len(record),
+                partition_index=partition.partition_index,
+            )
+
+    @staticmethod
+    def read(ref: SpillRef) -> EventPartitionElement:
+        """Load a spilled partition back into memory."""
+        with open(ref.segment_path, "rb") as f:
+            f.seek(ref.offset)
+            (length,) = _LENGTH_PREFIX.unpack(f.read(_LENGTH_PREFIX.size))
+            if length != ref.length:
+                raise ValueError(
+                    f"Corrupt spill record in {ref.segment_path} at offset {ref.offset}"
+                )
+            return pickle.loads(f.read(length))
+
+    @staticmethod
+    def read_all(refs: List[SpillRef]) -> List[EventPartitionElement]:
+        """Load several spilled partitions, in the order given."""
+        return [SpillSegments.read(ref) for ref in refs]
+
+    def close(self) -> None:
+        """Close the open segment and delete the segment files it wrote.
+
+        A spill directory created by this instance is removed as well.
+        """
+        with self._lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+            self._remove()
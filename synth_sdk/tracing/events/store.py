@@ -1,24 +1,592 @@
-import json
+import io
+import itertools
 import logging
+import os
+import pickle
 import time
-from threading import RLock  # Change this import
-from typing import Dict, List
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import threading
+from threading import Lock, RLock  # Change this import
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
 
 from synth_sdk.tracing.abstractions import Event, EventPartitionElement, SystemTrace
+from synth_sdk.tracing.events.index import (
+    DEFAULT_TIME_BUCKET_SECONDS,
+    INDEX_BYTES_PER_EVENT,
+    EventIndex,
+    Timestamp,
+    scan_events,
+)
+from synth_sdk.tracing.events.spill import SpillRef, SpillSegments
+from synth_sdk.tracing.events.wal import WriteAheadLog, read_wal
 from synth_sdk.tracing.local import (  # Import context variables
     _local,
     active_events_var,
 )
+from synth_sdk.tracing.message_deltas import conversation_delta_encoder
+from synth_sdk.tracing.sampling import head_sampler
+from synth_sdk.tracing.serialization import serializer
 
 logger = logging.getLogger(__name__)
 
+# Number of lock stripes used by the global event store
+DEFAULT_NUM_SHARDS = 16
+# Events a thread buffers before merging them into the store itself
+DEFAULT_BUFFER_BATCH_SIZE = 256
+
+
+def _sort_time(timestamp: Optional[Timestamp]) -> float:
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return timestamp if timestamp is not None else float("inf")
+
+
+class _EventStoreShard:
+    """A single lock stripe of the event store."""
+
+    __slots__ = (
+        "traces",
+        "created",
+        "spilled",
+        "partition_bytes",
+        "drained_index",
+        "inflight",
+        "index",
+        "lock",
+    )
 
-class EventStore:
     def __init__(self):
-        self._traces: Dict[str, SystemTrace] = {}
-        self._lock = RLock()  # Use RLock instead of Lock
+        self.traces: Dict[str, SystemTrace] = {}
+        self.created: Dict[str, int] = {}  # system_instance_id -> creation sequence
+        # system_instance_id -> partition_index -> spilled records, oldest first
+        self.spilled: Dict[str, Dict[int, List[SpillRef]]] = {}
+        # system_instance_id -> partition_index -> estimated in-memory bytes
+        self.partition_bytes: Dict[str, Dict[int, int]] = {}
+        # system_instance_id -> current_partition_index when the trace was drained
+        self.drained_index: Dict[str, int] = {}
+        # Drained instances whose last drained trace had partitions still
+        # waiting for their events
+        self.inflight: Set[str] = set()
+        self.index = EventIndex()
+        self.lock = RLock()
+
+
+class _EventBuffer:
+    """Closed events appended by one thread, waiting to be merged.
+
+    Only the owning thread appends and any thread may pop; deque appends and
+    pops are atomic, so neither side takes a lock.
+    """
+
+    __slots__ = ("events", "thread")
+
+    def __init__(self):
+        self.events = deque()
+        self.thread = threading.current_thread()
+
+
+class EventStore:
+    """Stores system traces, sharded by system_instance_id.
+
+    Each system_instance_id hashes to one of `num_shards` lock stripes, so
+    agents running on different instances never contend on the same lock.
+    Operations over the whole store lock every shard to get a consistent view.
+
+    An optional memory budget (in events and/or estimated bytes) bounds the
+    store. When it is exceeded, closed partitions are spilled to append-only
+    segment files and read back transparently by get_system_traces.
+
+    Secondary indexes for query_events are only maintained once
+    enable_indexing() is called.
+    """
+
+    def __init__(
+        self,
+        num_shards: int = DEFAULT_NUM_SHARDS,
+        max_events_in_memory: Optional[int] = None,
+        max_bytes_in_memory: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ):
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        self._shards: List[_EventStoreShard] = [
+            _EventStoreShard() for _ in range(num_shards)
+        ]
+        self._sequence = itertools.count()
         self.logger = logging.getLogger(__name__)
 
+        self._budget_lock = Lock()
+        self._spill_lock = Lock()
+        self._events_in_memory = 0
+        self._bytes_in_memory = 0
+        self._segments: Optional[SpillSegments] = None
+        # Segments detached by drain() are deleted once no export reads them
+        self._segments_lock = Lock()
+        self._segment_readers = 0
+        self._retired_segments: List[SpillSegments] = []
+        self.set_memory_budget(max_events_in_memory, max_bytes_in_memory, spill_dir)
+        self._wal: Optional[WriteAheadLog] = None
+        # Held while a logged event is stored and appended, and by drain(), so
+        # the log always holds exactly the logged events still in the store
+        self._wal_lock = Lock()
+
+        self._buffering = False
+        self._buffer_batch_size = DEFAULT_BUFFER_BATCH_SIZE
+        self._local_buffer = threading.local()
+        self._buffers: List[_EventBuffer] = []
+        self._buffers_lock = Lock()
+        # system_instance_id -> partition index allocator used while buffering
+        self._partition_counters: Dict[str, Iterator[int]] = {}
+
+        self._indexing = False
+        self._index_bucket_seconds = DEFAULT_TIME_BUCKET_SECONDS
+
+        # Open TailSamplers that judge traces by their errors, see record_error
+        self._error_recorders = 0
+        self._error_recorders_lock = Lock()
+
+    def set_memory_budget(
+        self,
+        max_events: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        """Bound the events kept in memory; closed partitions beyond it spill to disk.
+
+        Args:
+            max_events: Maximum number of events to keep in memory, or None
+            max_bytes: Maximum estimated event bytes to keep in memory, or None
+            spill_dir: Directory for segment files (a temp dir if None)
+        """
+        if max_events is not None and max_events < 0:
+            raise ValueError("max_events must be non-negative")
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("max_bytes must be non-negative")
+        self.max_events_in_memory = max_events
+        self.max_bytes_in_memory = max_bytes
+        self.spill_dir = spill_dir
+
+    def enable_indexing(
+        self, time_bucket_seconds: float = DEFAULT_TIME_BUCKET_SECONDS
+    ) -> None:
+        """Maintain secondary indexes over stored events for query_events.
+
+        Events already held in memory are indexed right away. Indexing adds a
+        few microseconds to every added event, and its memory is counted
+        against the byte budget (INDEX_BYTES_PER_EVENT per event).
+        """
+        with self._all_shards_locked():
+            self.flush_buffers()
+            accounted = self._indexing
+            self._index_bucket_seconds = time_bucket_seconds
+            self._indexing = True
+            for shard in self._shards:
+                shard.index = EventIndex(time_bucket_seconds)
+                for system_instance_id, trace in shard.traces.items():
+                    for partition in trace.partition:
+                        for event in partition.events:
+                            shard.index.add(
+                                event, trace.system_name, system_instance_id
+                            )
+                        if not accounted:
+                            self._account_index(
+                                shard,
+                                system_instance_id,
+                                partition,
+                                len(partition.events),
+                            )
+        if self._over_budget():
+            self._spill()
+
+    def disable_indexing(self) -> None:
+        """Stop maintaining the secondary indexes and release their memory."""
+        with self._all_shards_locked():
+            if not self._indexing:
+                return
+            self._indexing = False
+            for shard in self._shards:
+                for system_instance_id, trace in shard.traces.items():
+                    for partition in trace.partition:
+                        self._account_index(
+                            shard, system_instance_id, partition, -len(partition.events)
+                        )
+                shard.index = EventIndex(self._index_bucket_seconds)
+
+    def _account_index(
+        self,
+        shard: _EventStoreShard,
+        system_instance_id: str,
+        partition: EventPartitionElement,
+        events: int,
+    ) -> None:
+        """Add (or remove, if negative) the index memory of a partition's events.
+
+        Callers must hold the shard lock.
+        """
+        if self.max_bytes_in_memory is None or not events:
+            return
+        size = events * INDEX_BYTES_PER_EVENT
+        sizes = shard.partition_bytes.setdefault(system_instance_id, {})
+        sizes[partition.partition_index] = max(
+            0, sizes.get(partition.partition_index, 0) + size
+        )
+        with self._budget_lock:
+            self._bytes_in_memory = max(0, self._bytes_in_memory + size)
+
+    def enable_buffering(self, batch_size: int = DEFAULT_BUFFER_BATCH_SIZE) -> None:
+        """Buffer added events per thread and merge them into the store in batches.
+
+        While buffering, add_event and increment_partition take no store lock
+        in the common case: each thread appends to its own buffer, which is
+        merged once it holds batch_size events, and before any read of the
+        whole store (get_system_traces, drain, query_events, ...).
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self._buffer_batch_size = batch_size
+        self._buffering = True
+
+    def disable_buffering(self) -> None:
+        """Merge all buffered events and go back to locking on every call."""
+        self._buffering = False
+        self.flush_buffers()
+        counters, self._partition_counters = self._partition_counters, {}
+        for system_instance_id, counter in counters.items():
+            shard = self._shard_for(system_instance_id)
+            with shard.lock:
+                trace = shard.traces.get(system_instance_id)
+                if trace is not None:
+                    # Continue after the last index handed out by the allocator
+                    trace.current_partition_index = max(
+                        trace.current_partition_index, next(counter) - 1
+                    )
+
+    def _get_local_buffer(self) -> _EventBuffer:
+        buffer = getattr(self._local_buffer, "buffer", None)
+        if buffer is None:
+            buffer = self._local_buffer.buffer = _EventBuffer()
+            with self._buffers_lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def flush_buffers(self) -> None:
+        """Merge events buffered by every thread into the store."""
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+            # Forget buffers of finished threads; they are drained below
+            self._buffers = [b for b in buffers if b.thread.is_alive()]
+        for buffer in buffers:
+            self._merge_buffer(buffer)
+
+    def _merge_buffer(self, buffer: _EventBuffer) -> None:
+        by_shard: Dict[int, List[Tuple[str, str, str, Event]]] = {}
+        events = buffer.events
+        while True:
+            try:
+                record = events.popleft()
+            except IndexError:
+                break
+            shard_number = hash(record[2]) % len(self._shards)
+            by_shard.setdefault(shard_number, []).append(record)
+
+        for shard_number, records in by_shard.items():
+            shard = self._shards[shard_number]
+            with shard.lock:
+                for system_name, system_id, system_instance_id, event in records:
+                    self._insert_event(
+                        shard,
+                        system_name,
+                        system_id,
+                        system_instance_id,
+                        event,
+                        create_partition=True,
+                    )
+        if by_shard and self._over_budget():
+            self._spill()
+
+    def _allocate_partition(
+        self, system_name: str, system_id: str, system_instance_id: str
+    ) -> int:
+        """Hand out the next partition index without locking the store."""
+        while True:
+            counter = self._partition_counters.get(system_instance_id)
+            if counter is None:
+                shard = self._shard_for(system_instance_id)
+                with shard.lock:
+                    counter = self._partition_counters.get(system_instance_id)
+                    if counter is None:
+                        system_trace = self.get_or_create_system_trace(
+                            system_name,
+                            system_id,
+                            system_instance_id,
+                            _already_locked=True,
+                        )
+                        counter = self._partition_counters[system_instance_id] = (
+                            itertools.count(system_trace.current_partition_index + 1)
+                        )
+            # next() on itertools.count is atomic, so concurrent callers never collide
+            partition_index = next(counter)
+            # drain() may have swapped the allocator out before seeing this index
+            if self._partition_counters.get(system_instance_id) is counter:
+                return partition_index
+
+    def enable_wal(self, path: str, recover: bool = True, **wal_kwargs) -> None:
+        """Log every closed event added to the store to a crash-durable file.
+
+        Args:
+            path: Location of the write-ahead log file
+            recover: Load events already present in the log into the store first
+            **wal_kwargs: Passed to WriteAheadLog (fsync_bytes, fsync_interval, ...)
+        """
+        self.disable_wal()
+        if recover and os.path.exists(path):
+            self.recover_from_wal(path)
+        self._wal = WriteAheadLog(path, **wal_kwargs)
+
+    def disable_wal(self) -> None:
+        """Sync and close the write-ahead log, if one is enabled."""
+        with self._wal_lock:
+            wal, self._wal = self._wal, None
+        if wal is not None:
+            wal.close()
+
+    def recover_from_wal(self, path: str) -> List[SystemTrace]:
+        """Rebuild system traces from a write-ahead log into this store.
+
+        Returns:
+            The traces touched by the recovered events
+        """
+        recovered: Dict[str, SystemTrace] = {}
+        for system_name, system_id, system_instance_id, event in read_wal(path):
+            shard = self._shard_for(system_instance_id)
+            with shard.lock:
+                system_trace = self.get_or_create_system_trace(
+                    system_name, system_id, system_instance_id, _already_locked=True
+                )
+                partition = system_trace.get_partition(event.partition_index)
+                if partition is None:
+                    partition = EventPartitionElement(
+                        partition_index=event.partition_index, events=[]
+                    )
+                    system_trace.add_partition(partition)
+                partition.events.append(event)
+                system_trace.current_partition_index = max(
+                    system_trace.current_partition_index, event.partition_index
+                )
+                self._account_event(shard, system_instance_id, event)
+                if self._indexing:
+                    shard.index.add(event, system_name, system_instance_id)
+            recovered[system_instance_id] = system_trace
+        self.logger.info(f"Recovered {len(recovered)} system traces from {path}")
+        return list(recovered.values())
+
+    def _get_segments(self) -> SpillSegments:
+        if self._segments is None:
+            self._segments = SpillSegments(self.spill_dir)
+        return self._segments
+
+    def _over_budget(self) -> bool:
+        return (
+            self.max_events_in_memory is not None
+            and self._events_in_memory > self.max_events_in_memory
+        ) or (
+            self.max_bytes_in_memory is not None
+            and self._bytes_in_memory > self.max_bytes_in_memory
+        )
+
+    def _account_event(
+        self, shard: _EventStoreShard, system_instance_id: str, event: Event
+    ) -> None:
+        """Record an added event against the memory budget.
+
+        Callers must hold the shard lock.
+        """
+        size = 0
+        if self.max_bytes_in_memory is not None:
+            size = len(pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL))
+            if self._indexing:
+                size += INDEX_BYTES_PER_EVENT
+            sizes = shard.partition_bytes.setdefault(system_instance_id, {})
+            sizes[event.partition_index] = sizes.get(event.partition_index, 0) + size
+        with self._budget_lock:
+            self._events_in_memory += 1
+            self._bytes_in_memory += size
+
+    def _spill(self) -> None:
+        """Spill closed partitions to disk until the store is back under budget."""
+        if not self._spill_lock.acquire(blocking=False):
+            # Another thread is already spilling
+            return
+        try:
+            for shard in self._shards:
+                with shard.lock:
+                    for system_instance_id, trace in shard.traces.items():
+                        for partition in list(trace.partition):
+                            if not self._over_budget():
+                                return
+                            if (
+                                partition.partition_index
+                                >= trace.current_partition_index
+                                or not partition.events
+                                or any(e.closed is None for e in partition.events)
+                            ):
+                                # Still open; later events may land here
+                                continue
+                            self._spill_partition(
+                                shard, system_instance_id, trace, partition
+                            )
+        finally:
+            self._spill_lock.release()
+
+    def _spill_partition(
+        self,
+        shard: _EventStoreShard,
+        system_instance_id: str,
+        trace: SystemTrace,
+        partition: EventPartitionElement,
+    ) -> None:
+        """Move one partition to a segment file. Callers must hold the shard lock."""
+        ref = self._get_segments().write(partition)
+        shard.spilled.setdefault(system_instance_id, {}).setdefault(
+            partition.partition_index, []
+        ).append(ref)
+        trace.remove_partition(partition)
+        for event in partition.events:
+            # Only events held in memory stay queryable
+            shard.index.remove(event)
+        size = shard.partition_bytes.get(system_instance_id, {}).pop(
+            partition.partition_index, 0
+        )
+        with self._budget_lock:
+            self._events_in_memory -= len(partition.events)
+            self._bytes_in_memory -= size
+
+    def _materialize(self, shard: _EventStoreShard, trace: SystemTrace) -> SystemTrace:
+        """Return the trace with its spilled partitions read back from disk.
+
+        Traces without spilled partitions are returned as-is. Callers must hold
+        the shard lock.
+        """
+        spilled = shard.spilled.get(trace.system_instance_id)
+        if not spilled:
+            return trace
+        return self._merge_spilled(trace, spilled)
+
+    def _snapshot_trace(
+        self, shard: _EventStoreShard, trace: SystemTrace
+    ) -> Tuple[SystemTrace, Dict[int, List[SpillRef]]]:
+        """Copy the references making up a trace so it can be read without locks.
+
+        Returns a shallow copy of the trace and of its spilled records. Callers
+        must hold the shard lock.
+        """
+        snapshot = SystemTrace(
+            system_name=trace.system_name,
+            system_id=trace.system_id,
+            system_instance_id=trace.system_instance_id,
+            metadata=trace.metadata,
+            partition=[
+                EventPartitionElement(
+                    partition_index=p.partition_index, events=list(p.events)
+                )
+                for p in trace.partition
+            ],
+            current_partition_index=trace.current_partition_index,
+        )
+        spilled = {
+            partition_index: list(refs)
+            for partition_index, refs in shard.spilled.get(
+                trace.system_instance_id, {}
+            ).items()
+        }
+        return snapshot, spilled
+
+    def _merge_spilled(
+        self, trace: SystemTrace, spilled: Dict[int, List[SpillRef]]
+    ) -> SystemTrace:
+        """Build a copy of the trace with the given spilled partitions merged in."""
+        events_by_index: Dict[int, List[Event]] = {}
+        for partition_index, refs in spilled.items():
+            for ref in refs:
+                events_by_index.setdefault(partition_index, []).extend(
+                    SpillSegments.read(ref).events
+                )
+        for partition in trace.partition:
+            events_by_index.setdefault(partition.partition_index, []).extend(
+                partition.events
+            )
+
+        return SystemTrace(
+            system_name=trace.system_name,
+            system_id=trace.system_id,
+            system_instance_id=trace.system_instance_id,
+            metadata=trace.metadata,
+            partition=[
+                EventPartitionElement(partition_index=index, events=events)
+                for index, events in sorted(events_by_index.items())
+            ],
+            current_partition_index=trace.current_partition_index,
+        )
+
+    def _retire_segments(self, segments: SpillSegments) -> None:
+        """Delete drained segment files, or defer it while an export reads them."""
+        with self._segments_lock:
+            if self._segment_readers:
+                self._retired_segments.append(segments)
+                return
+        segments.close()
+
+    def _release_segments(self) -> None:
+        """End a read of spilled segments started under the shard locks."""
+        with self._segments_lock:
+            self._segment_readers -= 1
+            if self._segment_readers:
+                return
+            retired, self._retired_segments = self._retired_segments, []
+        for segments in retired:
+            segments.close()
+
+    def _shard_for(self, system_instance_id: str) -> _EventStoreShard:
+        """Return the shard responsible for the given system_instance_id."""
+        return self._shards[hash(system_instance_id) % len(self._shards)]
+
+    @contextmanager
+    def _all_shards_locked(self) -> Iterator[None]:
+        """Hold every shard lock, always acquired in the same order."""
+        acquired = []
+        try:
+            for shard in self._shards:
+                shard.lock.acquire()
+                acquired.append(shard)
+            yield
+        finally:
+            for shard in reversed(acquired):
+                shard.lock.release()
+
+    def _snapshot_traces(self) -> List[SystemTrace]:
+        """List the traces of all shards in creation order.
+
+        Callers must hold all shard locks.
+        """
+        entries = [
+            (shard.created[system_instance_id], trace)
+            for shard in self._shards
+            for system_instance_id, trace in shard.traces.items()
+        ]
+        entries.sort(key=lambda entry: entry[0])
+        return [trace for _, trace in entries]
+
+    @property
+    def _traces(self) -> Dict[str, SystemTrace]:
+        """Merged snapshot of the traces held by all shards."""
+        with self._all_shards_locked():
+            self.flush_buffers()
+            return {
+                trace.system_instance_id: trace for trace in self._snapshot_traces()
+            }
+
     def get_or_create_system_trace(
         self,
         system_name: str,
@@ -30,25 +598,31 @@ class EventStore:
         logger = logging.getLogger(__name__)
         # logger.debug(f"Starting get_or_create_system_trace for {system_instance_id}")
 
+        shard = self._shard_for(system_instance_id)
+
         def _get_or_create():
             # logger.debug("Inside _get_or_create")
-            if system_instance_id not in self._traces:
+            if system_instance_id not in shard.traces:
                 # logger.debug(f"Creating new system trace for {system_instance_id}")
-                self._traces[system_instance_id] = SystemTrace(
+                shard.traces[system_instance_id] = SystemTrace(
                     system_name=system_name,
                     system_id=system_id,
                     system_instance_id=system_instance_id,
                     metadata={},
                     partition=[],  # EventPartitionElement(partition_index=0, events=[])
-                    current_partition_index=0,
+                    # Keep allocating partitions after those handed out by drain()
+                    current_partition_index=shard.drained_index.get(
+                        system_instance_id, 0
+                    ),
                 )
+                shard.created[system_instance_id] = next(self._sequence)
             # logger.debug("Returning system trace")
-            return self._traces[system_instance_id]
+            return shard.traces[system_instance_id]
 
         if _already_locked:
             return _get_or_create()
         else:
-            with self._lock:
+            with shard.lock:
                 # logger.debug("Lock acquired in get_or_create_system_trace")
                 return _get_or_create()
 
@@ -59,7 +633,11 @@ class EventStore:
         logger = logging.getLogger(__name__)
         # logger.debug(f"Starting increment_partition for system {system_instance_id}")
 
-        with self._lock:
+        if self._buffering:
+            # The partition element is created when its first event is merged
+            return self._allocate_partition(system_name, system_id, system_instance_id)
+
+        with self._shard_for(system_instance_id).lock:
             # logger.debug("Lock acquired in increment_partition")
             system_trace = self.get_or_create_system_trace(
                 system_name, system_id, system_instance_id, _already_locked=True
@@ -73,7 +651,7 @@ class EventStore:
             #     f"Incremented index to: {system_trace.current_partition_index}"
             # )
 
-            system_trace.partition.append(
+            system_trace.add_partition(
                 EventPartitionElement(
                     partition_index=system_trace.current_partition_index, events=[]
                 )
@@ -92,49 +670,357 @@ class EventStore:
         # )
         # print("Adding event: ", event)
 
-        # try:
-        if not self._lock.acquire(timeout=5):
-            self.logger.error("Failed to acquire lock within timeout period")
+        # Events of unsampled instances or event types are not stored
+        if head_sampler.active and not head_sampler.sample(
+            system_instance_id, event.event_type, new_event=False
+        ):
             return
 
+        if self._wal is not None and event.closed is not None:
+            with self._wal_lock:
+                stored = self._store_event(
+                    system_name, system_id, system_instance_id, event
+                )
+                if stored and self._wal is not None:
+                    self._wal.append(system_name, system_id, system_instance_id, event)
+        else:
+            self._store_event(system_name, system_id, system_instance_id, event)
+        # except Exception as e:
+        #     self.logger.error(f"Error in add_event: {str(e)}", exc_info=True)
+        #     raise
+
+    def _store_event(
+        self, system_name: str, system_id: str, system_instance_id: str, event: Event
+    ) -> bool:
+        """Buffer or insert an event; returns False if it could not be stored."""
+        if self._buffering:
+            buffer = self._get_local_buffer()
+            buffer.events.append((system_name, system_id, system_instance_id, event))
+            if len(buffer.events) >= self._buffer_batch_size:
+                self._merge_buffer(buffer)
+            return True
+
+        shard = self._shard_for(system_instance_id)
+        if not shard.lock.acquire(timeout=5):
+            self.logger.error("Failed to acquire lock within timeout period")
+            return False
+
         try:
+            self._insert_event(shard, system_name, system_id, system_instance_id, event)
+        finally:
+            shard.lock.release()
+
+        if self._over_budget():
+            self._spill()
+        return True
+
+    def enable_error_recording(self) -> None:
+        """Have traced functions note their errors until disable_error_recording()."""
+        with self._error_recorders_lock:
+            self._error_recorders += 1
+
+    def disable_error_recording(self) -> None:
+        with self._error_recorders_lock:
+            self._error_recorders = max(0, self._error_recorders - 1)
+
+    @property
+    def recording_errors(self) -> bool:
+        """Whether traced functions call record_error, i.e. a TailSampler is open."""
+        return self._error_recorders > 0
+
+    def record_error(
+        self,
+        system_name: str,
+        system_id: str,
+        system_instance_id: str,
+        event_type: str,
+        error: BaseException,
+    ) -> None:
+        """Note an exception raised by a traced function in the trace metadata.
+
+        Errors are listed under metadata["errors"] for tail sampling. The
+        decorators only call this while recording_errors is set.
+        """
+        with self._shard_for(system_instance_id).lock:
             system_trace = self.get_or_create_system_trace(
                 system_name, system_id, system_instance_id, _already_locked=True
             )
-            # self.#logger.debug(
-            #     f"Got system trace with {len(system_trace.partition)} partitions"
-            # )
+            if system_trace.metadata is None:
+                system_trace.metadata = {}
+            system_trace.metadata.setdefault("errors", []).append(
+                {
+                    "event_type": event_type,
+                    "error_type": type(error).__name__,
+                    "message": str(error),
+                    "time": time.time(),
+                }
+            )
+
+    def _insert_event(
+        self,
+        shard: _EventStoreShard,
+        system_name: str,
+        system_id: str,
+        system_instance_id: str,
+        event: Event,
+        create_partition: bool = False,
+    ) -> None:
+        """Store an event in its partition. Callers must hold the shard lock."""
+        system_trace = self.get_or_create_system_trace(
+            system_name, system_id, system_instance_id, _already_locked=True
+        )
+        # self.#logger.debug(
+        #     f"Got system trace with {len(system_trace.partition)} partitions"
+        # )
 
-            current_partition = next(
-                (
-                    p
-                    for p in system_trace.partition
-                    if p.partition_index == event.partition_index
-                ),
-                None,
+        current_partition = system_trace.get_partition(event.partition_index)
+
+        if current_partition is None and (
+            create_partition
+            or event.partition_index in shard.spilled.get(system_instance_id, {})
+            or event.partition_index <= shard.drained_index.get(system_instance_id, -1)
+        ):
+            # Buffered events create their partition on merge. Late events for
+            # spilled partitions are merged back on read, and those for drained
+            # partitions go out with the next drain
+            current_partition = EventPartitionElement(
+                partition_index=event.partition_index, events=[]
+            )
+            system_trace.add_partition(current_partition)
+            system_trace.current_partition_index = max(
+                system_trace.current_partition_index, event.partition_index
             )
 
-            if current_partition is None:
-                self.logger.error(
-                    f"No partition found for index {event.partition_index} - existing partitions: {set([p.partition_index for p in system_trace.partition])}"
-                )
-                raise ValueError(
-                    f"No partition found for index {event.partition_index}"
-                )
+        if current_partition is None:
+            self.logger.error(
+                f"No partition found for index {event.partition_index} - existing partitions: {set([p.partition_index for p in system_trace.partition])}"
+            )
+            raise ValueError(f"No partition found for index {event.partition_index}")
 
-            current_partition.events.append(event)
-        finally:
-            self._lock.release()
-        # except Exception as e:
-        #     self.logger.error(f"Error in add_event: {str(e)}", exc_info=True)
-        #     raise
+        current_partition.events.append(event)
+        self._account_event(shard, system_instance_id, event)
+        if self._indexing:
+            # Also re-keys an event added again after being closed
+            shard.index.add(event, system_name, system_instance_id)
 
     def get_system_traces(self) -> List[SystemTrace]:
         """Get all system traces."""
-        with self._lock:
+        with self._all_shards_locked():
             self.end_all_active_events()
+            self.flush_buffers()
+
+            return [
+                self._materialize(self._shard_for(trace.system_instance_id), trace)
+                for trace in self._snapshot_traces()
+            ]
+
+    def drain(self) -> List[SystemTrace]:
+        """Atomically detach and return every trace held by the store.
 
-            return list(self._traces.values())
+        The store is left empty, so agents keep tracing into fresh traces while
+        the returned ones are serialized and uploaded without any lock held.
+        Each call returns only the events added since the previous drain, and
+        partition indexes keep increasing across drains while an instance is
+        still tracing (see _update_drained_index). Spilled partitions
+        are read back into the returned traces and their segment files deleted.
+
+        With a write-ahead log enabled, the drained events are truncated from
+        it, since they are now the caller's to keep; restore() logs them again.
+        Message deltas of later steps are based on fresh snapshots, so drained
+        events do not keep the delta encoder's history alive.
+        """
+        detached = []
+        with self._wal_lock, self._all_shards_locked():
+            self.flush_buffers()
+            segments, self._segments = self._segments, None
+            for trace in self._snapshot_traces():
+                shard = self._shard_for(trace.system_instance_id)
+                detached.append(
+                    (trace, shard.spilled.pop(trace.system_instance_id, None))
+                )
+            self._prune_partition_counters()
+            for shard in self._shards:
+                self._update_drained_index(shard)
+                shard.traces = {}
+                shard.created = {}
+                shard.partition_bytes = {}
+                shard.index = EventIndex(self._index_bucket_seconds)
+            with self._budget_lock:
+                self._events_in_memory = 0
+                self._bytes_in_memory = 0
+            if self._wal is not None:
+                self._wal.truncate()
+
+        drained = [
+            self._merge_spilled(trace, spilled) if spilled else trace
+            for trace, spilled in detached
+        ]
+        if segments is not None:
+            self._retire_segments(segments)
+        for trace in drained:
+            conversation_delta_encoder.forget(trace.system_instance_id)
+        return drained
+
+    def _prune_partition_counters(self) -> None:
+        """Drop the allocators of fully drained instances; callers hold every shard lock.
+
+        Instances without events since the previous drain are checked. One
+        whose allocator handed out indexes with no event yet is kept as in
+        flight, under a fresh allocator continuing from the same index (reading
+        an allocator uses up an index; _allocate_partition retries on a swap).
+        """
+        for system_instance_id in list(self._partition_counters):
+            shard = self._shard_for(system_instance_id)
+            if system_instance_id in shard.traces:
+                continue
+            counter = self._partition_counters.pop(system_instance_id)
+            next_index = next(counter)
+            if next_index - 1 > shard.drained_index.get(system_instance_id, 0):
+                shard.inflight.add(system_instance_id)
+                self._partition_counters[system_instance_id] = itertools.count(
+                    next_index
+                )
+            else:
+                shard.inflight.discard(system_instance_id)
+
+    def _update_drained_index(self, shard: _EventStoreShard) -> None:
+        """Record where each drained trace stopped; callers hold the shard lock.
+
+        An instance is forgotten once it is fully drained: a drain found no
+        new events for it and none of its partitions were waiting for events.
+        If it traces again, its partition indexes start over.
+        """
+        for system_instance_id in list(shard.drained_index):
+            if (
+                system_instance_id not in shard.traces
+                and system_instance_id not in shard.inflight
+            ):
+                del shard.drained_index[system_instance_id]
+        for system_instance_id, trace in shard.traces.items():
+            shard.drained_index[system_instance_id] = trace.current_partition_index
+            if any(not partition.events for partition in trace.partition):
+                # Allocated for an event that is still open
+                shard.inflight.add(system_instance_id)
+            else:
+                shard.inflight.discard(system_instance_id)
+
+    def restore(self, traces: List[SystemTrace]) -> None:
+        """Merge previously drained traces back in, e.g. after a failed upload.
+
+        Restored events are placed ahead of any added since the drain, and
+        written to the write-ahead log again if one is enabled.
+        """
+        for trace in traces:
+            shard = self._shard_for(trace.system_instance_id)
+            with self._wal_lock, shard.lock:
+                system_trace = self.get_or_create_system_trace(
+                    trace.system_name,
+                    trace.system_id,
+                    trace.system_instance_id,
+                    _already_locked=True,
+                )
+                for partition in trace.partition:
+                    current = system_trace.get_partition(partition.partition_index)
+                    if current is None:
+                        current = EventPartitionElement(
+                            partition_index=partition.partition_index, events=[]
+                        )
+                        system_trace.add_partition(current)
+                    current.events[:0] = partition.events
+                    for event in partition.events:
+                        self._account_event(shard, trace.system_instance_id, event)
+                        if self._indexing:
+                            shard.index.add(
+                                event, trace.system_name, trace.system_instance_id
+                            )
+                        if self._wal is not None and event.closed is not None:
+                            self._wal.append(
+                                trace.system_name,
+                                trace.system_id,
+                                trace.system_instance_id,
+                                event,
+                            )
+                system_trace.partition.sort(key=lambda p: p.partition_index)
+                system_trace.current_partition_index = max(
+                    system_trace.current_partition_index,
+                    trace.current_partition_index,
+                )
+                if trace.metadata:
+                    system_trace.metadata = {**trace.metadata, **system_trace.metadata}
+
+    def query_events(
+        self,
+        event_type: Optional[str] = None,
+        model_name: Optional[str] = None,
+        system_name: Optional[str] = None,
+        system_instance_id: Optional[str] = None,
+        opened_after: Optional[Timestamp] = None,
+        opened_before: Optional[Timestamp] = None,
+        closed_after: Optional[Timestamp] = None,
+        closed_before: Optional[Timestamp] = None,
+    ) -> List[Event]:
+        """Find stored events using the incrementally maintained indexes.
+
+        All given criteria must match; time bounds are inclusive. Only events
+        held in memory are covered, not spilled or drained ones. Results are
+        ordered by their opened time. Without enable_indexing(), every event
+        held in memory is scanned instead.
+
+        Example:
+            event_store.query_events(event_type="step", model_name="gpt-4o-mini")
+        """
+        criteria = dict(
+            event_type=event_type,
+            model_name=model_name,
+            system_name=system_name,
+            system_instance_id=system_instance_id,
+            opened_after=opened_after,
+            opened_before=opened_before,
+            closed_after=closed_after,
+            closed_before=closed_before,
+        )
+        shards = (
+            [self._shard_for(system_instance_id)]
+            if system_instance_id is not None
+            else self._shards
+        )
+        self.flush_buffers()
+        results: List[Event] = []
+        for shard in shards:
+            with shard.lock:
+                if self._indexing:
+                    results.extend(shard.index.query(**criteria))
+                else:
+                    results.extend(
+                        scan_events(
+                            (
+                                (event, trace.system_name, system_instance_id)
+                                for system_instance_id, trace in shard.traces.items()
+                                for partition in trace.partition
+                                for event in partition.events
+                            ),
+                            **criteria,
+                        )
+                    )
+        results.sort(key=lambda event: _sort_time(event.opened))
+        return results
+
+    def iter_system_traces(self) -> Iterator[SystemTrace]:
+        """Yield all system traces one at a time.
+
+        Unlike get_system_traces, spilled partitions are read back for a single
+        trace at a time, so memory use stays bounded by the largest trace.
+        """
+        with self._all_shards_locked():
+            self.end_all_active_events()
+            self.flush_buffers()
+            traces = self._snapshot_traces()
+
+        for trace in traces:
+            shard = self._shard_for(trace.system_instance_id)
+            with shard.lock:
+                materialized = self._materialize(shard, trace)
+            yield materialized
 
     def end_all_active_events(self):
         """End all active events and store them."""
@@ -170,52 +1056,79 @@ class EventStore:
 
     def get_system_traces_json(self) -> str:
         """Get all system traces as JSON."""
-        with self._lock:
-            return json.dumps(
-                [
-                    {
-                        "system_instance_id": trace.system_instance_id,
-                        "current_partition_index": trace.current_partition_index,
-                        "partition": [
-                            {
-                                "partition_index": p.partition_index,
-                                "events": [
-                                    self._event_to_dict(event) for event in p.events
-                                ],
-                            }
-                            for p in trace.partition
-                        ],
-                    }
-                    for trace in self._traces.values()
-                ],
-                default=str,
-            )
+        buffer = io.StringIO()
+        self.write_system_traces_json(buffer)
+        return buffer.getvalue()
 
-    def _event_to_dict(self, event: Event) -> dict:
-        """Convert an Event object to a dictionary."""
-        return {
-            "event_type": event.event_type,
-            "opened": event.opened,
-            "closed": event.closed,
-            "partition_index": event.partition_index,
-            "agent_compute_step": {
-                "event_order": event.agent_compute_step.event_order,
-                "compute_began": event.agent_compute_step.compute_began,
-                "compute_ended": event.agent_compute_step.compute_ended,
-                "compute_input": event.agent_compute_step.compute_input,
-                "compute_output": event.agent_compute_step.compute_output,
-            },
-            "environment_compute_steps": [
-                {
-                    "event_order": step.event_order,
-                    "compute_began": step.compute_began,
-                    "compute_ended": step.compute_ended,
-                    "compute_input": step.compute_input,
-                    "compute_output": step.compute_output,
-                }
-                for step in event.environment_compute_steps
-            ],
-        }
+    def write_system_traces_json(self, fp: IO) -> None:
+        """Write all system traces as JSON to a writable, one event at a time.
+
+        Each trace is written in its SystemTrace.to_dict() form, encoded by
+        the trace serializer, so the file can be read back with
+        read_system_traces. The store is only locked while references to the
+        traces are copied; encoding and writing happen afterwards, so tracing
+        threads are not blocked and at most one trace's spilled partitions
+        are held in memory. Text streams receive str, any other writable
+        receives UTF-8 bytes.
+        """
+        if isinstance(fp, io.TextIOBase):
+
+            def write(data: bytes) -> None:
+                fp.write(data.decode("utf-8"))
+
+        else:
+            write = fp.write
+        dumps = serializer.dumps
+
+        with self._all_shards_locked():
+            self.flush_buffers()
+            snapshots = [
+                self._snapshot_trace(self._shard_for(t.system_instance_id), t)
+                for t in self._snapshot_traces()
+            ]
+            with self._segments_lock:
+                # Keeps a concurrent drain() from deleting the snapshot's segments
+                self._segment_readers += 1
+
+        try:
+            write(b"[")
+            for trace_number, (trace, spilled) in enumerate(snapshots):
+                if spilled:
+                    trace = self._merge_spilled(trace, spilled)
+                if trace_number:
+                    write(b",")
+                write(
+                    b'{"system_name":'
+                    + dumps(trace.system_name)
+                    + b',"system_id":'
+                    + dumps(trace.system_id)
+                    + b',"system_instance_id":'
+                    + dumps(trace.system_instance_id)
+                    + b',"partition":['
+                )
+                for partition_number, p in enumerate(trace.partition):
+                    if partition_number:
+                        write(b",")
+                    write(
+                        b'{"partition_index":'
+                        + dumps(p.partition_index)
+                        + b',"events":['
+                    )
+                    for event_number, event in enumerate(p.events):
+                        if event_number:
+                            write(b",")
+                        write(dumps(event))
+                    write(b"]}")
+                write(
+                    b'],"current_partition_index":'
+                    + dumps(trace.current_partition_index)
+                    + b',"metadata":'
+                    + dumps(trace.metadata if trace.metadata else None)
+                    + b"}"
+                )
+            write(b"]")
+        finally:
+            self._release_segments()
 
 
 # Global event store instance
@@ -0,0 +1,213 @@
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from synth_sdk.tracing.abstractions import Event, EventPartitionElement, SystemTrace
+
+logger = logging.getLogger(__name__)
+
+# Each record is a 4-byte length and a 4-byte CRC32 followed by a pickled
+# (system_name, system_id, system_instance_id, event) tuple. A zero length
+# marks the end of the log; the rest of the mapped file is zero-filled.
+_RECORD_HEADER = struct.Struct(">II")
+
+DEFAULT_INITIAL_SIZE = 16 * 1024 * 1024
+DEFAULT_FSYNC_BYTES = 1024 * 1024
+DEFAULT_FSYNC_INTERVAL = 1.0  # seconds
+
+WalRecord = Tuple[str, str, str, Event]
+
+
+class WriteAheadLog:
+    """Memory-mapped, append-only log of closed events.
+
+    Records are written into the mapping immediately and made durable in
+    groups: the log is flushed and fsync'd once `fsync_bytes` of unsynced
+    data accumulate, or `fsync_interval` seconds after the first unsynced
+    write, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync_bytes: int = DEFAULT_FSYNC_BYTES,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+        initial_size: int = DEFAULT_INITIAL_SIZE,
+    ):
+        self.path = path
+        self.fsync_bytes = fsync_bytes
+        self.fsync_interval = fsync_interval
+        self.initial_size = initial_size
+        self._lock = threading.Lock()
+
+        self._file = open(path, "a+b")
+        size = max(os.fstat(self._file.fileno()).st_size, initial_size)
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        # Continue after any records already in the log
+        self._offset = sum(
+            _RECORD_HEADER.size + length for length, _ in _scan(self._mmap)
+        )
+        self._unsynced_bytes = 0
+        self._first_unsynced_at: Optional[float] = None
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name="synth-sdk-wal", daemon=True
+        )
+        self._flusher.start()
+
+    def append(
+        self, system_name: str, system_id: str, system_instance_id: str, event: Event
+    ) -> None:
+        """Append a closed event to the log."""
+        payload = pickle.dumps(
+            (system_name, system_id, system_instance_id, event),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        record_size = _RECORD_HEADER.size + len(payload)
+        with self._lock:
+            if self._closed.is_set():
+                raise ValueError("Write-ahead log is closed")
+            # Keep room for the zero length that terminates the log
+            self._ensure_capacity(self._offset + record_size + _RECORD_HEADER.size)
+            self._mmap[self._offset : self._offset + record_size] = (
+                _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+            )
+            self._offset += record_size
+            self._unsynced_bytes += record_size
+            if self._first_unsynced_at is None:
+                self._first_unsynced_at = time.monotonic()
+            if self._unsynced_bytes >= self.fsync_bytes:
+                self._sync_locked()
+
+    def sync(self) -> None:
+        """Flush and fsync everything appended so far."""
+        with self._lock:
+            if not self._closed.is_set():
+                self._sync_locked()
+
+    def truncate(self) -> None:
+        """Discard all records, e.g. once their events have been drained.
+
+        A log that grew beyond its initial size shrinks back to it.
+        """
+        with self._lock:
+            if self._closed.is_set():
+                raise ValueError("Write-ahead log is closed")
+            self._mmap[: self._offset] = bytes(self._offset)
+            self._offset = 0
+            if len(self._mmap) > self.initial_size:
+                self._mmap.close()
+                self._file.truncate(self.initial_size)
+                self._mmap = mmap.mmap(self._file.fileno(), self.initial_size)
+            self._sync_locked(force=True)
+
+    def close(self) -> None:
+        """Sync outstanding records and release the mapping."""
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._sync_locked()
+            self._closed.set()
+            self._mmap.close()
+            self._file.close()
+        self._flusher.join()
+
+    def _sync_locked(self, force: bool = False) -> None:
+        if force or self._first_unsynced_at is not None:
+            self._mmap.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced_bytes = 0
+        self._first_unsynced_at = None
+
+    def _ensure_capacity(self, required: int) -> None:
+        size = len(self._mmap)
+        if required <= size:
+            return
+        while size < required:
+            size *= 2
+        self._mmap.flush()
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.fsync_interval / 2):
+            with self._lock:
+                if (
+                    not self._closed.is_set()
+                    and self._first_unsynced_at is not None
+                    and time.monotonic() - self._first_unsynced_at
+                    >= self.fsync_interval
+                ):
+                    self._sync_locked()
+
+
+def _scan(buffer) -> Iterator[Tuple[int, int]]:
+    """Yield (payload_length, offset) for each intact record in the buffer."""
+    offset = 0
+    end = len(buffer)
+    while offset + _RECORD_HEADER.size <= end:
+        length, crc = _RECORD_HEADER.unpack_from(buffer, offset)
+        start = offset + _RECORD_HEADER.size
+        if length == 0 or start + length > end:
+            return
+        if zlib.crc32(buffer[start : start + length]) != crc:
+            # Torn write from a crash; everything after it is unreliable
+            logger.warning(f"Stopping WAL recovery at corrupt record offset {offset}")
+            return
+        yield length, offset
+        offset = start + length
+
+
+def read_wal(path: str) -> Iterator[WalRecord]:
+    """Yield the (system_name, system_id, system_instance_id, event) records in a log."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for length, offset in _scan(buffer):
+                start = offset + _RECORD_HEADER.size
+                yield pickle.loads(buffer[start : start + length])
+
+
+def recover_system_traces(path: str) -> List[SystemTrace]:
+    """Rebuild SystemTrace objects from the events recorded in a log."""
+    return traces_from_records(read_wal(path))
+
+
+def traces_from_records(records: Iterable[WalRecord]) -> List[SystemTrace]:
+    """Group (system_name, system_id, system_instance_id, event) records into traces."""
+    traces: Dict[str, SystemTrace] = {}
+    for system_name, system_id, system_instance_id, event in records:
+        trace = traces.get(system_instance_id)
+        if trace is None:
+            trace = traces[system_instance_id] = SystemTrace(
+                system_name=system_name,
+                system_id=system_id,
+                system_instance_id=system_instance_id,
+                metadata={},
+                partition=[],
+                current_partition_index=0,
+            )
+        partition = trace.get_partition(event.partition_index)
+        if partition is None:
+            partition = EventPartitionElement(
+                partition_index=event.partition_index, events=[]
+            )
+            trace.add_partition(partition)
+        partition.events.append(event)
+        trace.current_partition_index = max(
+            trace.current_partition_index, event.partition_index
+        )
+
+    for trace in traces.values():
+        trace.partition.sort(key=lambda p: p.partition_index)
+    return list(traces.values())
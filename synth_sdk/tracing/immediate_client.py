@@ -26,15 +26,25 @@ class ImmediateLogClient(BaseLogClient):
             retry_queue,  # Import here to avoid circular import
         )
 
-        payload = self._prepare_payload(event, system_info)
-        headers = {"Authorization": f"Bearer {self.config.api_key}"}
+        try:
+            payload = self._prepare_payload(event, system_info)
+            body, content_type = self._encode_payload(payload)
+        except Exception as e:
+            # Not retried: the same event would fail to encode again
+            logger.error(f"Failed to encode event {event.event_type}: {e}")
+            self._handle_failure(event, system_info, e)
+            return False
+        headers = {
+            "Authorization": f"Bearer {self.config.api_key}",
+            "Content-Type": content_type,
+        }
         last_exception = None
 
         for attempt in range(self.config.max_retries):
             try:
-                response = self.client_manager.sync_client.post(
+                response = self.client_manager.get_sync_client().post(
                     f"{self.config.base_url}/v1/uploads/stream",
-                    json=payload,
+                    content=body,
                     headers=headers,
                     timeout=self.config.timeout,
                 )
@@ -101,24 +111,30 @@ class AsyncImmediateLogClient(BaseAsyncLogClient):
                 return False
 
             # Now send the event with the JWT token
-            payload = self._prepare_payload(event, system_info)
+            try:
+                payload = self._prepare_payload(event, system_info)
+                body, content_type = self._encode_payload(payload)
+            except Exception as e:
+                # Not retried: the same event would fail to encode again
+                logger.error(f"Failed to encode event {event.event_type}: {e}")
+                return False
             headers = {
                 "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json",
+                "Content-Type": content_type,
                 "Accept": "application/json",
             }
 
             logger.debug(f"Request URL: {self.config.base_url}/v1/uploads/stream")
             logger.debug("Using JWT token for authentication")
             logger.debug(f"Headers: {headers}")
-            logger.debug(f"Payload size: {len(str(payload))} bytes")
+            logger.debug(f"Payload size: {len(body)} bytes")
 
             async with httpx.AsyncClient(timeout=self.config.timeout) as client:
                 for attempt in range(self.config.max_retries + 1):
                     try:
                         response = await client.post(
                             f"{self.config.base_url}/v1/uploads/stream",
-                            json=payload,
+                            content=body,
                             headers=headers,
                             timeout=self.config.timeout,
                         )
@@ -152,5 +168,5 @@ class AsyncImmediateLogClient(BaseAsyncLogClient):
                 # logger.error(
                 #     f"All upload attempts failed. Last error: {last_exception}"
                 # )
-                retry_queue.add_failed_event(event, system_info)
+                retry_queue.add_failed_event(event, system_info, client="async")
                 return False
@@ -0,0 +1,215 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+# Key used in place of a message when payloads carry a message table
+MESSAGE_REF_KEY = "message_ref"
+# Distinct messages kept for sharing before the least recently used are dropped
+DEFAULT_MAX_MESSAGES = 10_000
+
+
+def message_key(message: Any) -> str:
+    """Content hash identifying a message, independent of dict key order."""
+    canonical = json.dumps(message, sort_keys=True, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class MessageInterner:
+    """Stores each distinct message once and shares it between compute steps.
+
+    Conversations re-sent at every step (system prompts, earlier turns) then
+    cost one reference per occurrence instead of a full copy. At most
+    max_messages are kept for sharing, least recently interned first out;
+    traces keep the copies they already reference.
+
+    Message objects seen before are recognised by identity, and only hashed
+    again if they no longer equal their shared copy, so re-sending a growing
+    conversation only hashes the messages appended since the last step.
+    """
+
+    def __init__(self, enabled: bool = False, max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.enabled = enabled
+        self.max_messages = max_messages
+        self._messages: OrderedDict[str, Any] = OrderedDict()
+        # id(message) -> (message, key, shared copy); holding the message keeps
+        # its id from being reused by another object
+        self._seen: OrderedDict[int, Tuple[Any, str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def _shared_if_seen(self, message: Any) -> Any:
+        """Return the shared copy of an already interned message object, or None.
+
+        Callers must hold the lock.
+        """
+        seen = self._seen.get(id(message))
+        if seen is None or seen[0] is not message:
+            return None
+        _, key, shared = seen
+        # Equal unless the caller mutated it; unchanged values compare by
+        # identity, so this does not walk the content
+        if message != shared:
+            return None
+        self._seen.move_to_end(id(message))
+        if key in self._messages:
+            self._messages.move_to_end(key)
+        return shared
+
+    def intern(self, message: Any) -> Any:
+        """Return the shared copy of a message, storing it on first sight."""
+        with self._lock:
+            shared = self._shared_if_seen(message)
+        if shared is not None:
+            return shared
+        key = message_key(message)
+        with self._lock:
+            shared = self._messages.get(key)
+            if shared is not None:
+                self._messages.move_to_end(key)
+                self._remember(message, key, shared)
+                return shared
+        # Copy so later mutation by the caller cannot change stored traces
+        candidate = copy.deepcopy(message)
+        with self._lock:
+            shared = self._messages.setdefault(key, candidate)
+            self._messages.move_to_end(key)
+            while len(self._messages) > self.max_messages:
+                self._messages.popitem(last=False)
+            self._remember(message, key, shared)
+        return shared
+
+    def _remember(self, message: Any, key: str, shared: Any) -> None:
+        """Map a message object to its shared copy. Callers must hold the lock."""
+        self._seen[id(message)] = (message, key, shared)
+        self._seen.move_to_end(id(message))
+        while len(self._seen) > self.max_messages:
+            self._seen.popitem(last=False)
+
+    def intern_messages(self, messages: List[Any]) -> List[Any]:
+        """Intern every message of a conversation if interning is enabled."""
+        if not self.enabled or not isinstance(messages, list):
+            return messages
+        with self._lock:
+            interned = [self._shared_if_seen(message) for message in messages]
+        for position, shared in enumerate(interned):
+            if shared is None:
+                # Only messages not seen before are hashed
+                interned[position] = self.intern(messages[position])
+        return interned
+
+    def clear(self) -> None:
+        """Forget all interned messages; traces keep their references."""
+        with self._lock:
+            self._messages = OrderedDict()
+            self._seen = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+
+def _iter_compute_steps(trace_dict: Dict[str, Any]):
+    for partition in trace_dict.get("partition", []):
+        for event in partition.get("events", []):
+            if event.get("agent_compute_step"):
+                yield event["agent_compute_step"]
+            yield from event.get("environment_compute_steps", [])
+
+
+def _message_lists(step: Dict[str, Any]):
+    for item in step.get("compute_input", []) + step.get("compute_output", []):
+        if isinstance(item, dict) and isinstance(item.get("messages"), list):
+            yield item
+
+
+def dedupe_trace_messages(
+    traces: List[Dict[str, Any]],
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Replace messages in serialized traces with references into a message table.
+
+    Args:
+        traces: Serialized traces, as returned by SystemTrace.to_dict()
+
+    Returns:
+        Tuple of (message_table, traces) where message_table maps content hash
+        to message and each message in the returned traces is replaced by
+        {"message_ref": hash}. The input dicts are left untouched.
+    """
+    message_table: Dict[str, Any] = {}
+    keys_by_id: Dict[int, str] = {}  # interned messages share ids; hash them once
+
+    def dedupe_items(items: List[Any]) -> List[Any]:
+        deduped_items = []
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get("messages"), list):
+                refs = []
+                for message in item["messages"]:
+                    key = keys_by_id.get(id(message))
+                    if key is None:
+                        key = keys_by_id[id(message)] = message_key(message)
+                    message_table.setdefault(key, message)
+                    refs.append({MESSAGE_REF_KEY: key})
+                item = {**item, "messages": refs}
+            deduped_items.append(item)
+        return deduped_items
+
+    def dedupe_step(step: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **step,
+            "compute_input": dedupe_items(step.get("compute_input", [])),
+            "compute_output": dedupe_items(step.get("compute_output", [])),
+        }
+
+    def dedupe_event(event: Dict[str, Any]) -> Dict[str, Any]:
+        deduped_event = dict(event)
+        if event.get("agent_compute_step"):
+            deduped_event["agent_compute_step"] = dedupe_step(
+                event["agent_compute_step"]
+            )
+        if "environment_compute_steps" in event:
+            deduped_event["environment_compute_steps"] = [
+                dedupe_step(step) for step in event["environment_compute_steps"]
+            ]
+        return deduped_event
+
+    deduped_traces = [
+        {
+            **trace,
+            "partition": [
+                {**p, "events": [dedupe_event(e) for e in p.get("events", [])]}
+                for p in trace.get("partition", [])
+            ],
+        }
+        for trace in traces
+    ]
+    return message_table, deduped_traces
+
+
+def expand_trace_messages(
+    message_table: Dict[str, Any], traces: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Inverse of dedupe_trace_messages: resolve message references in place."""
+    for trace in traces:
+        for step in _iter_compute_steps(trace):
+            for item in _message_lists(step):
+                item["messages"] = [
+                    message_table[message[MESSAGE_REF_KEY]]
+                    if isinstance(message, dict) and MESSAGE_REF_KEY in message
+                    else message
+                    for message in item["messages"]
+                ]
+    return traces
+
+
+# Global interner used by the tracing decorators
+message_interner = MessageInterner(
+    enabled=os.getenv("SYNTH_INTERN_MESSAGES", "").lower() in ("1", "true", "yes")
+)
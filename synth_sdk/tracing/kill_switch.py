@@ -0,0 +1,43 @@
+import os
+
+
+class TracingSwitch:
+    """Global kill switch for all tracing entry points.
+
+    Functions decorated while tracing is disabled are returned undecorated.
+    Flipping the switch at runtime makes already-decorated functions, event
+    scopes, trackers and the patched provider clients pass straight through.
+    Provider clients are only left unpatched if SYNTH_TRACING_DISABLED is set
+    before synth_sdk is imported.
+    """
+
+    __slots__ = ("disabled",)
+
+    def __init__(self, disabled: bool = False):
+        self.disabled = disabled
+
+    def enable(self) -> None:
+        self.disabled = False
+
+    def disable(self) -> None:
+        self.disabled = True
+
+
+# Global switch checked by the decorators, event scopes, trackers and providers
+tracing_switch = TracingSwitch(
+    disabled=os.getenv("SYNTH_TRACING_DISABLED", "").lower() in ("1", "true", "yes")
+)
+
+
+def disable_tracing() -> None:
+    """Turn all tracing into a pass-through."""
+    tracing_switch.disable()
+
+
+def enable_tracing() -> None:
+    """Turn tracing back on after disable_tracing()."""
+    tracing_switch.enable()
+
+
+def tracing_enabled() -> bool:
+    return not tracing_switch.disabled
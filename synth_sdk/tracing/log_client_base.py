@@ -1,7 +1,8 @@
-from typing import Dict
+from typing import Dict, Tuple
 
 from synth_sdk.tracing.abstractions import Event
 from synth_sdk.tracing.config import TracingConfig
+from synth_sdk.tracing.wire import encode_wire_payload
 
 
 class BaseLogClient:
@@ -20,6 +21,14 @@ class BaseLogClient:
             "sdk_version": self.config.sdk_version,
         }
 
+    def _encode_payload(self, payload: Dict) -> Tuple[bytes, str]:
+        """Encode a payload in the configured wire format.
+
+        Returns:
+            Tuple of (body, content type)
+        """
+        return encode_wire_payload(payload, self.config.wire_format)
+
     def _should_retry(self, attempt: int, status_code: int = None) -> bool:
         """Determine if a retry should be attempted."""
         if attempt >= self.config.max_retries:
@@ -55,6 +64,14 @@ class BaseAsyncLogClient:
             "sdk_version": self.config.sdk_version,
         }
 
+    def _encode_payload(self, payload: Dict) -> Tuple[bytes, str]:
+        """Encode a payload in the configured wire format.
+
+        Returns:
+            Tuple of (body, content type)
+        """
+        return encode_wire_payload(payload, self.config.wire_format)
+
     def _should_retry(self, attempt: int, status_code: int = None) -> bool:
         """Determine if a retry should be attempted."""
         if attempt >= self.config.max_retries:
@@ -0,0 +1,264 @@
+import os
+import threading
+from typing import Any, Dict, List, Sequence
+
+# Key marking a serialized message list as a suffix of the previous one
+PREFIX_LENGTH_KEY = "prefix_length"
+
+
+def _common_prefix_length(previous: Sequence[Any], current: Sequence[Any]) -> int:
+    length = 0
+    for old, new in zip(previous, current):
+        if old is not new and old != new:
+            break
+        length += 1
+    return length
+
+
+class DeltaMessages(Sequence):
+    """A conversation stored as a prefix of an earlier one plus appended messages.
+
+    Agents usually resend their whole growing history at every step; storing
+    only the messages appended since an earlier step avoids keeping n copies
+    of it. The full list is rebuilt on iteration, single items are looked up
+    along the chain, and the full list is pickled in place of the chain.
+    """
+
+    __slots__ = ("base", "prefix_length", "suffix", "depth")
+
+    def __init__(self, base: Sequence[Any], prefix_length: int, suffix: List[Any]):
+        self.base = base
+        self.prefix_length = prefix_length
+        self.suffix = suffix
+        self.depth = base.depth + 1 if isinstance(base, DeltaMessages) else 1
+
+    def expand(self) -> List[Any]:
+        """Return the full message list."""
+        chain = []
+        node = self
+        while isinstance(node, DeltaMessages):
+            chain.append(node)
+            node = node.base
+        messages = list(node)
+        for node in reversed(chain):
+            messages = messages[: node.prefix_length] + node.suffix
+        return messages
+
+    def __reduce__(self):
+        # Pickling the chain itself recurses once per link
+        return list, (self.expand(),)
+
+    def __len__(self) -> int:
+        return self.prefix_length + len(self.suffix)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.expand()[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        node = self
+        while isinstance(node, DeltaMessages):
+            if index >= node.prefix_length:
+                return node.suffix[index - node.prefix_length]
+            # Earlier messages are the same as in the base
+            node = node.base
+        return node[index]
+
+    def __iter__(self):
+        return iter(self.expand())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DeltaMessages):
+            other = other.expand()
+        return self.expand() == other
+
+    def __repr__(self) -> str:
+        return repr(self.expand())
+
+
+def expand_messages(messages: Any) -> Any:
+    """Return messages as a plain list if they are delta-encoded."""
+    if isinstance(messages, DeltaMessages):
+        return messages.expand()
+    return messages
+
+
+class _DeltaRun:
+    """Steps of one instance since its conversation last started over."""
+
+    __slots__ = ("encoded", "lengths", "prefix_lengths", "snapshot")
+
+    def __init__(self, snapshot: List[Any]):
+        self.encoded: List[Sequence[Any]] = [snapshot]
+        self.lengths: List[int] = [len(snapshot)]
+        # Common prefix of each step with the step before it
+        self.prefix_lengths: List[int] = [0]
+        self.snapshot = snapshot
+
+
+class ConversationDeltaEncoder:
+    """Delta-encodes the input messages of consecutive steps per system instance.
+
+    Step k of a conversation is based on step k - lowbit(k) (as in a Fenwick
+    tree) rather than on step k - 1. Expanding any step then follows at most
+    log2(n) + 1 links, and an n-step episode appending m messages per step
+    stores about m * n * log2(n) / 2 message references, instead of the
+    m * n^2 / 2 of resending the whole history.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        # system_instance_id -> steps of its current conversation
+        self._runs: Dict[str, _DeltaRun] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def encode(self, system_instance_id: str, messages: Any) -> Any:
+        """Store messages relative to an earlier step of the same instance."""
+        if not self.enabled or not isinstance(messages, list):
+            return messages
+
+        # Snapshot so later appends to the caller's history list are not seen
+        snapshot = list(messages)
+        with self._lock:
+            run = self._runs.get(system_instance_id)
+        prefix_length = (
+            _common_prefix_length(run.snapshot, snapshot) if run is not None else 0
+        )
+        if not prefix_length:
+            # A new conversation; store it flat and base later steps on it
+            with self._lock:
+                self._runs[system_instance_id] = _DeltaRun(snapshot)
+            return snapshot
+
+        with self._lock:
+            step = len(run.encoded)
+            base_step = step & (step - 1)
+            # Messages before every step's common prefix are unchanged since
+            # the base step
+            shared_length = min(
+                run.lengths[base_step],
+                prefix_length,
+                *run.prefix_lengths[base_step + 1 :],
+            )
+            encoded = DeltaMessages(
+                run.encoded[base_step], shared_length, snapshot[shared_length:]
+            )
+            run.encoded.append(encoded)
+            run.lengths.append(len(snapshot))
+            run.prefix_lengths.append(prefix_length)
+            run.snapshot = snapshot
+        return encoded
+
+    def forget(self, system_instance_id: str) -> None:
+        """Drop the delta bases kept for a finished system instance."""
+        with self._lock:
+            self._runs.pop(system_instance_id, None)
+
+
+def _iter_message_items(trace: Dict[str, Any]):
+    """Yield (compute_input list, index) for serialized items holding messages."""
+    for partition in trace.get("partition", []):
+        for event in partition.get("events", []):
+            steps = []
+            if event.get("agent_compute_step"):
+                steps.append(event["agent_compute_step"])
+            steps.extend(event.get("environment_compute_steps", []))
+            for step in steps:
+                items = step.get("compute_input", [])
+                for index, item in enumerate(items):
+                    if isinstance(item, dict) and isinstance(
+                        item.get("messages"), list
+                    ):
+                        yield items, index
+
+
+def delta_encode_trace_messages(traces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rewrite serialized input messages as suffixes of the previous input.
+
+    Each item whose messages start with the previous item's messages is
+    replaced by {"messages": suffix, "prefix_length": n}. The input dicts are
+    left untouched, since to_dict() shares them with cached event forms; the
+    rewritten traces are returned. Use expand_trace_message_deltas to restore
+    the full form.
+    """
+    encoded_traces = []
+    for trace in traces:
+        previous: List[Any] = []
+
+        def encode_items(items: List[Any]) -> List[Any]:
+            nonlocal previous
+            encoded_items = []
+            for item in items:
+                if isinstance(item, dict) and isinstance(item.get("messages"), list):
+                    messages = item["messages"]
+                    prefix_length = _common_prefix_length(previous, messages)
+                    if prefix_length:
+                        item = {
+                            **item,
+                            "messages": messages[prefix_length:],
+                            PREFIX_LENGTH_KEY: prefix_length,
+                        }
+                    previous = messages
+                encoded_items.append(item)
+            return encoded_items
+
+        def encode_step(step: Dict[str, Any]) -> Dict[str, Any]:
+            return {
+                **step,
+                "compute_input": encode_items(step.get("compute_input", [])),
+            }
+
+        def encode_event(event: Dict[str, Any]) -> Dict[str, Any]:
+            encoded_event = dict(event)
+            if event.get("agent_compute_step"):
+                encoded_event["agent_compute_step"] = encode_step(
+                    event["agent_compute_step"]
+                )
+            if "environment_compute_steps" in event:
+                encoded_event["environment_compute_steps"] = [
+                    encode_step(step) for step in event["environment_compute_steps"]
+                ]
+            return encoded_event
+
+        encoded_traces.append(
+            {
+                **trace,
+                "partition": [
+                    {**p, "events": [encode_event(e) for e in p.get("events", [])]}
+                    for p in trace.get("partition", [])
+                ],
+            }
+        )
+    return encoded_traces
+
+
+def expand_trace_message_deltas(traces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Inverse of delta_encode_trace_messages."""
+    for trace in traces:
+        previous: List[Any] = []
+        for items, index in _iter_message_items(trace):
+            item = items[index]
+            if PREFIX_LENGTH_KEY in item:
+                prefix_length = item[PREFIX_LENGTH_KEY]
+                item = items[index] = {
+                    key: value
+                    for key, value in item.items()
+                    if key != PREFIX_LENGTH_KEY
+                }
+                item["messages"] = previous[:prefix_length] + item["messages"]
+            previous = item["messages"]
+    return traces
+
+
+# Global encoder used by the tracing decorators
+conversation_delta_encoder = ConversationDeltaEncoder(
+    enabled=os.getenv("SYNTH_DELTA_MESSAGES", "").lower() in ("1", "true", "yes")
+)
@@ -1,15 +1,21 @@
+import asyncio
+import heapq
+import itertools
 import logging
 import threading
 import time
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Dict, List, Literal, Optional, Set, Tuple, TypeVar
 
 from synth_sdk.tracing.abstractions import Event
-from synth_sdk.tracing.config import TracingConfig
+from synth_sdk.tracing.config import TracingConfig, tracing_config_manager
 
 logger = logging.getLogger(__name__)
 
+# Seconds between background retry passes while events are queued
+DEFAULT_RETRY_INTERVAL = 1.0
+
 
 @dataclass
 class QueuedEvent:
@@ -19,82 +25,226 @@ class QueuedEvent:
     system_info: Dict[str, str]
     attempt_count: int = 0
     last_attempt: float = 0
+    # Upload client the event failed on; it is retried through the same one,
+    # since the two authenticate differently (API key vs. JWT)
+    client: Literal["sync", "async"] = "sync"
 
 
-class RetryQueue:
-    """Manages failed event uploads with retry capabilities."""
+EventKey = Tuple[str, str, Any]
+T = TypeVar("T")
+
+
+def _run_coroutine(coroutine: Awaitable[T]) -> T:
+    """Run a coroutine to completion from synchronous code."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Called from a thread running an event loop, which cannot be re-entered
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def _event_key(event: Event) -> EventKey:
+    return (event.system_instance_id, event.event_type, event.opened)
+
 
-    def __init__(self, config: TracingConfig):
+class RetryQueue:
+    """Manages failed event uploads with retry capabilities.
+
+    Events are kept in a min-heap ordered by their next attempt time, which
+    is last_attempt + retry_backoff ** attempt_count. A set of
+    (system_instance_id, event_type, opened) keys makes duplicate detection
+    constant time. Keys of events taken out for a retry stay in the set until
+    the retry settles, so an upload client re-queuing the same event while it
+    is retried cannot reset its attempt count.
+    """
+
+    def __init__(
+        self, config: TracingConfig, retry_interval: float = DEFAULT_RETRY_INTERVAL
+    ):
         self.config = config
-        self.queue: deque[QueuedEvent] = deque()
+        # (next attempt time, insertion sequence, event) entries
+        self._heap: List[Tuple[float, int, QueuedEvent]] = []
+        self._keys: Set[EventKey] = set()
+        self._sequence = itertools.count()
         self._lock = threading.Lock()
         self._is_processing = False
         self._batch_size = config.batch_size
+        self.retry_interval = retry_interval
+        # Background worker, started when the first failed event is queued
+        self._worker: Optional[threading.Thread] = None
+        self._worker_stop = threading.Event()
+        self._worker_wakeup = threading.Event()
+        self._worker_lock = threading.Lock()
 
-    def add_failed_event(self, event: Event, system_info: Dict[str, str]) -> None:
-        """Add a failed event to the retry queue."""
-        with self._lock:
-            # Check if event is already in queue to avoid duplicates
-            for queued in self.queue:
-                if (
-                    queued.event.system_instance_id == event.system_instance_id
-                    and queued.event.event_type == event.event_type
-                    and queued.event.opened == event.opened
-                ):
-                    return
+    def configure(self, config: TracingConfig) -> None:
+        """Apply a new config; events already queued are kept.
+
+        A new retry_backoff applies to events as they are next rescheduled.
+        """
+        self.config = config
+        self._batch_size = config.batch_size
+
+    def __len__(self) -> int:
+        return len(self._heap)
 
-            self.queue.append(
+    @property
+    def queue(self) -> List[QueuedEvent]:
+        """Queued events, in the order they become retryable."""
+        with self._lock:
+            return [entry[2] for entry in sorted(self._heap)]
+
+    def _push(self, queued: QueuedEvent) -> None:
+        """Schedule an event. Callers must hold the lock."""
+        next_attempt = (
+            queued.last_attempt + self.config.retry_backoff**queued.attempt_count
+        )
+        heapq.heappush(self._heap, (next_attempt, next(self._sequence), queued))
+
+    def add_failed_event(
+        self,
+        event: Event,
+        system_info: Dict[str, str],
+        client: Literal["sync", "async"] = "sync",
+    ) -> None:
+        """Add a failed event to the retry queue.
+
+        Args:
+            client: "async" if it failed on AsyncImmediateLogClient
+        """
+        key = _event_key(event)
+        with self._lock:
+            # Skip events already queued or being retried
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            self._push(
                 QueuedEvent(
                     event=event,
                     system_info=system_info,
                     attempt_count=0,
                     last_attempt=time.time(),
+                    client=client,
                 )
             )
-            logger.debug(f"Added event to retry queue. Queue size: {len(self.queue)}")
+            logger.debug(f"Added event to retry queue. Queue size: {len(self._heap)}")
+        self.start_worker()
+        self._worker_wakeup.set()
+
+    def start_worker(self) -> None:
+        """Retry queued events in a background thread, every retry_interval seconds.
+
+        Called when an event is queued, so traced code never runs retries
+        itself. Does nothing if the worker is already running.
+        """
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker_stop = threading.Event()
+            self._worker = threading.Thread(
+                target=self._run_worker,
+                args=(self._worker_stop,),
+                name="synth-retry-queue",
+                daemon=True,
+            )
+            self._worker.start()
+
+    def stop_worker(self, timeout: Optional[float] = None) -> None:
+        """Stop the background worker; queued events stay queued."""
+        with self._worker_lock:
+            worker, self._worker = self._worker, None
+            self._worker_stop.set()
+        self._worker_wakeup.set()
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout)
+
+    def _run_worker(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            # Sleep until the next pass, or until an event is queued
+            self._worker_wakeup.wait(self.retry_interval if self._heap else None)
+            self._worker_wakeup.clear()
+            if stop.is_set():
+                break
+            try:
+                success, failure = self.process_sync()
+                if success or failure:
+                    logger.info(
+                        f"Processed retry queue: {success} succeeded, {failure} failed"
+                    )
+            except Exception as e:
+                logger.error(f"Error processing retry queue: {e}")
 
     def get_retryable_events(
         self, max_events: Optional[int] = None
     ) -> List[QueuedEvent]:
-        """Get events that are ready to be retried."""
+        """Take the events that are ready to be retried, earliest first.
+
+        Each returned event must be settled with settle_event().
+        """
         now = time.time()
         retryable = []
 
         with self._lock:
-            for _ in range(len(self.queue)):
+            while self._heap and self._heap[0][0] <= now:
                 if max_events and len(retryable) >= max_events:
                     break
-
-                event = self.queue[0]
-                # Use exponential backoff with the configured multiplier
-                backoff = self.config.retry_backoff**event.attempt_count
-                if now - event.last_attempt >= backoff:
-                    retryable.append(self.queue.popleft())
-                else:
-                    # If this event isn't ready, later ones won't be either
-                    break
+                retryable.append(heapq.heappop(self._heap)[2])
 
         return retryable
 
+    def settle_event(self, queued: QueuedEvent, sent: bool) -> None:
+        """Record the outcome of retrying an event from get_retryable_events().
+
+        Failed events are rescheduled until they exhaust max_retries.
+        """
+        key = _event_key(queued.event)
+        with self._lock:
+            if not sent:
+                queued.attempt_count += 1
+                queued.last_attempt = time.time()
+                if queued.attempt_count < self.config.max_retries:
+                    self._push(queued)
+                    return
+                logger.error(
+                    f"Event exhausted retry attempts: {queued.event.event_type}"
+                )
+            self._keys.discard(key)
+
+    def _start_processing(self) -> bool:
+        """Claim the queue for one processing pass; False if one is running."""
+        with self._lock:
+            if self._is_processing:
+                return False
+            self._is_processing = True
+            return True
+
+    def _finish_processing(self) -> None:
+        with self._lock:
+            self._is_processing = False
+
     def process_sync(self) -> Tuple[int, int]:
         """Process the retry queue synchronously.
 
+        Events that failed on the async client are retried through it.
+
         Returns:
             Tuple of (success_count, failure_count)
         """
-        if self._is_processing:
+        if not self._start_processing():
             return 0, 0
 
-        self._is_processing = True
         success_count = 0
         failure_count = 0
 
         try:
             from synth_sdk.tracing.immediate_client import (
-                ImmediateLogClient,  # Import here to avoid circular import
+                AsyncImmediateLogClient,  # Import here to avoid circular import
+                ImmediateLogClient,
             )
 
             client = ImmediateLogClient(self.config)
+            async_client = AsyncImmediateLogClient(self.config)
 
             while True:
                 batch = self.get_retryable_events(self._batch_size)
@@ -103,53 +253,56 @@ class RetryQueue:
 
                 for queued_event in batch:
                     try:
-                        if client.send_event(
-                            queued_event.event, queued_event.system_info
-                        ):
-                            success_count += 1
-                            logger.debug(
-                                f"Successfully retried event: {queued_event.event.event_type}"
-                            )
-                        else:
-                            failure_count += 1
-                            queued_event.attempt_count += 1
-                            queued_event.last_attempt = time.time()
-                            if queued_event.attempt_count < self.config.max_retries:
-                                self.add_failed_event(
+                        if queued_event.client == "async":
+                            sent = _run_coroutine(
+                                async_client.send_event(
                                     queued_event.event, queued_event.system_info
                                 )
-                            else:
-                                logger.error(
-                                    f"Event exhausted retry attempts: {queued_event.event.event_type}"
-                                )
+                            )
+                        else:
+                            sent = client.send_event(
+                                queued_event.event, queued_event.system_info
+                            )
                     except Exception as e:
                         logger.error(f"Error processing retry queue: {e}")
+                        sent = False
+                    self.settle_event(queued_event, sent)
+                    if sent:
+                        success_count += 1
+                        logger.debug(
+                            f"Successfully retried event: {queued_event.event.event_type}"
+                        )
+                    else:
                         failure_count += 1
 
         finally:
-            self._is_processing = False
+            self._finish_processing()
 
         return success_count, failure_count
 
     async def process_async(self) -> Tuple[int, int]:
         """Process the retry queue asynchronously.
 
+        Events that failed on the sync client are retried through it, in a
+        worker thread.
+
         Returns:
             Tuple of (success_count, failure_count)
         """
-        if self._is_processing:
+        if not self._start_processing():
             return 0, 0
 
-        self._is_processing = True
         success_count = 0
         failure_count = 0
 
         try:
             from synth_sdk.tracing.immediate_client import (
                 AsyncImmediateLogClient,  # Import here to avoid circular import
+                ImmediateLogClient,
             )
 
             client = AsyncImmediateLogClient(self.config)
+            sync_client = ImmediateLogClient(self.config)
 
             while True:
                 batch = self.get_retryable_events(self._batch_size)
@@ -158,42 +311,39 @@ class RetryQueue:
 
                 for queued_event in batch:
                     try:
-                        if await client.send_event(
-                            queued_event.event, queued_event.system_info
-                        ):
-                            success_count += 1
-                            logger.debug(
-                                f"Successfully retried event: {queued_event.event.event_type}"
+                        if queued_event.client == "sync":
+                            sent = await asyncio.to_thread(
+                                sync_client.send_event,
+                                queued_event.event,
+                                queued_event.system_info,
                             )
                         else:
-                            failure_count += 1
-                            queued_event.attempt_count += 1
-                            queued_event.last_attempt = time.time()
-                            if queued_event.attempt_count < self.config.max_retries:
-                                self.add_failed_event(
-                                    queued_event.event, queued_event.system_info
-                                )
-                            else:
-                                logger.error(
-                                    f"Event exhausted retry attempts: {queued_event.event.event_type}"
-                                )
+                            sent = await client.send_event(
+                                queued_event.event, queued_event.system_info
+                            )
                     except Exception as e:
                         logger.error(f"Error processing retry queue: {e}")
+                        sent = False
+                    self.settle_event(queued_event, sent)
+                    if sent:
+                        success_count += 1
+                        logger.debug(
+                            f"Successfully retried event: {queued_event.event.event_type}"
+                        )
+                    else:
                         failure_count += 1
 
         finally:
-            self._is_processing = False
+            self._finish_processing()
 
         return success_count, failure_count
 
 
-# Global retry queue instance
-retry_queue = RetryQueue(
-    TracingConfig(api_key="")
-)  # Will be initialized with proper config later
+# Global retry queue instance; it follows the tracing config once resolved
+retry_queue = RetryQueue(TracingConfig(api_key=""))
+tracing_config_manager.add_listener(retry_queue.configure)
 
 
 def initialize_retry_queue(config: TracingConfig) -> None:
-    """Initialize the global retry queue with the given config."""
-    global retry_queue
-    retry_queue = RetryQueue(config)
+    """Apply config to the global retry queue, keeping its queued events."""
+    retry_queue.configure(config)
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# Decisions remembered per system instance before the oldest are forgotten
+DEFAULT_MAX_INSTANCES = 100_000
+
+
+def _hash_fraction(key: str) -> float:
+    """Map key to a deterministic value in [0, 1)."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+class _TokenBucket:
+    """Admits at most rate events per second, with bursts of up to one second."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "lock")
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class HeadSampler:
+    """Decides up front which system instances and events are traced.
+
+    An instance is kept with probability sample_rate, decided from a hash of
+    its system_instance_id, so every process makes the same choice for the
+    same instance. The decision is made when the instance is first seen and
+    kept for its lifetime. event_type_rates apply a further rate per event
+    type, hashed on (system_instance_id, event_type), and
+    max_events_per_second caps the events opened across all instances.
+
+    Traced calls of unsampled instances or events run undecorated, without
+    capturing messages.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        event_type_rates: Optional[Dict[str, float]] = None,
+        max_events_per_second: Optional[float] = None,
+        max_instances: int = DEFAULT_MAX_INSTANCES,
+    ):
+        self._decisions: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self.max_instances = max_instances
+        self.configure(sample_rate, event_type_rates, max_events_per_second)
+
+    def configure(
+        self,
+        sample_rate: float = 1.0,
+        event_type_rates: Optional[Dict[str, float]] = None,
+        max_events_per_second: Optional[float] = None,
+    ) -> None:
+        """Set the sampling rates; instances already decided keep their decision.
+
+        With a sample rate of 1.0, no event type rates and no cap, sampling
+        is skipped entirely, unless an instance dropped earlier is still
+        remembered; it then stays dropped. Instances first seen while
+        sampling is skipped are decided when it is next turned on.
+        """
+        rates = {"sample_rate": sample_rate, **(event_type_rates or {})}
+        for name, rate in rates.items():
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError(f"Sample rate for {name} must be in [0, 1]: {rate}")
+        if max_events_per_second is not None and max_events_per_second <= 0:
+            raise ValueError("max_events_per_second must be positive")
+        self.sample_rate = sample_rate
+        self.event_type_rates = dict(event_type_rates or {})
+        self._bucket = (
+            _TokenBucket(max_events_per_second)
+            if max_events_per_second is not None
+            else None
+        )
+        with self._lock:
+            dropped = not all(self._decisions.values())
+        # Lets callers skip sampling with one check when everything is kept
+        self.active = (
+            sample_rate < 1.0
+            or bool(self.event_type_rates)
+            or self._bucket is not None
+            or dropped
+        )
+
+    def sample_instance(self, system_instance_id: str) -> bool:
+        """Whether the instance is traced, decided the first time it is seen."""
+        decision = self._decisions.get(system_instance_id)
+        if decision is None:
+            decision = _hash_fraction(system_instance_id) < self.sample_rate
+            with self._lock:
+                decision = self._decisions.setdefault(system_instance_id, decision)
+                if len(self._decisions) > self.max_instances:
+                    # Dicts keep insertion order, so this drops the oldest
+                    del self._decisions[next(iter(self._decisions))]
+        return decision
+
+    def sample(
+        self, system_instance_id: str, event_type: str, new_event: bool = True
+    ) -> bool:
+        """Whether an event of the instance is traced.
+
+        Only new events count against max_events_per_second.
+        """
+        if not self.active:
+            return True
+        if not self.sample_instance(system_instance_id):
+            return False
+        rate = self.event_type_rates.get(event_type)
+        if rate is not None and (
+            _hash_fraction(f"{system_instance_id}\x00{event_type}") >= rate
+        ):
+            return False
+        if new_event and self._bucket is not None:
+            return self._bucket.take()
+        return True
+
+    def forget(self, system_instance_id: str) -> None:
+        """Drop the decision kept for a finished system instance."""
+        with self._lock:
+            self._decisions.pop(system_instance_id, None)
+
+
+# Global sampler consulted by the tracing decorators and the event store
+head_sampler = HeadSampler(sample_rate=float(os.getenv("SYNTH_SAMPLE_RATE", "1.0")))
@@ -0,0 +1,190 @@
+import json
+import math
+import os
+from typing import Any, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    ComputeStep,
+    Dataset,
+    EnvironmentComputeStep,
+    Event,
+    EventPartitionElement,
+    MessageInputs,
+    MessageOutputs,
+    SystemTrace,
+    _item_to_dict,
+)
+from synth_sdk.tracing.message_deltas import DeltaMessages
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+_ENCODE_ERRORS = (TypeError, ValueError, OverflowError)
+if msgspec is not None:
+    _ENCODE_ERRORS += (msgspec.EncodeError,)
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+# Each encoder returns one level of the to_dict() form; nested trace objects
+# are left in place and encoded by the backend as it reaches them, so the
+# full dict tree is never built.
+def _encode_system_trace(trace: SystemTrace) -> Dict[str, Any]:
+    return {
+        "system_name": trace.system_name,
+        "system_id": trace.system_id,
+        "system_instance_id": trace.system_instance_id,
+        "partition": trace.partition,
+        "current_partition_index": trace.current_partition_index,
+        "metadata": trace.metadata if trace.metadata else None,
+    }
+
+
+def _encode_partition(partition: EventPartitionElement) -> Dict[str, Any]:
+    return {"partition_index": partition.partition_index, "events": partition.events}
+
+
+def _encode_dataset(dataset: Dataset) -> Dict[str, Any]:
+    return {"questions": dataset.questions, "reward_signals": dataset.reward_signals}
+
+
+_ENCODERS: Dict[type, Callable[[Any], Any]] = {
+    SystemTrace: _encode_system_trace,
+    EventPartitionElement: _encode_partition,
+    # Closed events memoize their serialized form; encode it without copying
+    Event: Event._serialized,
+    # Steps cache a shallow serialized form; encode it without copying, the
+    # DeltaMessages it may hold are expanded below
+    ComputeStep: ComputeStep._serialized,
+    AgentComputeStep: AgentComputeStep._serialized,
+    EnvironmentComputeStep: EnvironmentComputeStep._serialized,
+    MessageInputs: _item_to_dict,
+    ArbitraryInputs: _item_to_dict,
+    MessageOutputs: _item_to_dict,
+    ArbitraryOutputs: _item_to_dict,
+    DeltaMessages: DeltaMessages.expand,
+    Dataset: _encode_dataset,
+}
+
+
+def _encode_trace_object(obj: Any) -> Any:
+    """Fallback hook for JSON backends: encode one trace object one level deep."""
+    for cls in type(obj).__mro__:
+        encoder = _ENCODERS.get(cls)
+        if encoder is not None:
+            return encoder(obj)
+    if isinstance(obj, BaseModel) or hasattr(type(obj), "to_dict"):
+        # TrainingQuestion, RewardSignal, lazily read traces and other objects
+        # that serialize themselves
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _to_builtins(obj: Any) -> Any:
+    """Convert trace objects nested in obj to plain dicts and lists."""
+    if isinstance(obj, dict):
+        return {key: _to_builtins(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_builtins(value) for value in obj]
+    if isinstance(obj, (str, int, float, bool, type(None))):
+        return obj
+    return _to_builtins(_encode_trace_object(obj))
+
+
+def _without_non_finite(obj: Any) -> Any:
+    """Replace NaN and infinity in plain dicts and lists with None."""
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {key: _without_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_without_non_finite(value) for value in obj]
+    return obj
+
+
+class TraceSerializer:
+    """Encodes traces, datasets and upload payloads to JSON bytes.
+
+    Uses orjson when installed, then msgspec, then the standard library.
+    SystemTrace, Event, Dataset and the other trace objects can be passed
+    directly, anywhere in the value; the output has the same meaning as
+    json.dumps over their to_dict() forms, except that every backend encodes
+    NaN and infinity as null, as orjson and msgspec do, rather than emitting
+    invalid JSON or raising.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        self.set_backend(backend)
+
+    def set_backend(self, backend: Optional[str] = None) -> None:
+        """Select a backend by name, or the fastest installed one if None."""
+        available = {"orjson": orjson, "msgspec": msgspec, "json": json}
+        if backend is None:
+            backend = next(name for name in BACKENDS if available[name] is not None)
+        if backend not in available:
+            raise ValueError(f"Unknown serializer backend: {backend}")
+        if available[backend] is None:
+            raise ValueError(f"Serializer backend {backend} is not installed")
+        self.backend = backend
+        if backend == "msgspec":
+            self._msgspec_encoder = msgspec.json.Encoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode obj as JSON bytes.
+
+        Raises:
+            ValueError: If obj contains values that cannot be encoded as JSON
+        """
+        try:
+            if self.backend == "orjson":
+                return orjson.dumps(
+                    obj,
+                    default=_encode_trace_object,
+                    option=orjson.OPT_NON_STR_KEYS
+                    | orjson.OPT_PASSTHROUGH_DATACLASS
+                    | orjson.OPT_PASSTHROUGH_DATETIME,
+                )
+            if self.backend == "msgspec":
+                # msgspec encodes dataclasses natively, so convert them first
+                return self._msgspec_encoder.encode(_to_builtins(obj))
+            try:
+                return self._json_dumps(obj)
+            except ValueError as e:
+                if "Out of range float" not in str(e):
+                    raise
+                return self._json_dumps(_without_non_finite(_to_builtins(obj)))
+        except _ENCODE_ERRORS as e:
+            raise ValueError(f"Contains non-JSON-serializable values: {e}") from e
+
+    @staticmethod
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(
+            obj,
+            default=_encode_trace_object,
+            separators=(",", ":"),
+            allow_nan=False,
+        ).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        """Decode JSON produced by dumps."""
+        if self.backend == "orjson":
+            return orjson.loads(data)
+        if self.backend == "msgspec":
+            return msgspec.json.decode(data)
+        return json.loads(data)
+
+
+# Global serializer used by the upload path; SYNTH_SERIALIZER forces a backend
+serializer = TraceSerializer(os.getenv("SYNTH_SERIALIZER") or None)
@@ -0,0 +1,455 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Tuple
+
+from synth_sdk.tracing.abstractions import (
+    EventPartitionElement,
+    RewardSignal,
+    SystemTrace,
+)
+from synth_sdk.tracing.events.store import EventStore, event_store
+from synth_sdk.tracing.events.wal import (
+    WalRecord,
+    WriteAheadLog,
+    read_wal,
+    traces_from_records,
+)
+
+logger = logging.getLogger(__name__)
+
+# Events buffered across undecided instances before pressure is relieved
+DEFAULT_MAX_BUFFERED_EVENTS = 100_000
+# Events held in kept traces waiting for pop_kept()
+DEFAULT_MAX_KEPT_EVENTS = 100_000
+# Decisions remembered for instances whose events may still arrive, and
+# instances whose reward signals are held until their events arrive
+DEFAULT_MAX_DECISIONS = 100_000
+# The sampler's log is rewritten once it holds this many times the events
+# still held, and at least _WAL_MIN_COMPACT_RECORDS records
+_WAL_COMPACT_RATIO = 2
+_WAL_MIN_COMPACT_RECORDS = 10_000
+
+PressurePolicy = Literal["decide_oldest", "drop_oldest", "keep_oldest"]
+
+
+@dataclass
+class TraceOutcome:
+    """What is known about a system instance when its trace is judged."""
+
+    trace: SystemTrace
+    reward_signals: List[RewardSignal] = field(default_factory=list)
+    # Exceptions raised by traced functions, see EventStore.record_error
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    # True if judged by finalize() or finalize_all(), once the instance ended.
+    # False if judged as its reward signals arrived or early under memory
+    # pressure, when more of its events may still follow
+    finalized: bool = False
+
+    @property
+    def rewards(self) -> List[float]:
+        return [float(signal.reward) for signal in self.reward_signals]
+
+
+KeepPolicy = Callable[[TraceOutcome], bool]
+
+
+def reward_or_error_policy(
+    low: Optional[float] = None, high: Optional[float] = None
+) -> KeepPolicy:
+    """Keep traces with errors, a reward <= low or a reward >= high."""
+
+    def keep(outcome: TraceOutcome) -> bool:
+        if outcome.errors:
+            return True
+        return any(
+            (low is not None and reward <= low) or (high is not None and reward >= high)
+            for reward in outcome.rewards
+        )
+
+    return keep
+
+
+@dataclass
+class _Pending:
+    trace: SystemTrace
+    errors: List[Dict[str, Any]]
+    num_events: int
+
+
+def _merge_trace(into: SystemTrace, trace: SystemTrace) -> int:
+    """Append the events of a later drained chunk; returns how many were added."""
+    added = 0
+    for partition in trace.partition:
+        current = into.get_partition(partition.partition_index)
+        if current is None:
+            current = EventPartitionElement(
+                partition_index=partition.partition_index, events=[]
+            )
+            into.add_partition(current)
+        current.events.extend(partition.events)
+        added += len(partition.events)
+    into.current_partition_index = max(
+        into.current_partition_index, trace.current_partition_index
+    )
+    return added
+
+
+def _count_events(trace: SystemTrace) -> int:
+    return sum(len(partition.events) for partition in trace.partition)
+
+
+def _live_records(records: Iterable[WalRecord]) -> Tuple[List[WalRecord], int]:
+    """Drop the records released by a later event-less record; returns the
+    remaining records and how many were read."""
+    live: Dict[str, List[WalRecord]] = {}
+    count = 0
+    for record in records:
+        count += 1
+        if record[3] is None:
+            live.pop(record[2], None)
+        else:
+            live.setdefault(record[2], []).append(record)
+    return [record for records in live.values() for record in records], count
+
+
+class TailSampler:
+    """Buffers traces per system instance and keeps only those worth uploading.
+
+    collect() drains the event store into per-instance buffers. An instance
+    is judged by keep_policy once reward signals for it arrive or it is
+    finalized; kept traces are handed to upload() by pop_kept(), the rest are
+    discarded. Events arriving after an instance was judged follow its
+    decision.
+
+    At most max_buffered_events are buffered for undecided instances. Beyond
+    that the oldest instances are, per on_pressure, judged early with what
+    is known so far ("decide_oldest"), discarded ("drop_oldest") or kept
+    ("keep_oldest"). At most max_kept_events wait for pop_kept(); beyond that
+    the oldest kept traces are dropped with a warning. Reward signals that
+    arrive before any event of their instance are held for at most
+    max_decisions instances.
+
+    Draining the store truncates its write-ahead log. With wal_path, the
+    sampler logs the traces it holds itself, until they are discarded or
+    handed out by pop_kept(); a sampler opened on the same path after a
+    crash recovers them as undecided.
+
+    While open, the sampler has traced functions note their errors in the
+    trace metadata (see EventStore.record_error); close() stops that.
+
+    Usage:
+        sampler = TailSampler(reward_or_error_policy(low=0.0, high=1.0))
+        ...
+        upload(dataset, tail_sampler=sampler)
+    """
+
+    def __init__(
+        self,
+        keep_policy: KeepPolicy,
+        max_buffered_events: int = DEFAULT_MAX_BUFFERED_EVENTS,
+        on_pressure: PressurePolicy = "decide_oldest",
+        store: Optional[EventStore] = None,
+        max_decisions: int = DEFAULT_MAX_DECISIONS,
+        max_kept_events: int = DEFAULT_MAX_KEPT_EVENTS,
+        wal_path: Optional[str] = None,
+    ):
+        if on_pressure not in ("decide_oldest", "drop_oldest", "keep_oldest"):
+            raise ValueError(f"Unknown pressure policy: {on_pressure}")
+        self.keep_policy = keep_policy
+        self.max_buffered_events = max_buffered_events
+        self.on_pressure = on_pressure
+        self.store = store if store is not None else event_store
+        self.max_decisions = max_decisions
+        self.max_kept_events = max_kept_events
+
+        # Undecided instances in arrival order, oldest first
+        self._pending: Dict[str, _Pending] = {}
+        self._buffered_events = 0
+        # system_instance_id -> reward signals received before its events
+        self._signals: Dict[str, List[RewardSignal]] = {}
+        # system_instance_id -> keep decision, oldest first
+        self._decisions: Dict[str, bool] = {}
+        # Kept traces waiting for pop_kept(), one per instance, oldest first
+        self._kept: Dict[str, SystemTrace] = {}
+        self._kept_events = 0
+        self.kept_count = 0
+        self.discarded_count = 0
+        self.dropped_kept_count = 0
+        self._lock = threading.RLock()
+
+        self._wal: Optional[WriteAheadLog] = None
+        self._logged_records = 0
+        if wal_path is not None:
+            self._open_wal(wal_path)
+        self._closed = False
+        self.store.enable_error_recording()
+
+    def collect(self) -> None:
+        """Move every trace out of the event store into the sampler."""
+        traces = self.store.drain()
+        with self._lock:
+            for trace in traces:
+                self._add_trace(trace)
+            self._relieve_pressure()
+            if self._wal is not None and traces:
+                # The store no longer logs them
+                self._wal.sync()
+                self._compact_wal_if_needed()
+
+    def add_reward_signal(self, signal: RewardSignal) -> None:
+        self.add_reward_signals([signal])
+
+    def add_reward_signals(self, signals: Iterable[RewardSignal]) -> None:
+        """Record reward signals and judge the instances they belong to.
+
+        Signals already received are ignored, so the same dataset can be
+        passed on every upload.
+        """
+        self.collect()
+        with self._lock:
+            arrived = []
+            for signal in signals:
+                system_instance_id = signal.system_instance_id
+                if system_instance_id in self._decisions:
+                    continue
+                held = self._signals.setdefault(system_instance_id, [])
+                if signal not in held:
+                    held.append(signal)
+                    arrived.append(system_instance_id)
+            for system_instance_id in dict.fromkeys(arrived):
+                if system_instance_id in self._pending:
+                    self._decide(system_instance_id, finalized=False)
+            while len(self._signals) > self.max_decisions:
+                # Instances never seen; dicts keep insertion order
+                del self._signals[next(iter(self._signals))]
+
+    def finalize(self, system_instance_id: str) -> bool:
+        """Judge an instance now, e.g. when its episode ends without a reward.
+
+        Returns:
+            Whether its trace is kept
+        """
+        self.collect()
+        with self._lock:
+            if system_instance_id in self._pending:
+                return self._decide(system_instance_id, finalized=True)
+            return self._decisions.get(system_instance_id, False)
+
+    def finalize_all(self) -> None:
+        """Judge every buffered instance."""
+        self.collect()
+        with self._lock:
+            for system_instance_id in list(self._pending):
+                self._decide(system_instance_id, finalized=True)
+
+    def pop_kept(self) -> List[SystemTrace]:
+        """Return and clear the kept traces not yet handed out."""
+        with self._lock:
+            kept = list(self._kept.values())
+            self._kept = {}
+            self._kept_events = 0
+            for trace in kept:
+                self._release(trace.system_instance_id)
+            if self._wal is not None and kept:
+                # Not recovered again once handed out
+                self._wal.sync()
+                self._compact_wal_if_needed()
+        return kept
+
+    def requeue(self, traces: List[SystemTrace]) -> None:
+        """Put traces from pop_kept() back, e.g. after a failed upload."""
+        with self._lock:
+            for trace in traces:
+                self._log(trace)
+                later = self._kept.pop(trace.system_instance_id, None)
+                self._kept[trace.system_instance_id] = trace
+                self._kept_events += _count_events(trace)
+                if later is not None:
+                    _merge_trace(trace, later)
+            self._limit_kept()
+
+    def close(self) -> None:
+        """Stop recording errors for the sampler and close its log, if any."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            wal, self._wal = self._wal, None
+        self.store.disable_error_recording()
+        if wal is not None:
+            wal.close()
+
+    @property
+    def buffered_events(self) -> int:
+        """Events held for instances that are not judged yet."""
+        return self._buffered_events
+
+    @property
+    def kept_events(self) -> int:
+        """Events held in kept traces waiting for pop_kept()."""
+        return self._kept_events
+
+    def _add_trace(self, trace: SystemTrace, log: bool = True) -> None:
+        system_instance_id = trace.system_instance_id
+        errors = (trace.metadata or {}).get("errors", [])
+        decision = self._decisions.get(system_instance_id)
+        if decision is not None:
+            if decision:
+                if log:
+                    self._log(trace)
+                self._keep(trace)
+            return
+
+        if log:
+            self._log(trace)
+        pending = self._pending.get(system_instance_id)
+        if pending is None:
+            num_events = _count_events(trace)
+            self._pending[system_instance_id] = _Pending(
+                trace=trace, errors=list(errors), num_events=num_events
+            )
+        else:
+            num_events = _merge_trace(pending.trace, trace)
+            pending.num_events += num_events
+            pending.errors.extend(errors)
+            if trace.metadata:
+                pending.trace.metadata = {
+                    **(pending.trace.metadata or {}),
+                    **trace.metadata,
+                    "errors": pending.errors,
+                }
+        self._buffered_events += num_events
+        if system_instance_id in self._signals:
+            # Its reward signals arrived before its events
+            self._decide(system_instance_id, finalized=False)
+
+    def _keep(self, trace: SystemTrace) -> None:
+        kept = self._kept.get(trace.system_instance_id)
+        if kept is None:
+            self._kept[trace.system_instance_id] = trace
+            self._kept_events += _count_events(trace)
+        else:
+            self._kept_events += _merge_trace(kept, trace)
+        self._limit_kept()
+
+    def _limit_kept(self) -> None:
+        while self._kept_events > self.max_kept_events and self._kept:
+            oldest, trace = next(iter(self._kept.items()))
+            del self._kept[oldest]
+            self._kept_events -= _count_events(trace)
+            self._release(oldest)
+            self.dropped_kept_count += 1
+            logger.warning(
+                f"Dropping kept trace of {oldest}: more than {self.max_kept_events} "
+                "kept events are waiting for pop_kept()"
+            )
+
+    def _decide(self, system_instance_id: str, finalized: bool) -> bool:
+        pending = self._pending.pop(system_instance_id)
+        self._buffered_events -= pending.num_events
+        outcome = TraceOutcome(
+            trace=pending.trace,
+            reward_signals=self._signals.pop(system_instance_id, []),
+            errors=pending.errors,
+            finalized=finalized,
+        )
+        try:
+            keep = bool(self.keep_policy(outcome))
+        except Exception as e:
+            # Err on the side of keeping data the policy could not judge
+            logger.error(f"Keep policy failed for {system_instance_id}: {e}")
+            keep = True
+        self._record_decision(system_instance_id, keep)
+        if keep:
+            self._keep(pending.trace)
+        else:
+            self._release(system_instance_id)
+        return keep
+
+    def _record_decision(self, system_instance_id: str, keep: bool) -> None:
+        self._decisions[system_instance_id] = keep
+        if keep:
+            self.kept_count += 1
+        else:
+            self.discarded_count += 1
+        if len(self._decisions) > self.max_decisions:
+            # Dicts keep insertion order, so this drops the oldest
+            del self._decisions[next(iter(self._decisions))]
+
+    def _relieve_pressure(self) -> None:
+        while self._buffered_events > self.max_buffered_events and self._pending:
+            oldest = next(iter(self._pending))
+            if self.on_pressure == "decide_oldest":
+                self._decide(oldest, finalized=False)
+                continue
+            pending = self._pending.pop(oldest)
+            self._buffered_events -= pending.num_events
+            self._signals.pop(oldest, None)
+            keep = self.on_pressure == "keep_oldest"
+            self._record_decision(oldest, keep)
+            if keep:
+                self._keep(pending.trace)
+            else:
+                self._release(oldest)
+
+    def _open_wal(self, path: str) -> None:
+        """Recover the traces held when the log was last written, then log to it."""
+        recovered: List[SystemTrace] = []
+        if os.path.exists(path):
+            records, self._logged_records = _live_records(read_wal(path))
+            recovered = traces_from_records(records)
+        self._wal = WriteAheadLog(path)
+        with self._lock:
+            for trace in recovered:
+                # Already in the log
+                self._add_trace(trace, log=False)
+            self._relieve_pressure()
+        if recovered:
+            logger.info(f"Recovered {len(recovered)} held traces from {path}")
+
+    def _log(self, trace: SystemTrace) -> None:
+        if self._wal is None:
+            return
+        for partition in trace.partition:
+            for event in partition.events:
+                self._wal.append(
+                    trace.system_name,
+                    trace.system_id,
+                    trace.system_instance_id,
+                    event,
+                )
+                self._logged_records += 1
+
+    def _release(self, system_instance_id: str) -> None:
+        """Log that the instance's events logged so far are no longer held."""
+        if self._wal is None:
+            return
+        # A record without an event, dropped with them on recovery
+        self._wal.append(None, None, system_instance_id, None)
+        self._logged_records += 1
+
+    def _compact_wal_if_needed(self) -> None:
+        """Rewrite the log with only the held traces once it is mostly released."""
+        if self._wal is None or self._logged_records <= max(
+            _WAL_COMPACT_RATIO * (self._buffered_events + self._kept_events),
+            _WAL_MIN_COMPACT_RECORDS,
+        ):
+            return
+        path = self._wal.path
+        compact_path = path + ".compact"
+        if os.path.exists(compact_path):
+            # Left by a crash during an earlier compaction
+            os.remove(compact_path)
+        wal, self._wal = self._wal, WriteAheadLog(compact_path)
+        self._logged_records = 0
+        for pending in self._pending.values():
+            self._log(pending.trace)
+        for trace in self._kept.values():
+            self._log(trace)
+        self._wal.sync()
+        # Atomically replaces the old log; the open mapping follows the file
+        os.replace(compact_path, path)
+        self._wal.path = path
+        wal.close()
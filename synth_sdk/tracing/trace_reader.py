@@ -0,0 +1,578 @@
+import copy
+import mmap
+import os
+import re
+from array import array
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    EnvironmentComputeStep,
+    Event,
+    EventPartitionElement,
+    MessageInputs,
+    MessageOutputs,
+    SystemTrace,
+)
+from synth_sdk.tracing.serialization import serializer
+
+# Regex pieces for JSON text whose escaped backslashes and quotes have been
+# blanked out: a string, a run of non-structural bytes, and a "flat"
+# container holding no other containers (e.g. a single message dict)
+_STRING = rb'"[^"]*"'
+_OTHER = rb'[^"\[\]{}]*'
+_FLAT = rb"[\[{]" + _OTHER + rb"(?:" + _STRING + _OTHER + rb")*[\]}]"
+
+# Matches up to and including the next bracket outside strings and flat
+# containers. Those are skipped inside the regex engine, so scanning costs one
+# Python step per nesting container rather than per byte or per message.
+_BRACKET = re.compile(
+    _OTHER + rb"(?:(?:" + _STRING + rb"|" + _FLAT + rb")" + _OTHER + rb")*([\[\]{}])"
+)
+
+# Bytes scanned per slice of the mapping; doubled for longer strings
+_SCAN_WINDOW = 16 * 1024 * 1024
+
+_OPENING = frozenset(b"[{")
+
+# Stands in for a nested container while an object's other fields are decoded
+_PLACEHOLDER_KEY = "\x00"
+
+# Nesting depth of each event object: traces array, trace, partition array,
+# partition, events array, event
+_EVENT_DEPTH = 5
+
+# A container located in the file: [start, end, nested containers], where
+# the nested list is None past the depth that was scanned
+Node = list
+
+
+def _brackets(buffer, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """Yield (offset, byte) of each structural bracket in buffer[start:end].
+
+    start must be outside any string. The buffer is scanned in windows with
+    escaped backslashes and quotes replaced by same-length filler, so the
+    regex never has to handle escapes.
+    """
+    window = _SCAN_WINDOW
+    match_bracket = _BRACKET.match
+    while start < end:
+        stop = min(start + window, end)
+        chunk = buffer[start:stop]
+        if b"\\\\" in chunk:
+            chunk = chunk.replace(b"\\\\", b"__")
+        if b'\\"' in chunk:
+            chunk = chunk.replace(b'\\"', b"__")
+        position = 0
+        while True:
+            # Anchored, so a string cut off by the window end is never
+            # mistaken for structure; it is rescanned in the next window
+            match = match_bracket(chunk, position)
+            if match is None:
+                break
+            position = match.end()
+            yield start + position - 1, chunk[position - 1]
+        if position == 0:
+            if stop == end:
+                return
+            window *= 2
+        start += position
+
+
+def _scan_containers(
+    buffer,
+    start: int,
+    max_depth: int,
+    end: Optional[int] = None,
+    on_child: Optional[Callable[[Node], Any]] = None,
+) -> Node:
+    """Locate the containers nested in the one opening at buffer[start].
+
+    Nested containers are recorded down to max_depth levels. Flat containers
+    are not recorded; they are decoded together with the scalar fields. end,
+    if known, bounds the scan to the container. If given, on_child replaces
+    each direct child once it has been scanned.
+    """
+    root = [start, None, []]
+    stack = [root]
+    end = len(buffer) if end is None else end
+    for position, bracket in _brackets(buffer, start + 1, end):
+        if bracket in _OPENING:
+            depth = len(stack)
+            node = None
+            if depth <= max_depth:
+                node = [position, None, [] if depth < max_depth else None]
+                stack[-1][2].append(node)
+            stack.append(node)
+        else:
+            node = stack.pop()
+            if node is not None:
+                node[1] = position + 1
+            if len(stack) == 1 and on_child is not None:
+                root[2][-1] = on_child(node)
+            elif not stack:
+                return root
+    raise ValueError(f"Unterminated JSON container at offset {start}")
+
+
+def _timestamp(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _items_from_dicts(items: List[Any], message_type: type, arbitrary_type: type):
+    converted = []
+    for item in items:
+        if isinstance(item, dict) and "messages" in item:
+            item = message_type(messages=item["messages"])
+        elif isinstance(item, dict) and len(item) == 1:
+            item = arbitrary_type(next(iter(item.values())))
+        converted.append(item)
+    return converted
+
+
+def _step_from_dict(data: Dict[str, Any], step_type: type):
+    kwargs = {
+        "event_order": data.get("event_order"),
+        "compute_ended": _timestamp(data.get("compute_ended")),
+        "compute_began": _timestamp(data.get("compute_began")),
+        "compute_input": _items_from_dicts(
+            data.get("compute_input", []), MessageInputs, ArbitraryInputs
+        ),
+        "compute_output": _items_from_dicts(
+            data.get("compute_output", []), MessageOutputs, ArbitraryOutputs
+        ),
+    }
+    if step_type is AgentComputeStep:
+        kwargs["model_name"] = data.get("model_name")
+    return step_type(**kwargs)
+
+
+def _event_from_dict(
+    data: Dict[str, Any],
+    system_name: Optional[str],
+    system_id: Optional[str],
+    system_instance_id: str,
+) -> Event:
+    agent_step = data.get("agent_compute_step")
+    return Event(
+        system_instance_id=system_instance_id,
+        event_type=data.get("event_type"),
+        opened=data.get("opened"),
+        closed=data.get("closed"),
+        partition_index=data.get("partition_index"),
+        agent_compute_step=_step_from_dict(agent_step, AgentComputeStep)
+        if agent_step
+        else None,
+        environment_compute_steps=[
+            _step_from_dict(step, EnvironmentComputeStep)
+            for step in data.get("environment_compute_steps", [])
+        ],
+        system_name=system_name,
+        system_id=system_id,
+    )
+
+
+class _LazyRecord:
+    """A JSON object in a trace file, decoded one level at a time.
+
+    Scalar fields are decoded together on first access, with nested objects
+    and arrays left out; each nested value is decoded (or wrapped in another
+    lazy record) only when its field is read.
+    """
+
+    __slots__ = (
+        "_reader",
+        "_start",
+        "_end",
+        "_children",
+        "_scalars",
+        "_containers",
+        "_values",
+        "_assigned",
+    )
+
+    # field -> factory(reader, node) for nested values that stay lazy
+    _wrappers: Dict[str, Callable[["TraceReader", Node], Any]] = {}
+    # Values of fields missing from the file
+    _defaults: Dict[str, Any] = {}
+
+    def __init__(self, reader: "TraceReader", node: Node):
+        self._reader = reader
+        self._start, self._end, self._children = node
+        self._scalars: Optional[Dict[str, Any]] = None
+        self._containers: Dict[str, Node] = {}
+        self._values: Dict[str, Any] = {}
+        self._assigned: Dict[str, Any] = {}
+
+    def _decode_fields(self) -> None:
+        children = self._children
+        if children is None:
+            children = _scan_containers(
+                self._reader._buffer, self._start, 1, self._end
+            )[2]
+        self._scalars, self._containers = self._reader._decode_shallow(
+            self._start, self._end, children
+        )
+        self._children = None
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        values = self._values
+        if name in values:
+            return values[name]
+        if self._scalars is None:
+            self._decode_fields()
+        if name in self._scalars:
+            return self._scalars[name]
+        node = self._containers.get(name)
+        if node is None:
+            if name in self._defaults:
+                # Copied per record, so the class-level lists are never shared
+                value = values[name] = copy.copy(self._defaults[name])
+                return value
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            )
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            value = self._reader._decode(node)
+        else:
+            value = wrapper(self._reader, node)
+            # The wrapper keeps what it needs of the located containers
+            del self._containers[name]
+        values[name] = value
+        return value
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in _LazyRecord.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            # Assignments shadow the file, e.g. closing an open event
+            self._values[name] = value
+            self._assigned[name] = value
+
+    def _modified(self) -> bool:
+        return bool(self._assigned) or any(
+            record._modified()
+            for value in self._values.values()
+            for _, record in _created_records(value)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decode the whole object as written to the file, with any
+        assignments to it or to its nested records applied."""
+        data = self._reader._decode((self._start, self._end))
+        for name, value in self._values.items():
+            if name in self._assigned:
+                data[name] = value
+                continue
+            for index, record in _created_records(value):
+                if record._modified():
+                    if index is None:
+                        data[name] = record.to_dict()
+                    else:
+                        data[name][index] = record.to_dict()
+        return data
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} at offset {self._start}>"
+
+
+class _LazyList(Sequence):
+    """Lazy records over located containers, created on first access.
+
+    Only the offsets of each container and of its direct children are kept,
+    in int64 arrays, which are far smaller than a list per element.
+    """
+
+    __slots__ = (
+        "_reader",
+        "_starts",
+        "_ends",
+        "_child_offsets",
+        "_child_bounds",
+        "_record_type",
+        "_records",
+    )
+
+    def __init__(self, reader: "TraceReader", nodes: List[Node], record_type: type):
+        self._reader = reader
+        self._record_type = record_type
+        self._records: Dict[int, _LazyRecord] = {}
+        self._starts = array("q", (node[0] for node in nodes))
+        self._ends = array("q", (node[1] for node in nodes))
+        self._child_offsets: Optional[array] = None
+        if any(node[2] is not None for node in nodes):
+            # Children of element i are pairs child_offsets[i]:child_offsets[i+1]
+            self._child_offsets = array("q", [0])
+            self._child_bounds = array("q")
+            for node in nodes:
+                for child in node[2] or ():
+                    self._child_bounds.append(child[0])
+                    self._child_bounds.append(child[1])
+                self._child_offsets.append(len(self._child_bounds))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _node(self, index: int) -> Node:
+        children = None
+        if self._child_offsets is not None:
+            bounds = self._child_bounds
+            children = [
+                [bounds[i], bounds[i + 1], None]
+                for i in range(
+                    self._child_offsets[index], self._child_offsets[index + 1], 2
+                )
+            ]
+        return [self._starts[index], self._ends[index], children]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        record = self._records.get(index)
+        if record is None:
+            record = self._record_type(self._reader, self._node(index))
+            self._records[index] = record
+        return record
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} of {len(self)} {self._record_type.__name__}>"
+
+
+def _created_records(value: Any):
+    """Yield (index, record) for the lazy records a field value has created."""
+    if isinstance(value, _LazyRecord):
+        yield None, value
+    elif isinstance(value, _LazyList):
+        yield from value._records.items()
+    elif isinstance(value, list) and value and isinstance(value[0], _LazyRecord):
+        yield from enumerate(value)
+
+
+def _located_children(reader: "TraceReader", node: Node, depth: int) -> List[Node]:
+    if node[2] is None:
+        return _scan_containers(reader._buffer, node[0], depth, node[1])[2]
+    return node[2]
+
+
+def _lazy_step(reader: "TraceReader", node: Node) -> "LazyComputeStep":
+    return LazyComputeStep(reader, node)
+
+
+def _lazy_steps(reader: "TraceReader", node: Node) -> _LazyList:
+    return _LazyList(reader, _located_children(reader, node, 2), LazyComputeStep)
+
+
+def _lazy_events(reader: "TraceReader", node: Node) -> _LazyList:
+    return _LazyList(reader, _located_children(reader, node, 2), LazyEvent)
+
+
+def _lazy_partitions(reader: "TraceReader", node: Node) -> List["LazyPartition"]:
+    # Partitions are few; each keeps its located events until they are read
+    return [
+        LazyPartition(reader, child) for child in _located_children(reader, node, 4)
+    ]
+
+
+class LazyComputeStep(_LazyRecord):
+    """A compute step whose inputs and outputs are decoded when first read."""
+
+    __slots__ = ()
+    _defaults = {"model_name": None, "compute_input": [], "compute_output": []}
+
+
+class LazyEvent(_LazyRecord):
+    """An event decoded on access; reading event_type, opened, closed or the
+    step timings does not decode the compute inputs and outputs."""
+
+    __slots__ = ()
+    _wrappers = {
+        "agent_compute_step": _lazy_step,
+        "environment_compute_steps": _lazy_steps,
+    }
+    _defaults = {"agent_compute_step": None, "environment_compute_steps": []}
+
+    @property
+    def agent_compute_steps(self) -> List[LazyComputeStep]:
+        step = self.agent_compute_step
+        return [step] if step is not None else []
+
+    def materialize(
+        self,
+        system_name: Optional[str] = None,
+        system_id: Optional[str] = None,
+        system_instance_id: Optional[str] = None,
+    ) -> Event:
+        """Decode the event into an Event."""
+        return _event_from_dict(
+            self.to_dict(), system_name, system_id, system_instance_id
+        )
+
+
+class LazyPartition(_LazyRecord):
+    """A partition whose events are located in the file but not decoded."""
+
+    __slots__ = ()
+    _wrappers = {"events": _lazy_events}
+    _defaults = {"events": []}
+
+
+class LazySystemTrace(_LazyRecord):
+    """A SystemTrace proxy over an exported trace file.
+
+    Has the attributes of SystemTrace. Partitions are indexed when the file
+    is opened, events are decoded when accessed, and to_dict() decodes the
+    trace as exported, so traces can be uploaded again without being rebuilt
+    from Event objects.
+    """
+
+    __slots__ = ()
+    _wrappers = {"partition": _lazy_partitions}
+    _defaults = {
+        "system_name": None,
+        "system_id": None,
+        "metadata": None,
+        "current_partition_index": 0,
+        "partition": [],
+    }
+
+    def get_partition(self, partition_index: int) -> Optional[LazyPartition]:
+        for partition in self.partition:
+            if partition.partition_index == partition_index:
+                return partition
+        return None
+
+    def materialize(self) -> SystemTrace:
+        """Decode the whole trace into a SystemTrace."""
+        return SystemTrace(
+            system_name=self.system_name,
+            system_id=self.system_id,
+            system_instance_id=self.system_instance_id,
+            metadata=self.metadata,
+            partition=[
+                EventPartitionElement(
+                    partition_index=partition.partition_index,
+                    events=[
+                        event.materialize(
+                            self.system_name, self.system_id, self.system_instance_id
+                        )
+                        for event in partition.events
+                    ],
+                )
+                for partition in self.partition
+            ],
+            current_partition_index=self.current_partition_index,
+        )
+
+
+class TraceReader:
+    """Memory-mapped reader of exported system traces.
+
+    Reads the JSON written by event_store.write_system_traces_json or a
+    json dump of SystemTrace.to_dict() forms (a list, or a single trace).
+    Opening the file scans it once to index the byte offsets of every trace,
+    partition and event; nothing below the partition level is decoded until
+    it is accessed. The proxies read from the mapping, so keep the reader
+    open while they are in use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.close()
+            raise ValueError(f"Trace file {path} is empty")
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.traces = self._index()
+        except Exception:
+            self.close()
+            raise
+
+    def _index(self) -> List[LazySystemTrace]:
+        first = re.match(rb"\s*([\[{])", self._buffer)
+        if first is None:
+            raise ValueError(f"{self.path} does not hold a JSON list or object")
+        start = first.start(1)
+        if first.group(1) == b"{":
+            # A single trace, one level shallower than in a list
+            return [
+                self._index_trace(_scan_containers(self._buffer, start, _EVENT_DEPTH))
+            ]
+        # Index each trace as soon as it is scanned, so only one trace's
+        # located containers are held as lists at a time
+        return _scan_containers(
+            self._buffer, start, _EVENT_DEPTH + 1, on_child=self._index_trace
+        )[2]
+
+    def _index_trace(self, node: Node) -> LazySystemTrace:
+        trace = LazySystemTrace(self, node)
+        for partition in trace.partition:
+            # Decodes the partition index and compacts the event offsets
+            partition.events
+        return trace
+
+    def _decode(self, node) -> Any:
+        return serializer.loads(self._buffer[node[0] : node[1]])
+
+    def _decode_shallow(
+        self, start: int, end: int, children: List[Node]
+    ) -> Tuple[Dict[str, Any], Dict[str, Node]]:
+        """Decode an object's fields except the given nested containers."""
+        pieces = []
+        position = start
+        for number, child in enumerate(children):
+            pieces.append(self._buffer[position : child[0]])
+            pieces.append(b'{"\\u0000":%d}' % number)
+            position = child[1]
+        pieces.append(self._buffer[position:end])
+        data = serializer.loads(b"".join(pieces))
+        scalars = {}
+        containers = {}
+        for name, value in data.items():
+            if (
+                isinstance(value, dict)
+                and _PLACEHOLDER_KEY in value
+                and len(value) == 1
+            ):
+                containers[name] = children[value[_PLACEHOLDER_KEY]]
+            else:
+                scalars[name] = value
+        return scalars, containers
+
+    def __iter__(self):
+        return iter(self.traces)
+
+    def __len__(self) -> int:
+        return len(self.traces)
+
+    def __getitem__(self, index: int) -> LazySystemTrace:
+        return self.traces[index]
+
+    def close(self) -> None:
+        """Release the mapping; proxies cannot decode anything afterwards."""
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_system_traces(path: str) -> TraceReader:
+    """Open an exported trace file and index its traces lazily."""
+    return TraceReader(path)
@@ -1,12 +1,76 @@
 import asyncio
 import contextvars
-from typing import Dict, List, Literal, Optional, Tuple, Union
+from collections import namedtuple
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple, Union
 
 from pydantic import BaseModel
 
 from synth_sdk.tracing.config import VALID_TYPES
+from synth_sdk.tracing.kill_switch import tracing_switch
 from synth_sdk.tracing.local import _local
 
+
+class _TrackedRecord:
+    """Read-only mapping access for the tuple-backed tracker records.
+
+    Records are plain tuples, far smaller than the dicts they replace, but
+    still support record["origin"], "messages" in record and record.get(...)
+    so code written against the dict records keeps working.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._fields.index(key)
+            except ValueError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._fields
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self._fields else default
+
+    def keys(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self._fields, tuple.__iter__(self))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+
+class LMInputRecord(
+    _TrackedRecord,
+    namedtuple("LMInputRecord", "origin messages model_name model_params finetune"),
+):
+    """Raw record of a track_lm call."""
+
+    __slots__ = ()
+
+
+class LMOutputRecord(
+    _TrackedRecord,
+    namedtuple("LMOutputRecord", "origin messages model_name finetune"),
+):
+    """Raw record of a track_lm_output call."""
+
+    __slots__ = ()
+
+
+class StateRecord(
+    _TrackedRecord,
+    namedtuple("StateRecord", "origin variable_name variable_value annotation"),
+):
+    """Raw record of a track_state call."""
+
+    __slots__ = ()
+
+
 # Existing SynthTrackerSync and SynthTrackerAsync classes...
 
 
@@ -37,13 +101,13 @@ class SynthTrackerSync:
         # print("Tracking LM call in sync context - ",messages)  # Added logging
         if getattr(cls._local, "initialized", False):
             cls._local.inputs.append(
-                {
-                    "origin": "agent",
-                    "messages": messages,
-                    "model_name": model_name,
-                    "model_params": model_params,
-                    "finetune": finetune,
-                }
+                LMInputRecord(
+                    origin="agent",
+                    messages=messages,
+                    model_name=model_name,
+                    model_params=model_params,
+                    finetune=finetune,
+                )
             )
         else:
             pass
@@ -64,12 +128,12 @@ class SynthTrackerSync:
             if isinstance(variable_value, BaseModel):
                 variable_value = variable_value.model_dump()
             cls._local.outputs.append(
-                {
-                    "origin": origin,
-                    "variable_name": variable_name,
-                    "variable_value": variable_value,
-                    "annotation": annotation,
-                }
+                StateRecord(
+                    origin=origin,
+                    variable_name=variable_name,
+                    variable_value=variable_value,
+                    annotation=annotation,
+                )
             )
             # logger.debug(f"Tracked state: {variable_name}")
         else:
@@ -102,12 +166,12 @@ class SynthTrackerSync:
         """
         if getattr(cls._local, "initialized", False):
             cls._local.outputs.append(
-                {
-                    "origin": "agent",
-                    "messages": messages,
-                    "model_name": model_name,
-                    "finetune": finetune,
-                }
+                LMOutputRecord(
+                    origin="agent",
+                    messages=messages,
+                    model_name=model_name,
+                    finetune=finetune,
+                )
             )
         else:
             pass
@@ -146,13 +210,13 @@ class SynthTrackerAsync:
         if trace_initialized_var.get():
             trace_inputs = trace_inputs_var.get()
             trace_inputs.append(
-                {
-                    "origin": "agent",
-                    "messages": messages,
-                    "model_name": model_name,
-                    "model_params": model_params,
-                    "finetune": finetune,
-                }
+                LMInputRecord(
+                    origin="agent",
+                    messages=messages,
+                    model_name=model_name,
+                    model_params=model_params,
+                    finetune=finetune,
+                )
             )
             trace_inputs_var.set(trace_inputs)
         else:
@@ -181,22 +245,22 @@ class SynthTrackerAsync:
             if io_type == "input":
                 trace_inputs = trace_inputs_var.get()
                 trace_inputs.append(
-                    {
-                        "origin": origin,
-                        "variable_name": variable_name,
-                        "variable_value": variable_value,
-                        "annotation": annotation,
-                    }
+                    StateRecord(
+                        origin=origin,
+                        variable_name=variable_name,
+                        variable_value=variable_value,
+                        annotation=annotation,
+                    )
                 )
                 trace_inputs_var.set(trace_inputs)
             else:
                 trace_outputs.append(
-                    {
-                        "origin": origin,
-                        "variable_name": variable_name,
-                        "variable_value": variable_value,
-                        "annotation": annotation,
-                    }
+                    StateRecord(
+                        origin=origin,
+                        variable_name=variable_name,
+                        variable_value=variable_value,
+                        annotation=annotation,
+                    )
                 )
                 trace_outputs_var.set(trace_outputs)
             # logger.debug(f"Tracked state: {variable_name}")
@@ -232,12 +296,12 @@ class SynthTrackerAsync:
         if trace_initialized_var.get():
             trace_outputs = trace_outputs_var.get()
             trace_outputs.append(
-                {
-                    "origin": "agent",
-                    "messages": messages,
-                    "model_name": model_name,
-                    "finetune": finetune,
-                }
+                LMOutputRecord(
+                    origin="agent",
+                    messages=messages,
+                    model_name=model_name,
+                    finetune=finetune,
+                )
             )
             trace_outputs_var.set(trace_outputs)
         else:
@@ -275,6 +339,8 @@ class SynthTracker:
         model_params: Optional[Dict[str, Union[str, int, float]]] = None,
         finetune: bool = False,
     ):
+        if tracing_switch.disabled:
+            return
         print("DEBUG: Tracking LM call")  # Added logging
         """
         Track a language model interaction within the current trace.
@@ -376,6 +442,8 @@ class SynthTracker:
                 )
             ```
         """
+        if tracing_switch.disabled:
+            return
         if cls.is_called_by_async() and trace_initialized_var.get():
             # logger.debug("Using async tracker to track state")
             synth_tracker_async.track_state(
@@ -397,6 +465,7 @@ class SynthTracker:
             "async", "sync", ""
         ] = "",  # Force only async or sync data to be returned
     ) -> Tuple[list, list]:
+        """Return the (inputs, outputs) tracked so far, as plain dicts."""
         traced_inputs, traced_outputs = [], []
         print(
             f"\nDEBUG: Getting traced data with async_sync='{async_sync}'"
@@ -410,8 +479,8 @@ class SynthTracker:
             print(
                 f"DEBUG: Found {len(traced_inputs_async)} async inputs and {len(traced_outputs_async)} async outputs"
             )  # Added logging
-            traced_inputs.extend(traced_inputs_async)
-            traced_outputs.extend(traced_outputs_async)
+            traced_inputs.extend(record._asdict() for record in traced_inputs_async)
+            traced_outputs.extend(record._asdict() for record in traced_outputs_async)
 
         if async_sync in ["sync", ""]:
             print("DEBUG: Retrieving sync traced data")  # Added logging
@@ -421,8 +490,8 @@ class SynthTracker:
             print(
                 f"DEBUG: Found {len(traced_inputs_sync)} sync inputs and {len(traced_outputs_sync)} sync outputs"
             )  # Added logging
-            traced_inputs.extend(traced_inputs_sync)
-            traced_outputs.extend(traced_outputs_sync)
+            traced_inputs.extend(record._asdict() for record in traced_inputs_sync)
+            traced_outputs.extend(record._asdict() for record in traced_outputs_sync)
 
         print(
             f"DEBUG: Final combined data: {len(traced_inputs)} inputs and {len(traced_outputs)} outputs\n"
@@ -440,6 +509,8 @@ class SynthTracker:
         Tracks 'messages' as if they were output from the LLM.
         Automatically detects whether to use sync or async tracking.
         """
+        if tracing_switch.disabled:
+            return
         if cls.is_called_by_async() and trace_initialized_var.get():
             print("DEBUG: Tracking LM output in async context")
             synth_tracker_async.track_lm_output(
@@ -475,6 +546,9 @@ def track_messages_sync(
         model_params: Optional parameters used for the model
         finetune: Whether this conversation should be used for fine-tuning
     """
+    if tracing_switch.disabled:
+        return
+
     # Track input messages
     synth_tracker_sync.track_lm(
         messages=input_messages,
@@ -507,6 +581,9 @@ async def track_messages_async(
         model_params: Optional parameters used for the model
         finetune: Whether this conversation should be used for fine-tuning
     """
+    if tracing_switch.disabled:
+        return
+
     # Track input messages
     synth_tracker_async.track_lm(
         messages=input_messages,
@@ -1,10 +1,12 @@
 import asyncio
+import itertools
 import json
 import logging
 import os
 import ssl
+import tempfile
 import time
-from typing import Any, Dict, List
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
 
 import requests
 from dotenv import load_dotenv
@@ -14,6 +16,16 @@ from urllib3.poolmanager import PoolManager
 
 from synth_sdk.tracing.abstractions import Dataset, SystemTrace
 from synth_sdk.tracing.events.store import event_store
+from synth_sdk.tracing.interning import dedupe_trace_messages
+from synth_sdk.tracing.kill_switch import tracing_switch
+from synth_sdk.tracing.message_deltas import delta_encode_trace_messages
+from synth_sdk.tracing.serialization import serializer
+from synth_sdk.tracing.tail_sampling import TailSampler
+from synth_sdk.tracing.wire import (
+    CONTENT_TYPES,
+    encode_wire_payload,
+    write_wire_payload,
+)
 
 load_dotenv()
 
@@ -29,21 +41,59 @@ def validate_json(data: dict) -> None:
     #    ValueError: If the dictionary contains non-serializable values
 
     try:
-        json.dumps(data)
-    except (TypeError, OverflowError) as e:
-        raise ValueError(f"Contains non-JSON-serializable values: {e}. {data}")
+        serializer.dumps(data)
+    except ValueError as e:
+        raise ValueError(f"{e}. {data}")
 
 
-def createPayload(dataset: Dataset, traces: List[SystemTrace]) -> Dict[str, Any]:
+def createPayload(
+    dataset: Dataset,
+    traces: List[SystemTrace],
+    dedupe_messages: bool = False,
+    delta_messages: bool = False,
+) -> Dict[str, Any]:
     payload = {
         "traces": [
             trace.to_dict() for trace in traces
         ],  # Convert SystemTrace objects to dicts
         "dataset": dataset.to_dict(),
     }
+    if delta_messages:
+        # Send each input conversation as a suffix of the previous one
+        payload["traces"] = delta_encode_trace_messages(payload["traces"])
+    if dedupe_messages:
+        # Send each distinct message once, referenced by content hash
+        payload["message_table"], payload["traces"] = dedupe_trace_messages(
+            payload["traces"]
+        )
     return payload
 
 
+def encode_payload(
+    dataset: Dataset,
+    traces: List[SystemTrace],
+    dedupe_messages: bool = False,
+    delta_messages: bool = False,
+    wire_format: str = "json",
+) -> bytes:
+    """Encode the upload payload as JSON bytes, or in the binary wire format.
+
+    Without message rewriting the traces are encoded straight from the
+    objects in a single pass; otherwise the createPayload dicts are encoded.
+    wire_format "msgpack" uses the schema-versioned format of
+    synth_sdk.tracing.wire, decoded by decode_msgpack.
+
+    Raises:
+        ValueError: If the payload contains non-JSON-serializable values
+    """
+    if dedupe_messages or delta_messages:
+        payload = createPayload(dataset, traces, dedupe_messages, delta_messages)
+    else:
+        payload = {"traces": traces, "dataset": dataset}
+    body, _ = encode_wire_payload(payload, wire_format)
+    return body
+
+
 class TLSAdapter(HTTPAdapter):
     def init_poolmanager(self, connections, maxsize, block=False):
         """Create and initialize the urllib3 PoolManager."""
@@ -58,9 +108,23 @@ class TLSAdapter(HTTPAdapter):
         )
 
 
-def load_signed_url(signed_url: str, dataset: Dataset, traces: List[SystemTrace]):
-    payload = createPayload(dataset, traces)
-    validate_json(payload)
+def load_signed_url(
+    signed_url: str,
+    dataset: Dataset,
+    traces: List[SystemTrace],
+    dedupe_messages: bool = False,
+    delta_messages: bool = False,
+    wire_format: str = "json",
+    body: Optional[IO[bytes]] = None,
+):
+    if body is None:
+        # Encoding also validates that the payload is serializable
+        body = encode_payload(
+            dataset, traces, dedupe_messages, delta_messages, wire_format
+        )
+    else:
+        # A payload already streamed to a file; requests sends it in chunks
+        body.seek(0)
 
     session = requests.Session()
     adapter = TLSAdapter()
@@ -68,12 +132,13 @@ def load_signed_url(signed_url: str, dataset: Dataset, traces: List[SystemTrace]
 
     try:
         response = session.put(
-            signed_url, json=payload, headers={"Content-Type": "application/json"}
+            signed_url, data=body, headers={"Content-Type": CONTENT_TYPES[wire_format]}
         )
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error making request: {str(e)}")
-        print(f"Request payload: {payload}")  # Add this for debugging
+        if isinstance(body, bytes):
+            print(f"Request payload: {body!r}")  # Add this for debugging
         raise
 
     if response.status_code != 200:
@@ -95,11 +160,23 @@ def send_system_traces_s3(
     system_id: str,
     system_name: str,
     verbose: bool = False,
+    dedupe_messages: bool = False,
+    delta_messages: bool = False,
+    wire_format: str = "json",
+    body: Optional[IO[bytes]] = None,
 ):
     upload_id, signed_url = get_upload_id(
         base_url, api_key, system_id, system_name, verbose
     )
-    load_signed_url(signed_url, dataset, traces)
+    load_signed_url(
+        signed_url,
+        dataset,
+        traces,
+        dedupe_messages,
+        delta_messages,
+        wire_format,
+        body,
+    )
 
     token_url = f"{base_url}/v1/auth/token"
     try:
@@ -172,6 +249,73 @@ def get_upload_id(
         raise
 
 
+def _validate_trace_dict(trace: Dict[str, Any]) -> None:
+    # Validate required fields in each trace
+    if "system_instance_id" not in trace:
+        raise ValueError("Each trace must have a system_instance_id")
+    if "partition" not in trace:
+        raise ValueError("Each trace must have a partition")
+
+    # Validate metadata if present
+    if "metadata" in trace and trace["metadata"] is not None:
+        if not isinstance(trace["metadata"], dict):
+            raise ValueError("Metadata must be a dictionary")
+
+    # Validate partition structure
+    partition = trace["partition"]
+    if not isinstance(partition, list):
+        raise ValueError("Partition must be a list")
+
+    for part in partition:
+        if "partition_index" not in part:
+            raise ValueError("Each partition element must have a partition_index")
+        if "events" not in part:
+            raise ValueError("Each partition element must have an events list")
+
+        # Validate events
+        events = part["events"]
+        if not isinstance(events, list):
+            raise ValueError("Events must be a list")
+
+        for event in events:
+            required_fields = [
+                "event_type",
+                "opened",
+                "closed",
+                "partition_index",
+            ]
+            missing_fields = [f for f in required_fields if f not in event]
+            if missing_fields:
+                raise ValueError(f"Event missing required fields: {missing_fields}")
+
+
+def _validate_dataset_dict(dataset: Dict[str, Any]) -> None:
+    required_fields = ["questions", "reward_signals"]
+    missing_fields = [f for f in required_fields if f not in dataset]
+    if missing_fields:
+        raise ValueError(f"Dataset missing required fields: {missing_fields}")
+
+    # Validate questions
+    questions = dataset["questions"]
+    if not isinstance(questions, list):
+        raise ValueError("Questions must be a list")
+
+    for question in questions:
+        if "intent" not in question or "criteria" not in question:
+            raise ValueError("Each question must have intent and criteria")
+
+    # Validate reward signals
+    reward_signals = dataset["reward_signals"]
+    if not isinstance(reward_signals, list):
+        raise ValueError("Reward signals must be a list")
+
+    for signal in reward_signals:
+        required_signal_fields = ["question_id", "system_instance_id", "reward"]
+        missing_fields = [f for f in required_signal_fields if f not in signal]
+        if missing_fields:
+            raise ValueError(f"Reward signal missing required fields: {missing_fields}")
+
+
 class UploadValidator(BaseModel):
     traces: List[Dict[str, Any]]
     dataset: Dict[str, Any]
@@ -182,79 +326,13 @@ class UploadValidator(BaseModel):
             raise ValueError("Traces list cannot be empty")
 
         for trace in traces:
-            # Validate required fields in each trace
-            if "system_instance_id" not in trace:
-                raise ValueError("Each trace must have a system_instance_id")
-            if "partition" not in trace:
-                raise ValueError("Each trace must have a partition")
-
-            # Validate metadata if present
-            if "metadata" in trace and trace["metadata"] is not None:
-                if not isinstance(trace["metadata"], dict):
-                    raise ValueError("Metadata must be a dictionary")
-
-            # Validate partition structure
-            partition = trace["partition"]
-            if not isinstance(partition, list):
-                raise ValueError("Partition must be a list")
-
-            for part in partition:
-                if "partition_index" not in part:
-                    raise ValueError(
-                        "Each partition element must have a partition_index"
-                    )
-                if "events" not in part:
-                    raise ValueError("Each partition element must have an events list")
-
-                # Validate events
-                events = part["events"]
-                if not isinstance(events, list):
-                    raise ValueError("Events must be a list")
-
-                for event in events:
-                    required_fields = [
-                        "event_type",
-                        "opened",
-                        "closed",
-                        "partition_index",
-                    ]
-                    missing_fields = [f for f in required_fields if f not in event]
-                    if missing_fields:
-                        raise ValueError(
-                            f"Event missing required fields: {missing_fields}"
-                        )
+            _validate_trace_dict(trace)
 
         return traces
 
     @validator("dataset")
     def validate_dataset(cls, dataset):
-        required_fields = ["questions", "reward_signals"]
-        missing_fields = [f for f in required_fields if f not in dataset]
-        if missing_fields:
-            raise ValueError(f"Dataset missing required fields: {missing_fields}")
-
-        # Validate questions
-        questions = dataset["questions"]
-        if not isinstance(questions, list):
-            raise ValueError("Questions must be a list")
-
-        for question in questions:
-            if "intent" not in question or "criteria" not in question:
-                raise ValueError("Each question must have intent and criteria")
-
-        # Validate reward signals
-        reward_signals = dataset["reward_signals"]
-        if not isinstance(reward_signals, list):
-            raise ValueError("Reward signals must be a list")
-
-        for signal in reward_signals:
-            required_signal_fields = ["question_id", "system_instance_id", "reward"]
-            missing_fields = [f for f in required_signal_fields if f not in signal]
-            if missing_fields:
-                raise ValueError(
-                    f"Reward signal missing required fields: {missing_fields}"
-                )
-
+        _validate_dataset_dict(dataset)
         return dataset
 
 
@@ -268,6 +346,34 @@ def validate_upload(traces: List[Dict[str, Any]], dataset: Dict[str, Any]):
         raise ValueError(f"Upload validation failed: {str(e)}")
 
 
+def validate_upload_dataset(dataset: Dict[str, Any]) -> None:
+    """Validate the dataset of an upload once, before its traces are streamed.
+
+    Raises:
+        ValueError: If validation fails
+    """
+    if not isinstance(dataset, dict):
+        raise ValueError("Upload validation failed: Dataset must be a dictionary")
+    try:
+        _validate_dataset_dict(dataset)
+    except ValueError as e:
+        raise ValueError(f"Upload validation failed: {str(e)}")
+
+
+def validate_upload_trace(trace: Dict[str, Any]) -> None:
+    """Validate one trace dict of an upload as it is streamed.
+
+    Raises:
+        ValueError: If validation fails
+    """
+    if not isinstance(trace, dict):
+        raise ValueError("Upload validation failed: Each trace must be a dictionary")
+    try:
+        _validate_trace_dict(trace)
+    except ValueError as e:
+        raise ValueError(f"Upload validation failed: {str(e)}")
+
+
 def is_event_loop_running():
     try:
         asyncio.get_running_loop()  # Check if there's a running event loop
@@ -296,30 +402,56 @@ def format_upload_output(dataset, traces):
     ]
 
     # Format traces array
-    traces_data = [
-        {
-            "system_instance_id": t.system_instance_id,
-            "metadata": t.metadata if t.metadata else None,
-            "partition": [
-                {
-                    "partition_index": p.partition_index,
-                    "events": [e.to_dict() for e in p.events],
-                }
-                for p in t.partition
-            ],
-        }
-        for t in traces
-    ]
+    traces_data = [format_trace_output(t.to_dict()) for t in traces]
 
     return questions_data, reward_signals_data, traces_data
 
 
+def format_trace_output(trace_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Format one trace of the traces array from its to_dict() form."""
+    return {
+        "system_instance_id": trace_dict["system_instance_id"],
+        "metadata": trace_dict["metadata"],
+        "partition": trace_dict["partition"],
+    }
+
+
+def _close_open_events(
+    traces: Iterable[SystemTrace], store_closed: bool, verbose: bool
+) -> Iterator[SystemTrace]:
+    """Yield the traces with any still-open events closed."""
+    for trace in traces:
+        current_time = time.time()
+        for partition in trace.partition:
+            for event in partition.events:
+                if event.closed is None:
+                    event.closed = current_time
+                    if not store_closed:
+                        # Already part of the detached trace being uploaded
+                        continue
+                    event_store.add_event(
+                        trace.system_name,
+                        trace.system_id,
+                        trace.system_instance_id,
+                        event,
+                    )
+                    if verbose:
+                        print(f"Closed existing unclosed event: {event.event_type}")
+        yield trace
+
+
 # Supports calls from both async and sync contexts
 def upload(
     dataset: Dataset,
     traces: List[SystemTrace] = [],
     verbose: bool = False,
     show_payload: bool = False,
+    drain: bool = False,
+    dedupe_messages: bool = False,
+    delta_messages: bool = False,
+    wire_format: str = "json",
+    tail_sampler: Optional[TailSampler] = None,
+    return_traces: bool = False,
 ):
     """Upload all system traces and dataset to the server.
     Returns a tuple of (response, questions_json, reward_signals_json, traces_json)
@@ -328,9 +460,48 @@ def upload(
     response is the response from the server.
     questions_json is the formatted questions array
     reward_signals_json is the formatted reward signals array
-    traces_json is the formatted traces array"""
-
-    return upload_helper(dataset, traces, verbose, show_payload)
+    traces_json is the formatted traces array, only filled in if return_traces
+    is True; otherwise it is empty
+
+    Logged traces are read from the event store, validated and written to a
+    temporary payload file one at a time, so spilled partitions are never
+    all loaded at once. return_traces keeps every formatted trace in memory
+    for the return value, so it is off by default.
+
+    If drain is True, logged traces are detached from the event store before
+    uploading, so the next drained upload only sends events added since. They
+    are restored to the store if the upload fails.
+
+    If dedupe_messages is True, the uploaded payload carries each distinct
+    message once in a "message_table" keyed by content hash, and traces refer
+    to messages as {"message_ref": hash}.
+
+    If delta_messages is True, each input conversation that extends the
+    previous one in its trace is sent as {"messages": appended_messages,
+    "prefix_length": n}.
+
+    If wire_format is "msgpack", the payload is sent in the compact binary
+    format of synth_sdk.tracing.wire instead of JSON.
+
+    If a tail_sampler is given, the dataset's reward signals are passed to it
+    and only the traces it kept are uploaded instead of the event store's.
+    They are handed back to it if the upload fails.
+
+    While tracing is disabled nothing is uploaded and the event store is left
+    untouched; the response is None and the arrays are empty."""
+
+    return upload_helper(
+        dataset,
+        traces,
+        verbose,
+        show_payload,
+        drain,
+        dedupe_messages,
+        delta_messages,
+        wire_format,
+        tail_sampler,
+        return_traces,
+    )
 
 
 def upload_helper(
@@ -338,7 +509,17 @@ def upload_helper(
     traces: List[SystemTrace] = [],
     verbose: bool = False,
     show_payload: bool = False,
+    drain: bool = False,
+    dedupe_messages: bool = False,
+    delta_messages: bool = False,
+    wire_format: str = "json",
+    tail_sampler: Optional[TailSampler] = None,
+    return_traces: bool = False,
 ):
+    if tracing_switch.disabled:
+        logging.info("Tracing is disabled; skipping upload")
+        return None, [], [], []
+
     api_key = os.getenv("SYNTH_API_KEY")
     if not api_key:
         raise ValueError("SYNTH_API_KEY environment variable not set")
@@ -409,59 +590,91 @@ def upload_helper(
         active_events_var.set({})
 
     # Also close any unclosed events in existing traces
-    logged_traces = event_store.get_system_traces()
-    traces = logged_traces + traces
-    # traces = event_store.get_system_traces() if len(traces) == 0 else traces
-    current_time = time.time()
-    for trace in traces:
-        for partition in trace.partition:
-            for event in partition.events:
-                if event.closed is None:
-                    event.closed = current_time
-                    event_store.add_event(
-                        trace.system_name,
-                        trace.system_id,
-                        trace.system_instance_id,
-                        event,
-                    )
-                    if verbose:
-                        print(f"Closed existing unclosed event: {event.event_type}")
+    if tail_sampler is not None:
+        event_store.end_all_active_events()
+        tail_sampler.add_reward_signals(dataset.reward_signals)
+        logged_traces = tail_sampler.pop_kept()
+        stored_traces = logged_traces
+    elif drain:
+        event_store.end_all_active_events()
+        logged_traces = event_store.drain()
+        stored_traces = logged_traces
+    else:
+        logged_traces = []
+        # Read back one trace, and its spilled partitions, at a time
+        stored_traces = event_store.iter_system_traces()
+    all_traces = _close_open_events(
+        itertools.chain(stored_traces, traces),
+        store_closed=not drain and tail_sampler is None,
+        verbose=verbose,
+    )
 
+    dataset_dict = dataset.to_dict()
+    validate_upload_dataset(dataset_dict)
+    traces_json: List[Dict[str, Any]] = []
+    first_trace: Optional[SystemTrace] = None
+    message_table: Dict[str, Any] = {}
+
+    def payload_traces() -> Iterator[Dict[str, Any]]:
+        # Validates and formats each trace as it is streamed into the body
+        nonlocal first_trace
+        for trace in all_traces:
+            if first_trace is None:
+                first_trace = trace
+            trace_dict = trace.to_dict()
+            validate_upload_trace(trace_dict)
+            if return_traces:
+                traces_json.append(format_trace_output(trace_dict))
+            if delta_messages:
+                # Send each input conversation as a suffix of the previous one
+                (trace_dict,) = delta_encode_trace_messages([trace_dict])
+            if dedupe_messages:
+                # Send each distinct message once, referenced by content hash
+                table, (trace_dict,) = dedupe_trace_messages([trace_dict])
+                for key, message in table.items():
+                    message_table.setdefault(key, message)
+            yield trace_dict
+
+    rest: Dict[str, Any] = {"dataset": dataset_dict}
+    if dedupe_messages:
+        rest["message_table"] = message_table
+
+    uploaded = False
     try:
-        # Get traces and convert to dict format
-        if len(traces) == 0:
-            raise ValueError("No system traces found")
-        traces_dict = [trace.to_dict() for trace in traces]
-        dataset_dict = dataset.to_dict()
-
-        # Validate upload format
-        if verbose:
-            print("Validating upload format...")
-        validate_upload(traces_dict, dataset_dict)
-        if verbose:
-            print("Upload format validation successful")
-
-        # Send to server
-        upload_id, signed_url = send_system_traces_s3(
-            dataset=dataset,
-            traces=traces,
-            base_url=base_url,
-            api_key=api_key,
-            system_id=traces[0].system_id,
-            system_name=traces[0].system_name,
-            verbose=verbose,
-        )
-
-        questions_json, reward_signals_json, traces_json = format_upload_output(
-            dataset, traces
-        )
+        with tempfile.TemporaryFile() as body:
+            # Validate upload format while the payload is written
+            if verbose:
+                print("Validating upload format...")
+            count = write_wire_payload(body, payload_traces(), rest, wire_format)
+            if count == 0:
+                raise ValueError("No system traces found")
+            if verbose:
+                print("Upload format validation successful")
+
+            # Send to server
+            upload_id, signed_url = send_system_traces_s3(
+                dataset=dataset,
+                traces=[],
+                base_url=base_url,
+                api_key=api_key,
+                system_id=first_trace.system_id,
+                system_name=first_trace.system_name,
+                verbose=verbose,
+                dedupe_messages=dedupe_messages,
+                delta_messages=delta_messages,
+                wire_format=wire_format,
+                body=body,
+            )
+        uploaded = True
+
+        questions_json, reward_signals_json, _ = format_upload_output(dataset, [])
         return upload_id, questions_json, reward_signals_json, traces_json
 
     except ValueError as e:
         if verbose:
             print("Validation error:", str(e))
             print("\nTraces:")
-            print(json.dumps(traces_dict, indent=2))
+            print(json.dumps(traces_json, indent=2, default=str))
             print("\nDataset:")
             print(json.dumps(dataset_dict, indent=2))
         raise
@@ -469,7 +682,13 @@ def upload_helper(
         if verbose:
             print("HTTP error occurred:", e)
             print("\nTraces:")
-            print(json.dumps(traces_dict, indent=2))
+            print(json.dumps(traces_json, indent=2, default=str))
             print("\nDataset:")
             print(json.dumps(dataset_dict, indent=2))
         raise
+    finally:
+        if tail_sampler is not None and not uploaded:
+            tail_sampler.requeue(logged_traces)
+        elif drain and not uploaded:
+            # Put the detached traces back so a later upload can retry them
+            event_store.restore(logged_traces)
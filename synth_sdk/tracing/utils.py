@@ -1,6 +1,9 @@
 import uuid
+from functools import lru_cache
 
 
+# Traced methods look this up on every call; the id only depends on the name
+@lru_cache(maxsize=1024)
 def get_system_id(system_name: str) -> str:
     """Create a deterministic system_instance_id from system_name using UUID5."""
     if not system_name:
@@ -0,0 +1,237 @@
+import shutil
+import struct
+import tempfile
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple
+
+from synth_sdk.tracing.serialization import serializer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Binary payloads start with WIRE_MAGIC and a 2-byte big-endian schema
+# version, followed by one msgpack map. Traces, partitions, events and compute
+# steps are msgpack arrays whose positions are fixed by the schema version,
+# so their keys are not repeated for every event.
+WIRE_MAGIC = b"SYNT"
+WIRE_SCHEMA_VERSION = 1
+_HEADER = struct.Struct(">4sH")
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/x-synth-trace+msgpack",
+}
+
+# Schema version 1 field order of each positional record
+_TRACE_FIELDS = (
+    "system_name",
+    "system_id",
+    "system_instance_id",
+    "partition",
+    "current_partition_index",
+    "metadata",
+)
+_PARTITION_FIELDS = ("partition_index", "events")
+_EVENT_FIELDS = (
+    "event_type",
+    "opened",
+    "closed",
+    "partition_index",
+    "agent_compute_step",
+    "environment_compute_steps",
+)
+# Environment steps have no model_name and are one element shorter
+_STEP_FIELDS = (
+    "event_order",
+    "compute_ended",
+    "compute_began",
+    "compute_input",
+    "compute_output",
+    "model_name",
+)
+
+
+def _require_msgpack() -> None:
+    if msgpack is None:
+        raise ModuleNotFoundError(
+            "Please install msgpack to use this feature: 'pip install msgpack'"
+        )
+
+
+def _pack_step(step: Optional[Dict[str, Any]]) -> Optional[List[Any]]:
+    if step is None:
+        return None
+    return [step[name] for name in _STEP_FIELDS if name in step]
+
+
+def _pack_event(event: Dict[str, Any]) -> List[Any]:
+    return [
+        event["event_type"],
+        event["opened"],
+        event["closed"],
+        event["partition_index"],
+        _pack_step(event["agent_compute_step"]),
+        [_pack_step(step) for step in event["environment_compute_steps"]],
+    ]
+
+
+def _pack_trace(trace: Dict[str, Any]) -> List[Any]:
+    return [
+        trace["system_name"],
+        trace["system_id"],
+        trace["system_instance_id"],
+        [
+            [p["partition_index"], [_pack_event(e) for e in p["events"]]]
+            for p in trace["partition"]
+        ],
+        trace["current_partition_index"],
+        trace["metadata"],
+    ]
+
+
+def _unpack_step(packed: Optional[List[Any]]) -> Optional[Dict[str, Any]]:
+    if packed is None:
+        return None
+    return dict(zip(_STEP_FIELDS, packed))
+
+
+def _unpack_event(packed: List[Any]) -> Dict[str, Any]:
+    event = dict(zip(_EVENT_FIELDS, packed))
+    event["agent_compute_step"] = _unpack_step(event["agent_compute_step"])
+    event["environment_compute_steps"] = [
+        _unpack_step(step) for step in event["environment_compute_steps"]
+    ]
+    return event
+
+
+def _unpack_trace(packed: List[Any]) -> Dict[str, Any]:
+    trace = dict(zip(_TRACE_FIELDS, packed))
+    trace["partition"] = [dict(zip(_PARTITION_FIELDS, p)) for p in trace["partition"]]
+    for partition in trace["partition"]:
+        partition["events"] = [_unpack_event(e) for e in partition["events"]]
+    return trace
+
+
+def encode_msgpack(payload: Dict[str, Any]) -> bytes:
+    """Encode an upload or stream payload in the binary wire format.
+
+    payload["traces"] may hold SystemTrace objects, lazily read traces or
+    their to_dict() form, payload["event"] an Event or its to_dict() form,
+    and payload["dataset"] a Dataset or dict; any other values must be
+    msgpack-serializable.
+    """
+    _require_msgpack()
+    packed = dict(payload)
+    if "traces" in packed:
+        packed["traces"] = [
+            _pack_trace(t if isinstance(t, dict) else t.to_dict())
+            for t in packed["traces"]
+        ]
+    if "event" in packed:
+        event = packed["event"]
+        packed["event"] = _pack_event(
+            event if isinstance(event, dict) else event.to_dict()
+        )
+    if hasattr(packed.get("dataset"), "to_dict"):
+        packed["dataset"] = packed["dataset"].to_dict()
+    try:
+        body = msgpack.packb(packed, use_bin_type=True)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"Contains non-msgpack-serializable values: {e}") from e
+    return _HEADER.pack(WIRE_MAGIC, WIRE_SCHEMA_VERSION) + body
+
+
+def decode_msgpack(data: bytes) -> Dict[str, Any]:
+    """Decode a binary payload back into its to_dict() form.
+
+    Raises:
+        ValueError: If data is not a binary payload of a known schema version
+    """
+    _require_msgpack()
+    if len(data) < _HEADER.size:
+        raise ValueError("Payload is too short for a binary trace header")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != WIRE_MAGIC:
+        raise ValueError("Payload is not in the binary trace format")
+    if version != WIRE_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported binary trace schema version: {version}")
+    payload = msgpack.unpackb(
+        memoryview(data)[_HEADER.size :], raw=False, strict_map_key=False
+    )
+    if "traces" in payload:
+        payload["traces"] = [_unpack_trace(t) for t in payload["traces"]]
+    if "event" in payload:
+        payload["event"] = _unpack_event(payload["event"])
+    return payload
+
+
+def encode_wire_payload(payload: Dict[str, Any], wire_format: str) -> Tuple[bytes, str]:
+    """Encode a payload in the given wire format; returns (body, content type)."""
+    if wire_format == "msgpack":
+        return encode_msgpack(payload), CONTENT_TYPES["msgpack"]
+    if wire_format == "json":
+        return serializer.dumps(payload), CONTENT_TYPES["json"]
+    raise ValueError(f"Unknown wire format: {wire_format}")
+
+
+def write_wire_payload(
+    fp: IO[bytes],
+    traces: Iterable[Dict[str, Any]],
+    rest: Dict[str, Any],
+    wire_format: str,
+) -> int:
+    """Stream the payload {"traces": [...], **rest} to fp, one trace at a time.
+
+    traces yields to_dict() forms and is consumed once; rest is only read
+    after it is exhausted, so it may be filled in meanwhile. The bytes match
+    encode_wire_payload over the same payload.
+
+    Returns:
+        The number of traces written
+    """
+    if wire_format == "json":
+        count = 0
+        fp.write(b'{"traces":[')
+        for trace in traces:
+            if count:
+                fp.write(b",")
+            fp.write(serializer.dumps(trace))
+            count += 1
+        fp.write(b"]")
+        for key, value in rest.items():
+            fp.write(b"," + serializer.dumps(key) + b":" + serializer.dumps(value))
+        fp.write(b"}")
+        return count
+    if wire_format != "msgpack":
+        raise ValueError(f"Unknown wire format: {wire_format}")
+
+    _require_msgpack()
+    packer = msgpack.Packer(use_bin_type=True)
+    # The array header needs the trace count, so traces are packed aside first
+    with tempfile.TemporaryFile() as packed_traces:
+        count = 0
+        for trace in traces:
+            try:
+                packed_traces.write(packer.pack(_pack_trace(trace)))
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(
+                    f"Contains non-msgpack-serializable values: {e}"
+                ) from e
+            count += 1
+        rest = dict(rest)
+        if hasattr(rest.get("dataset"), "to_dict"):
+            rest["dataset"] = rest["dataset"].to_dict()
+        fp.write(_HEADER.pack(WIRE_MAGIC, WIRE_SCHEMA_VERSION))
+        fp.write(packer.pack_map_header(len(rest) + 1))
+        fp.write(packer.pack("traces"))
+        fp.write(packer.pack_array_header(count))
+        packed_traces.seek(0)
+        shutil.copyfileobj(packed_traces, fp)
+        try:
+            for key, value in rest.items():
+                fp.write(packer.pack(key))
+                fp.write(packer.pack(value))
+        except (TypeError, ValueError, OverflowError) as e:
+            raise ValueError(f"Contains non-msgpack-serializable values: {e}") from e
+    return count
@@ -0,0 +1,103 @@
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    EnvironmentComputeStep,
+    Event,
+    MessageInputs,
+)
+
+
+def _step() -> AgentComputeStep:
+    return AgentComputeStep(
+        event_order=1,
+        compute_began=1.0,
+        compute_ended=2.0,
+        compute_input=[MessageInputs(messages=[{"role": "user", "content": "a"}])],
+        compute_output=[ArbitraryOutputs(outputs={"reward": 0.0})],
+        model_name="model-a",
+    )
+
+
+def _event() -> Event:
+    return Event(
+        system_instance_id="instance",
+        event_type="step",
+        opened=1.0,
+        closed=2.0,
+        partition_index=1,
+        agent_compute_step=_step(),
+        environment_compute_steps=[],
+    )
+
+
+def test_step_to_dict_follows_reassigned_fields():
+    step = _step()
+    step.to_dict()
+    step.event_order = 2
+    step.compute_ended = 3.0
+    step.model_name = "model-b"
+
+    serialized = step.to_dict()
+    assert serialized["event_order"] == 2
+    assert serialized["compute_ended"] == 3.0
+    assert serialized["model_name"] == "model-b"
+
+
+def test_step_to_dict_follows_replaced_items():
+    step = _step()
+    step.to_dict()
+    step.compute_input[0] = ArbitraryInputs(inputs={"query": "b"})
+    step.compute_output[0] = ArbitraryOutputs(outputs={"reward": 1.0})
+
+    serialized = step.to_dict()
+    assert serialized["compute_input"] == [{"inputs": {"query": "b"}}]
+    assert serialized["compute_output"] == [{"outputs": {"reward": 1.0}}]
+
+
+def test_step_to_dict_returns_a_copy():
+    step = _step()
+    serialized = step.to_dict()
+    serialized["event_order"] = 7
+    serialized["compute_input"][0]["messages"] = []
+
+    assert step.to_dict() == _step().to_dict()
+
+
+def test_event_to_dict_follows_nested_step_changes():
+    event = _event()
+    event.to_dict()
+    event.agent_compute_step.event_order = 5
+    assert event.to_dict()["agent_compute_step"]["event_order"] == 5
+
+    event.environment_compute_steps.append(
+        EnvironmentComputeStep(
+            event_order=1,
+            compute_began=1.0,
+            compute_ended=2.0,
+            compute_input=[],
+            compute_output=[],
+        )
+    )
+    assert len(event.to_dict()["environment_compute_steps"]) == 1
+    event.environment_compute_steps[0].compute_output.append(
+        ArbitraryOutputs(outputs={"done": True})
+    )
+    assert event.to_dict()["environment_compute_steps"][0]["compute_output"] == [
+        {"outputs": {"done": True}}
+    ]
+
+    event.partition_index = 2
+    event.agent_compute_step = None
+    serialized = event.to_dict()
+    assert serialized["partition_index"] == 2
+    assert serialized["agent_compute_step"] is None
+
+
+def test_event_to_dict_returns_a_copy():
+    event = _event()
+    serialized = event.to_dict()
+    serialized["event_type"] = "changed"
+    serialized["agent_compute_step"]["compute_output"].clear()
+
+    assert event.to_dict() == _event().to_dict()
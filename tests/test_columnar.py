@@ -0,0 +1,157 @@
+import math
+from array import array
+
+import pytest
+
+from synth_sdk.tracing import columnar
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    Dataset,
+    EnvironmentComputeStep,
+    Event,
+    EventPartitionElement,
+    MessageInputs,
+    MessageOutputs,
+    RewardSignal,
+    SystemTrace,
+    TrainingQuestion,
+)
+from synth_sdk.tracing.columnar import (
+    NUMERIC_COLUMNS,
+    STRING_COLUMNS,
+    columns_to_numpy,
+    traces_to_columns,
+)
+
+
+def _trace(system_instance_id: str, usage: dict) -> SystemTrace:
+    event = Event(
+        system_instance_id=system_instance_id,
+        event_type="step",
+        opened=10.0,
+        closed=14.0,
+        partition_index=1,
+        agent_compute_step=AgentComputeStep(
+            event_order=1,
+            compute_began=10.0,
+            compute_ended=12.5,
+            compute_input=[
+                MessageInputs(
+                    messages=[
+                        {"role": "system", "content": "be brief"},
+                        {"role": "user", "content": "hi"},
+                    ]
+                )
+            ],
+            compute_output=[
+                MessageOutputs(messages=[{"role": "assistant", "content": "hello"}]),
+                ArbitraryOutputs(outputs={"usage": usage}),
+            ],
+            model_name="gpt-4o-mini",
+        ),
+        environment_compute_steps=[
+            EnvironmentComputeStep(
+                event_order=2,
+                compute_began=12.5,
+                compute_ended=14.0,
+                compute_input=[ArbitraryInputs(inputs={"action": "left"})],
+                compute_output=[ArbitraryOutputs(outputs={"reward": 0.0})],
+            )
+        ],
+    )
+    return SystemTrace(
+        system_name="columnar-test",
+        system_id="columnar-test-id",
+        system_instance_id=system_instance_id,
+        metadata={},
+        partition=[EventPartitionElement(partition_index=1, events=[event])],
+        current_partition_index=1,
+    )
+
+
+TRACES = [
+    # OpenAI usage keys
+    _trace("openai", {"prompt_tokens": 12, "completion_tokens": 3}),
+    # Anthropic usage keys
+    _trace("anthropic", {"input_tokens": 20, "output_tokens": 5}),
+]
+
+
+def _assert_rectangular(columns, rows: int) -> None:
+    assert set(columns) == set(NUMERIC_COLUMNS) | set(STRING_COLUMNS)
+    for name, typecode in NUMERIC_COLUMNS.items():
+        assert isinstance(columns[name], array)
+        assert columns[name].typecode == typecode
+        assert len(columns[name]) == rows
+    for name in STRING_COLUMNS:
+        assert isinstance(columns[name], list)
+        assert len(columns[name]) == rows
+
+
+def test_one_row_per_compute_step():
+    columns = traces_to_columns(TRACES)
+
+    _assert_rectangular(columns, 4)
+    assert columns["system_instance_id"] == [
+        "openai",
+        "openai",
+        "anthropic",
+        "anthropic",
+    ]
+    assert columns["origin"] == ["agent", "environment"] * 2
+    assert columns["model_name"] == ["gpt-4o-mini", None] * 2
+    assert list(columns["duration"]) == [2.5, 1.5] * 2
+    assert list(columns["event_opened"]) == [10.0] * 4
+    assert list(columns["input_messages"]) == [2, 0] * 2
+    assert list(columns["output_messages"]) == [1, 0] * 2
+    assert all(math.isnan(reward) for reward in columns["reward"])
+    assert columns["question_id"] == [None] * 4
+
+
+def test_token_counts_come_from_usage():
+    columns = traces_to_columns(TRACES)
+
+    # Steps without a tracked usage dict report -1
+    assert list(columns["input_tokens"]) == [12, -1, 20, -1]
+    assert list(columns["output_tokens"]) == [3, -1, 5, -1]
+
+
+def test_rows_are_joined_with_reward_signals():
+    dataset = Dataset(
+        questions=[
+            TrainingQuestion(id="q1", intent="i", criteria="c"),
+            TrainingQuestion(id="q2", intent="i", criteria="c"),
+        ],
+        reward_signals=[
+            RewardSignal(question_id="q1", system_instance_id="openai", reward=1),
+            RewardSignal(question_id="q2", system_instance_id="openai", reward=0.5),
+        ],
+    )
+    columns = traces_to_columns(TRACES, dataset)
+
+    # Each openai step is repeated per signal; anthropic has none
+    _assert_rectangular(columns, 6)
+    assert columns["question_id"] == ["q1", "q2", "q1", "q2", None, None]
+    assert list(columns["reward"])[:4] == [1.0, 0.5, 1.0, 0.5]
+    assert all(math.isnan(reward) for reward in list(columns["reward"])[4:])
+
+
+def test_columns_to_numpy_shares_numeric_buffers():
+    np = pytest.importorskip("numpy")
+    columns = traces_to_columns(TRACES)
+    arrays = columns_to_numpy(columns)
+
+    assert arrays["input_tokens"].dtype == np.int64
+    assert arrays["duration"].dtype == np.float64
+    assert arrays["model_name"].dtype == object
+    assert all(len(arrays[name]) == 4 for name in arrays)
+    columns["duration"][0] = 9.0
+    assert arrays["duration"][0] == 9.0
+
+
+def test_columns_to_numpy_requires_numpy(monkeypatch):
+    monkeypatch.setattr(columnar, "np", None)
+    with pytest.raises(ModuleNotFoundError):
+        columns_to_numpy(traces_to_columns(TRACES))
@@ -0,0 +1,86 @@
+import pydantic
+import pytest
+
+from synth_sdk.tracing.config import (
+    DEFAULT_BASE_URL,
+    LoggingMode,
+    TracingConfig,
+    TracingConfigManager,
+)
+
+
+@pytest.fixture
+def env(monkeypatch):
+    monkeypatch.setenv("SYNTH_API_KEY", "key-1")
+    monkeypatch.delenv("SYNTH_LOGGING_MODE", raising=False)
+    monkeypatch.delenv("SYNTH_ENDPOINT_OVERRIDE", raising=False)
+    return monkeypatch
+
+
+def test_config_is_resolved_once_and_reloaded_on_request(env):
+    manager = TracingConfigManager()
+    config = manager.get()
+    assert (config.api_key, config.base_url) == ("key-1", DEFAULT_BASE_URL)
+
+    env.setenv("SYNTH_API_KEY", "key-2")
+    env.setenv("SYNTH_LOGGING_MODE", "instant")
+    assert manager.get() is config
+    reloaded = manager.reload()
+    assert (reloaded.api_key, reloaded.mode) == ("key-2", LoggingMode.INSTANT)
+    assert manager.get() is reloaded
+    # Unchanged, so the same instance is kept
+    assert manager.reload() is reloaded
+
+
+def test_explicit_settings_accumulate_and_take_precedence(env):
+    manager = TracingConfigManager()
+    manager.configure(api_key="explicit")
+    config = manager.configure(max_retries=7)
+    assert (config.api_key, config.max_retries) == ("explicit", 7)
+
+    env.setenv("SYNTH_API_KEY", "key-2")
+    assert manager.reload().api_key == "explicit"
+
+    pinned = TracingConfig(api_key="pinned", base_url="http://pinned")
+    assert manager.configure(pinned) == pinned
+    manager.reset()
+    assert manager.get().api_key == "key-2"
+
+
+def test_listeners_are_notified_of_changes(env):
+    manager = TracingConfigManager()
+    seen = []
+    manager.add_listener(seen.append)
+    assert seen == []
+
+    first = manager.get()
+    assert seen == [first]
+    manager.reload()
+    assert seen == [first]
+
+    manager.configure(max_retries=9)
+    assert [config.max_retries for config in seen[1:]] == [9]
+
+    # Registered after the config is resolved: called with it right away
+    late = []
+    manager.add_listener(late.append)
+    assert late == [seen[-1]]
+
+
+def test_invalid_config_is_rejected_and_not_kept(env):
+    manager = TracingConfigManager()
+    seen = []
+    manager.add_listener(seen.append)
+    config = manager.configure(max_retries=2)
+
+    with pytest.raises(pydantic.ValidationError):
+        manager.configure(max_connections=0)
+    with pytest.raises(pydantic.ValidationError):
+        manager.configure(unknown_field=1)
+
+    assert manager.get() is config
+    assert seen == [config]
+    # Later reloads are unaffected by the rejected settings
+    env.setenv("SYNTH_API_KEY", "key-2")
+    reloaded = manager.reload()
+    assert (reloaded.api_key, reloaded.max_retries) == ("key-2", 2)
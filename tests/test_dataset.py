@@ -0,0 +1,103 @@
+from synth_sdk.tracing.abstractions import (
+    Dataset,
+    RewardSignal,
+    SystemTrace,
+    TrainingQuestion,
+)
+
+
+def _signal(question_id: str, system_instance_id: str, reward: float) -> RewardSignal:
+    return RewardSignal(
+        question_id=question_id, system_instance_id=system_instance_id, reward=reward
+    )
+
+
+def _dataset() -> Dataset:
+    return Dataset(
+        questions=[
+            TrainingQuestion(id="q1", intent="first", criteria="c"),
+            TrainingQuestion(id="q2", intent="i", criteria="c"),
+            TrainingQuestion(id="q1", intent="duplicate", criteria="c"),
+        ],
+        reward_signals=[
+            _signal("q1", "a", 1.0),
+            _signal("q2", "a", 0.5),
+            _signal("q1", "b", 0.0),
+        ],
+    )
+
+
+def _rewards(signals) -> list:
+    return [(s.question_id, s.system_instance_id, s.reward) for s in signals]
+
+
+def test_lookups():
+    dataset = _dataset()
+
+    assert dataset.get_question("q1").intent == "first"
+    assert dataset.get_question("missing") is None
+    assert _rewards(dataset.get_reward_signals("a")) == [
+        ("q1", "a", 1.0),
+        ("q2", "a", 0.5),
+    ]
+    assert _rewards(dataset.get_reward_signals(question_id="q1")) == [
+        ("q1", "a", 1.0),
+        ("q1", "b", 0.0),
+    ]
+    assert _rewards(dataset.get_reward_signals("a", "q2")) == [("q2", "a", 0.5)]
+    assert dataset.get_reward_signals("c") == []
+    assert dataset.get_reward_signals() == dataset.reward_signals
+
+    traces = [
+        SystemTrace(
+            system_name="dataset-test",
+            system_id="dataset-test-id",
+            system_instance_id=system_instance_id,
+            metadata={},
+            partition=[],
+        )
+        for system_instance_id in ("b", "c")
+    ]
+    joined = dataset.join_traces(traces)
+    assert [trace for trace, _ in joined] == traces
+    assert [_rewards(signals) for _, signals in joined] == [[("q1", "b", 0.0)], []]
+
+
+def test_index_follows_added_signals_and_questions():
+    dataset = _dataset()
+    dataset.get_question("q1")
+
+    dataset.add_question(TrainingQuestion(id="q3", intent="i", criteria="c"))
+    dataset.add_reward_signal(_signal("q3", "b", 0.25))
+    dataset.add_reward_signals([_signal("q3", "c", 1.0), _signal("q2", "b", 0.75)])
+    # Appended to the lists directly, bypassing the add_* methods
+    dataset.questions.append(TrainingQuestion(id="q4", intent="i", criteria="c"))
+    dataset.reward_signals.append(_signal("q4", "a", 0.1))
+
+    assert dataset.get_question("q3") is dataset.questions[3]
+    assert dataset.get_question("q4") is dataset.questions[4]
+    assert _rewards(dataset.get_reward_signals("b")) == [
+        ("q1", "b", 0.0),
+        ("q3", "b", 0.25),
+        ("q2", "b", 0.75),
+    ]
+    assert _rewards(dataset.get_reward_signals(question_id="q3")) == [
+        ("q3", "b", 0.25),
+        ("q3", "c", 1.0),
+    ]
+    assert _rewards(dataset.get_reward_signals("a", "q4")) == [("q4", "a", 0.1)]
+
+
+def test_index_is_rebuilt_when_lists_are_replaced_or_shortened():
+    dataset = _dataset()
+    assert len(dataset.get_reward_signals("a")) == 2
+
+    dataset.reward_signals.pop(0)
+    assert _rewards(dataset.get_reward_signals("a")) == [("q2", "a", 0.5)]
+
+    dataset.reward_signals = [_signal("q2", "c", 1.0)]
+    dataset.questions = [TrainingQuestion(id="q9", intent="i", criteria="c")]
+    assert dataset.get_reward_signals("a") == []
+    assert _rewards(dataset.get_reward_signals(question_id="q2")) == [("q2", "c", 1.0)]
+    assert dataset.get_question("q1") is None
+    assert dataset.get_question("q9") is dataset.questions[0]
@@ -0,0 +1,130 @@
+import random
+
+from synth_sdk.tracing.abstractions import Event
+from synth_sdk.tracing.events.index import INDEX_BYTES_PER_EVENT, EventIndex
+from synth_sdk.tracing.events.store import EventStore
+
+
+def _events(count: int):
+    rng = random.Random(0)
+    events = []
+    for number in range(count):
+        opened = rng.uniform(0, 3600)
+        events.append(
+            Event(
+                system_instance_id=f"instance-{number % 7}",
+                event_type="step",
+                opened=opened,
+                closed=opened + rng.uniform(0, 120),
+                partition_index=number,
+                agent_compute_step=None,
+                environment_compute_steps=[],
+            )
+        )
+    return events
+
+
+def test_one_sided_time_bounds_match_a_scan():
+    events = _events(500)
+    index = EventIndex()
+    for event in events:
+        index.add(event)
+    for event in events[::3]:
+        index.remove(event)
+    indexed = [event for event in events if id(event) in index._event_keys]
+
+    for bound in (-1.0, 0.0, 900.5, 1800.0, 3700.0):
+        assert sorted(map(id, index.query(opened_after=bound))) == sorted(
+            id(e) for e in indexed if e.opened >= bound
+        )
+        assert sorted(map(id, index.query(opened_before=bound))) == sorted(
+            id(e) for e in indexed if e.opened <= bound
+        )
+        assert sorted(map(id, index.query(closed_after=bound))) == sorted(
+            id(e) for e in indexed if e.closed >= bound
+        )
+        assert sorted(map(id, index.query(closed_before=bound))) == sorted(
+            id(e) for e in indexed if e.closed <= bound
+        )
+
+
+def test_one_sided_bound_only_visits_matching_buckets():
+    index = EventIndex()
+    for event in _events(500):
+        index.add(event)
+    visited = list(index._bucket_range("opened_bucket", 3000.0, None))
+    assert 0 < len(visited) < len(index)
+    assert all(event.opened >= 2940.0 for event in visited)
+
+
+def _add_steps(store: EventStore, system_instance_id: str, count: int, **event):
+    events = []
+    for number in range(count):
+        partition_index = store.increment_partition(
+            "index-test", "index-test-id", system_instance_id
+        )
+        events.append(
+            Event(
+                system_instance_id=system_instance_id,
+                event_type=event.get("event_type", "step"),
+                opened=float(number),
+                closed=event.get("closed", float(number) + 1),
+                partition_index=partition_index,
+                agent_compute_step=None,
+                environment_compute_steps=[],
+            )
+        )
+        store.add_event("index-test", "index-test-id", system_instance_id, events[-1])
+    return events
+
+
+def test_store_indexing_is_opt_in():
+    store = EventStore()
+    _add_steps(store, "a", 10)
+    _add_steps(store, "b", 5, event_type="reward")
+    assert all(len(shard.index) == 0 for shard in store._shards)
+
+    scanned = store.query_events(event_type="step", opened_after=3.0)
+    assert [e.opened for e in scanned] == [float(n) for n in range(3, 10)]
+
+    # Events already stored are indexed when indexing is turned on
+    store.enable_indexing()
+    assert sum(len(shard.index) for shard in store._shards) == 15
+    assert store.query_events(event_type="step", opened_after=3.0) == scanned
+    _add_steps(store, "b", 1)
+    assert len(store.query_events(system_instance_id="b")) == 6
+
+    store.disable_indexing()
+    assert all(len(shard.index) == 0 for shard in store._shards)
+    assert len(store.query_events(system_instance_id="b")) == 6
+
+
+def test_index_memory_counts_against_the_byte_budget():
+    store = EventStore(max_bytes_in_memory=10**9)
+    _add_steps(store, "a", 10)
+    unindexed = store._bytes_in_memory
+
+    store.enable_indexing()
+    store.enable_indexing()
+    assert store._bytes_in_memory == unindexed + 10 * INDEX_BYTES_PER_EVENT
+    _add_steps(store, "a", 1)
+    with_one_more = store._bytes_in_memory
+
+    store.disable_indexing()
+    assert store._bytes_in_memory == with_one_more - 11 * INDEX_BYTES_PER_EVENT
+    assert sum(store._shard_for("a").partition_bytes["a"].values()) == (
+        store._bytes_in_memory
+    )
+
+
+def test_event_closed_after_it_was_stored_is_rekeyed():
+    store = EventStore()
+    store.enable_indexing()
+    (event,) = _add_steps(store, "a", 1, closed=None)
+    assert store.query_events(closed_after=0.0) == []
+
+    # As upload() does for events still open in the store
+    event.closed = 5.0
+    store.add_event("index-test", "index-test-id", "a", event)
+    assert store.query_events(closed_after=4.0) == [event]
+    assert len(store._shard_for("a").index) == 1
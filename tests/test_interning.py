@@ -0,0 +1,62 @@
+from synth_sdk.tracing import interning
+from synth_sdk.tracing.interning import MessageInterner
+
+
+def _count_hashes(monkeypatch):
+    hashed = []
+    message_key = interning.message_key
+
+    def counting_key(message):
+        hashed.append(message)
+        return message_key(message)
+
+    monkeypatch.setattr(interning, "message_key", counting_key)
+    return hashed
+
+
+def test_growing_conversation_hashes_only_new_messages(monkeypatch):
+    hashed = _count_hashes(monkeypatch)
+    interner = MessageInterner(enabled=True)
+    conversation = [{"role": "system", "content": "be brief"}]
+    steps = []
+    for turn in range(5):
+        conversation.append({"role": "user", "content": f"question {turn}"})
+        steps.append(interner.intern_messages(conversation))
+
+    assert len(hashed) == 6
+    # Every step shares the copies interned by the first one
+    assert all(step[0] is steps[0][0] for step in steps)
+    assert steps[-1] == conversation
+    assert steps[-1][0] is not conversation[0]
+
+
+def test_mutated_message_is_hashed_again(monkeypatch):
+    hashed = _count_hashes(monkeypatch)
+    interner = MessageInterner(enabled=True)
+    message = {"role": "user", "content": "first"}
+    (before,) = interner.intern_messages([message])
+
+    message["content"] = "second"
+    (after,) = interner.intern_messages([message])
+
+    assert len(hashed) == 2
+    assert before == {"role": "user", "content": "first"}
+    assert after == {"role": "user", "content": "second"}
+
+
+def test_equal_messages_share_one_copy():
+    interner = MessageInterner(enabled=True)
+    first = interner.intern({"role": "user", "content": "hi"})
+    second = interner.intern({"content": "hi", "role": "user"})
+
+    assert first is second
+    assert len(interner) == 1
+
+
+def test_interned_messages_are_bounded():
+    interner = MessageInterner(enabled=True, max_messages=3)
+    messages = [{"role": "user", "content": str(n)} for n in range(10)]
+    interner.intern_messages(messages)
+
+    assert len(interner) == 3
+    assert len(interner._seen) == 3
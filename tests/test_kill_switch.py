@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from synth_sdk.tracing import upload as upload_module
+from synth_sdk.tracing.abstractions import (
+    Dataset,
+    EventPartitionElement,
+    RewardSignal,
+    TrainingQuestion,
+)
+from synth_sdk.tracing.decorators import trace_event_async, trace_event_sync
+from synth_sdk.tracing.events.scope import event_scope
+from synth_sdk.tracing.events.store import event_store
+from synth_sdk.tracing.kill_switch import (
+    disable_tracing,
+    enable_tracing,
+    tracing_enabled,
+)
+from synth_sdk.tracing.local import _local
+from synth_sdk.tracing.upload import upload
+
+
+class Agent:
+    system_name = "kill-switch-test"
+    system_id = "kill-switch-test-id"
+    system_instance_id = "kill-switch-instance"
+
+    @trace_event_sync(event_type="act")
+    def act(self, x):
+        return x + 1
+
+    @trace_event_async(event_type="act_async")
+    async def act_async(self, x):
+        return x + 1
+
+
+@pytest.fixture
+def store():
+    event_store.drain()
+    yield event_store
+    enable_tracing()
+    event_store.drain()
+
+
+def _recorded_events(store) -> list:
+    return [
+        event.event_type
+        for trace in store.get_system_traces()
+        for partition in trace.partition
+        for event in partition.events
+    ]
+
+
+def test_switch_stops_and_resumes_recording(store):
+    agent = Agent()
+
+    disable_tracing()
+    assert not tracing_enabled()
+    assert agent.act(1) == 2
+    assert asyncio.run(agent.act_async(1)) == 2
+    assert _recorded_events(store) == []
+
+    enable_tracing()
+    assert agent.act(1) == 2
+    assert asyncio.run(agent.act_async(1)) == 2
+    assert _recorded_events(store) == ["act", "act_async"]
+
+
+def test_functions_decorated_while_disabled_are_left_undecorated(store):
+    def act():
+        return None
+
+    disable_tracing()
+    assert trace_event_sync(event_type="act")(act) is act
+
+
+def test_event_scope_is_not_stored_while_disabled(store, monkeypatch):
+    for name in ("system_name", "system_id", "system_instance_id"):
+        monkeypatch.setattr(_local, name, getattr(Agent, name), raising=False)
+    # event_scope opens its events in partition 0
+    store.get_or_create_system_trace(
+        Agent.system_name, Agent.system_id, Agent.system_instance_id
+    ).add_partition(EventPartitionElement(partition_index=0, events=[]))
+
+    disable_tracing()
+    with event_scope("scoped") as event:
+        assert event.event_type == "scoped"
+    assert _recorded_events(store) == []
+
+    enable_tracing()
+    with event_scope("scoped"):
+        pass
+    assert _recorded_events(store) == ["scoped"]
+
+
+def test_switch_stops_and_resumes_upload(store, monkeypatch):
+    sent = []
+
+    def send_system_traces_s3(**kwargs):
+        sent.append(kwargs["system_name"])
+        return "upload-id", "signed-url"
+
+    monkeypatch.setenv("SYNTH_API_KEY", "test-key")
+    monkeypatch.setattr(upload_module, "send_system_traces_s3", send_system_traces_s3)
+    dataset = Dataset(
+        questions=[TrainingQuestion(id="q", intent="i", criteria="c")],
+        reward_signals=[
+            RewardSignal(
+                question_id="q",
+                system_instance_id=Agent.system_instance_id,
+                reward=1.0,
+            )
+        ],
+    )
+    Agent().act(1)
+
+    disable_tracing()
+    assert upload(dataset, drain=True) == (None, [], [], [])
+    assert sent == []
+    # Left in the store for an upload once tracing is back on
+    assert _recorded_events(store) == ["act"]
+
+    enable_tracing()
+    response, _, reward_signals, _ = upload(dataset, drain=True)
+    assert response == "upload-id"
+    assert len(reward_signals) == 1
+    assert sent == [Agent.system_name]
+    assert _recorded_events(store) == []
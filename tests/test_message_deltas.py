@@ -0,0 +1,90 @@
+import pickle
+
+import pytest
+
+from synth_sdk.tracing.events.store import EventStore
+from synth_sdk.tracing.message_deltas import (
+    ConversationDeltaEncoder,
+    DeltaMessages,
+    conversation_delta_encoder,
+)
+
+
+def _encode_episode(encoder: ConversationDeltaEncoder, steps: int):
+    history = [{"role": "system", "content": "You are an agent."}]
+    encoded = []
+    for step in range(steps):
+        history.append({"role": "user", "content": f"step {step}"})
+        encoded.append(encoder.encode("episode", history))
+    return history, encoded
+
+
+def test_long_episode_pickles_as_flat_lists():
+    encoder = ConversationDeltaEncoder(enabled=True)
+    history, encoded = _encode_episode(encoder, 1000)
+
+    restored = pickle.loads(pickle.dumps(encoded))
+    assert restored[-1] == history
+    assert all(type(messages) is list for messages in restored)
+
+
+def _references(messages) -> int:
+    if isinstance(messages, DeltaMessages):
+        return len(messages.suffix)
+    return len(messages)
+
+
+def test_chains_stay_logarithmic_and_storage_near_linear():
+    encoder = ConversationDeltaEncoder(enabled=True)
+    steps = 1024
+    history, encoded = _encode_episode(encoder, steps)
+
+    assert max(m.depth for m in encoded if isinstance(m, DeltaMessages)) <= 10
+    for step, messages in enumerate(encoded):
+        assert messages == history[: step + 2]
+    # One message appended per step: about n log2(n) / 2 references, where
+    # resending the history stores n^2 / 2
+    assert sum(_references(m) for m in encoded) <= steps * 10 // 2 + 2 * steps
+
+
+def test_item_access_walks_the_chain():
+    encoder = ConversationDeltaEncoder(enabled=True)
+    history, encoded = _encode_episode(encoder, 300)
+    last = encoded[-1]
+
+    assert [last[i] for i in range(len(last))] == history
+    assert last[-1] is history[-1]
+    assert last[10:20] == history[10:20]
+    with pytest.raises(IndexError):
+        last[len(history)]
+
+
+def test_edited_history_is_based_on_the_unchanged_prefix():
+    encoder = ConversationDeltaEncoder(enabled=True)
+    history = [{"role": "user", "content": str(n)} for n in range(4)]
+    encoder.encode("episode", list(history))
+    history.append({"role": "assistant", "content": "4"})
+    encoder.encode("episode", list(history))
+    # Rewrite an earlier message, as agents summarizing their history do
+    history[1] = {"role": "user", "content": "summary"}
+    encoder.encode("episode", list(history))
+    history.append({"role": "user", "content": "5"})
+
+    assert encoder.encode("episode", list(history)) == history
+    assert encoder.encode("episode", [{"role": "user"}]) == [{"role": "user"}]
+
+
+def test_drain_forgets_delta_bases():
+    conversation_delta_encoder.enable()
+    try:
+        store = EventStore()
+        store.get_or_create_system_trace("delta-test", "delta-test-id", "episode")
+        conversation_delta_encoder.encode("episode", [{"role": "user"}])
+        store.drain()
+        assert not isinstance(
+            conversation_delta_encoder.encode("episode", [{"role": "user"}]),
+            DeltaMessages,
+        )
+    finally:
+        conversation_delta_encoder.forget("episode")
+        conversation_delta_encoder.disable()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from synth_sdk.tracing.abstractions import Event
+from synth_sdk.tracing.config import TracingConfig
+from synth_sdk.tracing.retry_queue import RetryQueue
+
+
+class _UploadEndpoint(BaseHTTPRequestHandler):
+    """Stand-in for the token and event upload endpoints."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        assert self.path == "/v1/auth/token"
+        assert self.headers["customer_specific_api_key"] == "test-key"
+        self._reply({"access_token": "test-jwt"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.uploads[body["event"]["event_type"]] = self.headers["Authorization"]
+        self._reply({"event_id": "event-1"})
+
+
+@pytest.fixture
+def queue():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadEndpoint)
+    server.uploads = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    queue = RetryQueue(
+        TracingConfig(
+            api_key="test-key", base_url=f"http://127.0.0.1:{server.server_port}"
+        )
+    )
+    # Retry from the test rather than from the background worker
+    queue.start_worker = lambda: None
+    queue.uploads = server.uploads
+    yield queue
+    server.shutdown()
+    server.server_close()
+
+
+def _queue_failures(queue: RetryQueue) -> None:
+    for event_type, client in (("from-sync", "sync"), ("from-async", "async")):
+        event = Event(
+            system_instance_id="instance",
+            event_type=event_type,
+            opened=1.0,
+            closed=2.0,
+            partition_index=1,
+            agent_compute_step=None,
+            environment_compute_steps=[],
+        )
+        queue.add_failed_event(event, {"system_id": "system"}, client=client)
+    # Make every queued event due now
+    queue._heap = [(0.0, sequence, queued) for _, sequence, queued in queue._heap]
+
+
+def test_process_sync_retries_through_the_failed_client(queue):
+    _queue_failures(queue)
+
+    assert queue.process_sync() == (2, 0)
+    assert queue.uploads == {
+        "from-sync": "Bearer test-key",
+        "from-async": "Bearer test-jwt",
+    }
+
+
+def test_process_async_retries_through_the_failed_client(queue):
+    _queue_failures(queue)
+
+    assert asyncio.run(queue.process_async()) == (2, 0)
+    assert queue.uploads == {
+        "from-sync": "Bearer test-key",
+        "from-async": "Bearer test-jwt",
+    }
+
+
+def test_only_one_processing_pass_runs_at_a_time(queue):
+    _queue_failures(queue)
+    assert queue._start_processing()
+
+    assert queue.process_sync() == (0, 0)
+    assert asyncio.run(queue.process_async()) == (0, 0)
+    assert len(queue) == 2
@@ -0,0 +1,38 @@
+from synth_sdk.tracing.sampling import HeadSampler
+
+
+def _decide(sampler: HeadSampler, count: int):
+    decisions = {
+        f"instance-{n}": sampler.sample(f"instance-{n}", "step") for n in range(count)
+    }
+    kept = [key for key, decision in decisions.items() if decision]
+    dropped = [key for key, decision in decisions.items() if not decision]
+    return kept, dropped
+
+
+def test_everything_kept_skips_sampling():
+    sampler = HeadSampler(sample_rate=1.0)
+    assert not sampler.active
+    assert sampler.sample("instance", "step")
+
+
+def test_dropped_instances_stay_dropped_when_the_rate_goes_to_one():
+    sampler = HeadSampler(sample_rate=0.5)
+    kept, dropped = _decide(sampler, 100)
+    assert kept and dropped
+
+    sampler.configure(sample_rate=1.0)
+    assert sampler.active
+    assert all(sampler.sample(key, "step") for key in kept)
+    assert not any(sampler.sample(key, "step") for key in dropped)
+    assert sampler.sample("new-instance", "step")
+
+
+def test_rate_of_one_without_drops_skips_sampling():
+    sampler = HeadSampler(sample_rate=0.5)
+    kept, dropped = _decide(sampler, 100)
+    for key in dropped:
+        sampler.forget(key)
+
+    sampler.configure(sample_rate=1.0)
+    assert not sampler.active
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryOutputs,
+    Event,
+    MessageInputs,
+)
+from synth_sdk.tracing.serialization import BACKENDS, TraceSerializer
+
+
+def _installed_backends():
+    installed = []
+    for backend in BACKENDS:
+        try:
+            TraceSerializer(backend)
+        except ValueError:
+            continue
+        installed.append(backend)
+    return installed
+
+
+def _event(reward: float) -> Event:
+    return Event(
+        system_instance_id="instance",
+        event_type="step",
+        opened=1.0,
+        closed=2.0,
+        partition_index=1,
+        agent_compute_step=AgentComputeStep(
+            event_order=1,
+            compute_began=1.0,
+            compute_ended=2.0,
+            compute_input=[MessageInputs(messages=[{"role": "user", "content": "hi"}])],
+            compute_output=[ArbitraryOutputs(outputs={"reward": reward})],
+        ),
+        environment_compute_steps=[],
+    )
+
+
+@pytest.mark.parametrize("backend", _installed_backends())
+def test_matches_to_dict(backend):
+    event = _event(0.5)
+    encoded = TraceSerializer(backend).dumps({"events": [event]})
+    assert json.loads(encoded) == json.loads(json.dumps({"events": [event.to_dict()]}))
+
+
+@pytest.mark.parametrize("backend", _installed_backends())
+def test_non_finite_floats_encode_as_null(backend):
+    serializer = TraceSerializer(backend)
+    value = {"nan": float("nan"), "inf": [float("inf"), -float("inf"), 1.5]}
+    assert json.loads(serializer.dumps(value)) == {
+        "nan": None,
+        "inf": [None, None, 1.5],
+    }
+
+    encoded = json.loads(serializer.dumps([_event(float("nan"))]))
+    outputs = encoded[0]["agent_compute_step"]["compute_output"]
+    assert outputs == [{"outputs": {"reward": None}}]
+
+
+@pytest.mark.parametrize("backend", _installed_backends())
+def test_unserializable_values_raise_value_error(backend):
+    with pytest.raises(ValueError):
+        TraceSerializer(backend).dumps({"value": object()})
@@ -0,0 +1,176 @@
+import io
+import json
+import os
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    Event,
+    EventPartitionElement,
+    MessageInputs,
+)
+from synth_sdk.tracing.events.spill import SpillSegments
+from synth_sdk.tracing.events.store import EventStore
+
+
+def _add_steps(store: EventStore, system_instance_id: str, count: int) -> None:
+    for _ in range(count):
+        partition_index = store.increment_partition(
+            "spill-test", "spill-test-id", system_instance_id
+        )
+        store.add_event(
+            "spill-test",
+            "spill-test-id",
+            system_instance_id,
+            Event(
+                system_instance_id=system_instance_id,
+                event_type="step",
+                opened=float(partition_index),
+                closed=float(partition_index) + 1,
+                partition_index=partition_index,
+                agent_compute_step=AgentComputeStep(
+                    event_order=partition_index,
+                    compute_began=float(partition_index),
+                    compute_ended=float(partition_index) + 1,
+                    compute_input=[
+                        MessageInputs(
+                            messages=[
+                                {"role": "user", "content": f"step {partition_index}"}
+                            ]
+                        )
+                    ],
+                    compute_output=[],
+                ),
+                environment_compute_steps=[],
+            ),
+        )
+
+
+def _segment_files(store: EventStore):
+    return sorted(os.listdir(store._segments.spill_dir))
+
+
+def _opened(trace):
+    return [event.opened for p in trace.partition for event in p.events]
+
+
+def test_closed_partitions_spill_past_the_event_budget(tmp_path):
+    store = EventStore(max_events_in_memory=2, spill_dir=str(tmp_path))
+    _add_steps(store, "a", 10)
+
+    assert store._events_in_memory <= 2
+    assert _segment_files(store)
+    (shard_trace,) = store._shard_for("a").traces.values()
+    assert len(shard_trace.partition) <= 2
+    # Only events still in memory are indexed
+    assert len(store.query_events(event_type="step")) == store._events_in_memory
+
+
+def test_closed_partitions_spill_past_the_byte_budget(tmp_path):
+    store = EventStore(max_bytes_in_memory=1, spill_dir=str(tmp_path))
+    _add_steps(store, "a", 5)
+
+    assert _segment_files(store)
+    # The partition still being traced is never spilled
+    assert store._events_in_memory == 1
+    assert store._bytes_in_memory > 0
+
+
+def test_spilled_partitions_are_read_back(tmp_path):
+    expected = EventStore()
+    _add_steps(expected, "a", 10)
+    _add_steps(expected, "b", 3)
+    store = EventStore(max_events_in_memory=2, spill_dir=str(tmp_path))
+    _add_steps(store, "a", 10)
+    _add_steps(store, "b", 3)
+
+    traces = store.get_system_traces()
+    assert [t.to_dict() for t in traces] == [
+        t.to_dict() for t in expected.get_system_traces()
+    ]
+    assert [t.to_dict() for t in store.iter_system_traces()] == [
+        t.to_dict() for t in traces
+    ]
+    assert json.loads(store.get_system_traces_json()) == json.loads(
+        expected.get_system_traces_json()
+    )
+
+
+def test_late_event_for_spilled_partition_is_merged_on_read(tmp_path):
+    store = EventStore(max_events_in_memory=1, spill_dir=str(tmp_path))
+    _add_steps(store, "a", 3)
+    assert 1 in store._shard_for("a").spilled["a"]
+
+    store.add_event(
+        "spill-test",
+        "spill-test-id",
+        "a",
+        Event(
+            system_instance_id="a",
+            event_type="late",
+            opened=1.5,
+            closed=1.6,
+            partition_index=1,
+            agent_compute_step=None,
+            environment_compute_steps=[],
+        ),
+    )
+
+    (trace,) = store.get_system_traces()
+    assert [p.partition_index for p in trace.partition] == [1, 2, 3]
+    assert [e.event_type for e in trace.partition[0].events] == ["step", "late"]
+
+
+def test_drain_deletes_spilled_segments(tmp_path):
+    store = EventStore(max_events_in_memory=2, spill_dir=str(tmp_path))
+    _add_steps(store, "a", 10)
+    assert os.listdir(tmp_path)
+
+    (trace,) = store.drain()
+    assert _opened(trace) == [float(n) for n in range(1, 11)]
+    assert os.listdir(tmp_path) == []
+    assert store._events_in_memory == 0
+
+
+def test_drain_during_export_defers_segment_deletion(tmp_path):
+    store = EventStore(max_events_in_memory=2, spill_dir=str(tmp_path))
+    _add_steps(store, "a", 10)
+    drained = []
+
+    class DrainingWriter(io.StringIO):
+        def write(self, text):
+            if not drained:
+                # The export has snapshotted the spilled records already
+                drained.extend(store.drain())
+                assert os.listdir(tmp_path)
+            return super().write(text)
+
+    out = DrainingWriter()
+    store.write_system_traces_json(out)
+
+    (exported,) = json.loads(out.getvalue())
+    assert len(exported["partition"]) == 10
+    assert _opened(drained[0]) == [float(n) for n in range(1, 11)]
+    assert os.listdir(tmp_path) == []
+
+
+def test_close_removes_segments_and_owned_directory():
+    segments = SpillSegments(segment_max_bytes=1)
+    refs = [
+        segments.write(EventPartitionElement(partition_index=i, events=[]))
+        for i in range(3)
+    ]
+    # Every record went to its own segment
+    assert len(os.listdir(segments.spill_dir)) == 3
+    assert [SpillSegments.read(ref).partition_index for ref in refs] == [0, 1, 2]
+
+    segments.close()
+    assert not os.path.exists(segments.spill_dir)
+
+
+def test_close_keeps_a_given_directory(tmp_path):
+    segments = SpillSegments(str(tmp_path))
+    segments.write(EventPartitionElement(partition_index=1, events=[]))
+
+    segments.close()
+    assert os.listdir(tmp_path) == []
+    assert tmp_path.exists()
@@ -0,0 +1,226 @@
+import io
+import json
+import threading
+import weakref
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryOutputs,
+    Event,
+    MessageInputs,
+)
+from synth_sdk.tracing.events.store import EventStore
+
+
+def _step(store: EventStore, system_instance_id: str, close: bool = True):
+    partition_index = store.increment_partition(
+        "store-test", "store-test-id", system_instance_id
+    )
+    event = Event(
+        system_instance_id=system_instance_id,
+        event_type="step",
+        opened=1.0,
+        closed=2.0,
+        partition_index=partition_index,
+        agent_compute_step=None,
+        environment_compute_steps=[],
+    )
+    if close:
+        store.add_event("store-test", "store-test-id", system_instance_id, event)
+    return event
+
+
+def test_drain_prunes_partition_allocators_of_finished_instances():
+    store = EventStore()
+    store.enable_buffering()
+    for number in range(100):
+        _step(store, f"finished-{number}")
+    late = _step(store, "slow", close=False)
+
+    assert len(store.drain()) == 101
+    store.drain()
+    assert list(store._partition_counters) == ["slow"]
+
+    store.add_event("store-test", "store-test-id", "slow", late)
+    _step(store, "slow")
+    (trace,) = store.drain()
+    assert [p.partition_index for p in trace.partition] == [1, 2]
+    store.drain()
+    assert not store._partition_counters
+
+
+def _expected_export(store: EventStore) -> list:
+    """The JSON form of every trace's to_dict(), built in memory."""
+    return json.loads(json.dumps([t.to_dict() for t in store.get_system_traces()]))
+
+
+def _export_store(**store_kwargs) -> EventStore:
+    store = EventStore(**store_kwargs)
+    for system_instance_id in ("a", "b", "c"):
+        for step in range(4):
+            partition_index = store.increment_partition(
+                "store-test", "store-test-id", system_instance_id
+            )
+            store.add_event(
+                "store-test",
+                "store-test-id",
+                system_instance_id,
+                Event(
+                    system_instance_id=system_instance_id,
+                    event_type="step",
+                    opened=float(step),
+                    closed=float(step) + 0.5,
+                    partition_index=partition_index,
+                    agent_compute_step=AgentComputeStep(
+                        event_order=step,
+                        compute_began=float(step),
+                        compute_ended=float(step) + 0.5,
+                        compute_input=[
+                            MessageInputs(messages=[{"role": "user", "content": "hi"}])
+                        ],
+                        compute_output=[ArbitraryOutputs(outputs={"step": step})],
+                    ),
+                    environment_compute_steps=[],
+                ),
+            )
+    return store
+
+
+def test_streamed_export_matches_the_in_memory_export():
+    store = _export_store()
+
+    text = store.get_system_traces_json()
+    assert json.loads(text) == _expected_export(store)
+
+    binary = io.BytesIO()
+    store.write_system_traces_json(binary)
+    assert binary.getvalue().decode("utf-8") == text
+
+
+def test_streamed_export_reads_back_one_trace_at_a_time(tmp_path, monkeypatch):
+    store = _export_store(max_events_in_memory=1, spill_dir=str(tmp_path))
+    expected = _expected_export(store)
+    merged = []
+    merge_spilled = store._merge_spilled
+
+    def tracking_merge(trace, spilled):
+        # The previous trace is released before the next one is read back
+        assert sum(ref() is not None for ref in merged) <= 1
+        result = merge_spilled(trace, spilled)
+        merged.append(weakref.ref(result))
+        return result
+
+    monkeypatch.setattr(store, "_merge_spilled", tracking_merge)
+    monkeypatch.setattr(store, "get_system_traces", None)
+    chunks = []
+
+    class Writer(io.StringIO):
+        def write(self, text):
+            chunks.append((text, len(merged)))
+            return super().write(text)
+
+    out = Writer()
+    store.write_system_traces_json(out)
+
+    assert json.loads(out.getvalue()) == expected
+    assert len(merged) == 3
+    # Output starts before later traces are read back
+    assert chunks[0][1] < len(merged)
+
+
+def _run_threads(count: int, target) -> None:
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _partition_indexes(traces, system_instance_id: str):
+    (trace,) = [t for t in traces if t.system_instance_id == system_instance_id]
+    return [event.partition_index for p in trace.partition for event in p.events]
+
+
+def test_buffered_partitions_are_unique_across_threads():
+    store = EventStore()
+    store.enable_buffering(batch_size=16)
+
+    def agent(number):
+        for _ in range(200):
+            # Every thread traces the shared instance and one of its own
+            _step(store, "shared")
+            _step(store, f"own-{number % 4}")
+
+    _run_threads(8, agent)
+    traces = store.get_system_traces()
+
+    assert sorted(_partition_indexes(traces, "shared")) == list(range(1, 1601))
+    for number in range(4):
+        assert sorted(_partition_indexes(traces, f"own-{number}")) == list(
+            range(1, 401)
+        )
+    # Partitions merged out of order are still listed by index
+    for trace in traces:
+        indexes = [p.partition_index for p in trace.partition]
+        assert indexes == sorted(indexes)
+
+
+def test_drain_merges_buffers_of_running_threads():
+    store = EventStore()
+    store.enable_buffering(batch_size=1000)
+    added = threading.Barrier(5)
+    drained = threading.Event()
+
+    def agent(number):
+        for _ in range(10):
+            _step(store, f"agent-{number}")
+        added.wait()
+        # Still running, with its events below the batch size
+        drained.wait()
+
+    threads = [threading.Thread(target=agent, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    added.wait()
+    try:
+        traces = store.drain()
+    finally:
+        drained.set()
+        for thread in threads:
+            thread.join()
+
+    assert sorted(t.system_instance_id for t in traces) == [
+        f"agent-{n}" for n in range(4)
+    ]
+    assert all(
+        _partition_indexes(traces, t.system_instance_id) == list(range(1, 11))
+        for t in traces
+    )
+    assert all(not buffer.events for buffer in store._buffers)
+
+
+def test_buffers_of_finished_threads_are_merged_and_released():
+    store = EventStore()
+    store.enable_buffering(batch_size=1000)
+
+    def agent(number):
+        for _ in range(5):
+            _step(store, f"agent-{number}")
+
+    _run_threads(4, agent)
+    assert len(store._buffers) == 4
+
+    traces = store.get_system_traces()
+    assert sum(len(p.events) for t in traces for p in t.partition) == 20
+    assert store._buffers == []
+
+
+def test_disable_buffering_continues_partition_indexes():
+    store = EventStore()
+    store.enable_buffering()
+    _run_threads(3, lambda number: [_step(store, "a") for _ in range(5)])
+
+    store.disable_buffering()
+    _step(store, "a")
+    (trace,) = store.get_system_traces()
+    assert [p.partition_index for p in trace.partition] == list(range(1, 17))
@@ -0,0 +1,254 @@
+import pytest
+
+from synth_sdk.tracing import tail_sampling
+from synth_sdk.tracing.abstractions import Event, RewardSignal
+from synth_sdk.tracing.decorators import trace_event_sync
+from synth_sdk.tracing.events.store import EventStore, event_store
+from synth_sdk.tracing.tail_sampling import TailSampler, reward_or_error_policy
+
+
+def _add_steps(store: EventStore, system_instance_id: str, count: int) -> None:
+    for step in range(count):
+        partition_index = store.increment_partition(
+            "tail-test", "tail-test-id", system_instance_id
+        )
+        store.add_event(
+            "tail-test",
+            "tail-test-id",
+            system_instance_id,
+            Event(
+                system_instance_id=system_instance_id,
+                event_type="step",
+                opened=float(step),
+                closed=float(step) + 1,
+                partition_index=partition_index,
+                agent_compute_step=None,
+                environment_compute_steps=[],
+            ),
+        )
+
+
+def _signal(system_instance_id: str, reward: float) -> RewardSignal:
+    return RewardSignal(
+        question_id="q", system_instance_id=system_instance_id, reward=reward
+    )
+
+
+def _events(traces) -> dict:
+    return {
+        trace.system_instance_id: sum(len(p.events) for p in trace.partition)
+        for trace in traces
+    }
+
+
+@pytest.fixture
+def store():
+    store = EventStore()
+    yield store
+    assert not store.recording_errors
+
+
+def test_keeps_only_extreme_rewards(store):
+    sampler = TailSampler(reward_or_error_policy(low=0.0, high=1.0), store=store)
+    for system_instance_id in ("good", "average", "bad"):
+        _add_steps(store, system_instance_id, 2)
+
+    sampler.add_reward_signals(
+        [_signal("good", 1.0), _signal("average", 0.5), _signal("bad", 0.0)]
+    )
+    assert (sampler.kept_count, sampler.discarded_count) == (2, 1)
+    assert sampler.buffered_events == 0
+
+    # Later events follow the decision made for their instance
+    _add_steps(store, "good", 1)
+    _add_steps(store, "average", 1)
+    sampler.collect()
+    assert _events(sampler.pop_kept()) == {"good": 3, "bad": 2}
+    assert sampler.pop_kept() == []
+    sampler.close()
+
+
+def test_signals_wait_for_their_events_and_are_bounded(store):
+    outcomes = []
+
+    def keep(outcome):
+        outcomes.append(outcome)
+        return True
+
+    sampler = TailSampler(keep, store=store, max_decisions=2)
+    # upload() passes every signal of the dataset on each call
+    for _ in range(3):
+        sampler.add_reward_signals([_signal("early", 1.0)])
+    assert sampler._signals == {"early": [_signal("early", 1.0)]}
+
+    sampler.add_reward_signals([_signal(f"unseen-{n}", 1.0) for n in range(5)])
+    assert len(sampler._signals) == 2
+
+    sampler.add_reward_signals([_signal("early-2", 1.0)])
+    _add_steps(store, "early-2", 1)
+    sampler.collect()
+    (outcome,) = outcomes
+    assert outcome.rewards == [1.0]
+    sampler.close()
+
+
+def test_finalized_is_only_set_by_finalize(store):
+    judged = {}
+
+    def keep(outcome):
+        judged[outcome.trace.system_instance_id] = outcome.finalized
+        return False
+
+    sampler = TailSampler(keep, store=store, max_buffered_events=2)
+    _add_steps(store, "rewarded", 1)
+    _add_steps(store, "ended", 1)
+    sampler.add_reward_signal(_signal("rewarded", 1.0))
+    sampler.finalize("ended")
+    # Three buffered events: the oldest instance is judged early
+    _add_steps(store, "early", 2)
+    _add_steps(store, "late", 1)
+    sampler.collect()
+
+    assert judged == {"rewarded": False, "ended": True, "early": False}
+    sampler.finalize_all()
+    assert judged["late"] is True
+    sampler.close()
+
+
+@pytest.mark.parametrize(
+    "on_pressure, kept",
+    [
+        ("decide_oldest", {"old": 2}),
+        ("drop_oldest", {}),
+        ("keep_oldest", {"old": 2}),
+    ],
+)
+def test_pressure_relieves_the_oldest_instance(store, on_pressure, kept):
+    def keep_if_judged_early(outcome):
+        # Tells "decide_oldest" judging the instance apart from dropping it
+        return not outcome.finalized
+
+    sampler = TailSampler(
+        keep_if_judged_early,
+        store=store,
+        max_buffered_events=3,
+        on_pressure=on_pressure,
+    )
+    _add_steps(store, "old", 2)
+    sampler.collect()
+    _add_steps(store, "new", 2)
+    sampler.collect()
+
+    assert sampler.buffered_events == 2
+    assert list(sampler._pending) == ["new"]
+    assert _events(sampler.pop_kept()) == kept
+    sampler.close()
+
+
+def test_kept_traces_are_bounded(store):
+    sampler = TailSampler(lambda outcome: True, store=store, max_kept_events=3)
+    for system_instance_id in ("first", "second"):
+        _add_steps(store, system_instance_id, 2)
+        sampler.finalize(system_instance_id)
+
+    assert sampler.kept_events == 2
+    assert sampler.dropped_kept_count == 1
+    assert _events(sampler.pop_kept()) == {"second": 2}
+    assert sampler.kept_events == 0
+    sampler.close()
+
+
+def test_held_traces_are_recovered_from_the_log(store, tmp_path):
+    path = str(tmp_path / "held.wal")
+    sampler = TailSampler(reward_or_error_policy(high=1.0), store=store, wal_path=path)
+    for system_instance_id in ("pending", "kept", "uploaded", "discarded"):
+        _add_steps(store, system_instance_id, 2)
+    sampler.add_reward_signals([_signal("uploaded", 1.0)])
+    uploaded = sampler.pop_kept()
+    sampler.add_reward_signals([_signal("kept", 1.0), _signal("discarded", 0.0)])
+
+    # Closing leaves the held traces in the log, as a crash would
+    sampler.close()
+    restarted = TailSampler(
+        reward_or_error_policy(high=1.0), store=EventStore(), wal_path=path
+    )
+    assert {
+        system_instance_id: pending.num_events
+        for system_instance_id, pending in restarted._pending.items()
+    } == {"pending": 2, "kept": 2}
+
+    # A failed upload hands its traces back; they are logged again
+    restarted.requeue(uploaded)
+    restarted.close()
+    reopened = TailSampler(lambda outcome: True, store=EventStore(), wal_path=path)
+    assert sorted(reopened._pending) == ["kept", "pending", "uploaded"]
+    reopened.close()
+
+
+def test_log_is_compacted_to_the_held_traces(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(tail_sampling, "_WAL_MIN_COMPACT_RECORDS", 10)
+    path = str(tmp_path / "held.wal")
+    sampler = TailSampler(lambda outcome: False, store=store, wal_path=path)
+    _add_steps(store, "pending", 3)
+    sampler.collect()
+    for number in range(20):
+        _add_steps(store, f"discarded-{number}", 1)
+        sampler.finalize(f"discarded-{number}")
+
+    # Each discarded instance logs an event and its release
+    assert sampler._logged_records < 20
+    sampler.close()
+    assert len(list(tail_sampling.read_wal(path))) < 20
+    reopened = TailSampler(lambda outcome: True, store=EventStore(), wal_path=path)
+    assert {
+        system_instance_id: pending.num_events
+        for system_instance_id, pending in reopened._pending.items()
+    } == {"pending": 3}
+    reopened.close()
+
+
+class Agent:
+    system_name = "tail-test"
+    system_id = "tail-test-id"
+    system_instance_id = "tail-instance"
+
+    @trace_event_sync(event_type="outer")
+    def outer(self):
+        return self.inner()
+
+    @trace_event_sync(event_type="inner")
+    def inner(self):
+        raise RuntimeError("boom")
+
+
+def _errors() -> list:
+    return [
+        error["event_type"]
+        for trace in event_store.get_system_traces()
+        for error in (trace.metadata or {}).get("errors", [])
+    ]
+
+
+def test_errors_are_recorded_once_while_a_sampler_is_open():
+    event_store.drain()
+    try:
+        with pytest.raises(RuntimeError):
+            Agent().outer()
+        # Without a tail sampler the trace metadata is left alone
+        assert _errors() == []
+        event_store.drain()
+
+        sampler = TailSampler(reward_or_error_policy(high=1.0))
+        with pytest.raises(RuntimeError):
+            Agent().outer()
+        assert _errors() == ["inner"]
+        assert sampler.finalize(Agent.system_instance_id)
+        (kept,) = sampler.pop_kept()
+        assert [error["error_type"] for error in kept.metadata["errors"]] == [
+            "RuntimeError"
+        ]
+
+        sampler.close()
+        assert not event_store.recording_errors
+    finally:
+        event_store.drain()
@@ -0,0 +1,130 @@
+import json
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    EnvironmentComputeStep,
+    Event,
+    MessageInputs,
+    MessageOutputs,
+)
+from synth_sdk.tracing.events.store import EventStore
+from synth_sdk.tracing.trace_reader import read_system_traces
+
+
+def _export(tmp_path, steps: int = 3) -> EventStore:
+    store = EventStore()
+    for system_instance_id in ("a", "b"):
+        store.get_or_create_system_trace(
+            "reader-test", "reader-test-id", system_instance_id
+        ).metadata = {"run": system_instance_id}
+        for step in range(steps):
+            partition_index = store.increment_partition(
+                "reader-test", "reader-test-id", system_instance_id
+            )
+            store.add_event(
+                "reader-test",
+                "reader-test-id",
+                system_instance_id,
+                Event(
+                    system_instance_id=system_instance_id,
+                    event_type="step",
+                    opened=float(step),
+                    closed=float(step) + 1,
+                    partition_index=partition_index,
+                    agent_compute_step=AgentComputeStep(
+                        event_order=1,
+                        compute_began=float(step),
+                        compute_ended=float(step) + 0.5,
+                        compute_input=[
+                            MessageInputs(
+                                messages=[{"role": "user", "content": f"step {step}"}]
+                            )
+                        ],
+                        compute_output=[
+                            MessageOutputs(
+                                messages=[{"role": "assistant", "content": "ok"}]
+                            ),
+                            ArbitraryOutputs(outputs={"usage": {"total": step}}),
+                        ],
+                        model_name="gpt-4o-mini",
+                    ),
+                    environment_compute_steps=[
+                        EnvironmentComputeStep(
+                            event_order=2,
+                            compute_began=float(step) + 0.5,
+                            compute_ended=float(step) + 1,
+                            compute_input=[ArbitraryInputs(inputs={"action": step})],
+                            compute_output=[ArbitraryOutputs(outputs={"reward": 1})],
+                        )
+                    ],
+                ),
+            )
+    with open(tmp_path / "traces.json", "wb") as fp:
+        store.write_system_traces_json(fp)
+    return store
+
+
+def test_exported_file_reads_back_lazily(tmp_path):
+    _export(tmp_path)
+
+    with read_system_traces(str(tmp_path / "traces.json")) as reader:
+        assert [trace.system_instance_id for trace in reader] == ["a", "b"]
+        trace = reader[1]
+        assert trace.system_name == "reader-test"
+        assert trace.metadata == {"run": "b"}
+        assert trace.current_partition_index == 3
+        event = trace.get_partition(2).events[0]
+        assert (event.event_type, event.opened, event.closed) == ("step", 1.0, 2.0)
+        step = event.agent_compute_step
+        assert step.model_name == "gpt-4o-mini"
+        # Inputs and outputs are decoded from the file, not stringified
+        assert step.compute_input == [
+            {"messages": [{"role": "user", "content": "step 1"}]}
+        ]
+        assert event.environment_compute_steps[0].compute_output == [
+            {"outputs": {"reward": 1}}
+        ]
+
+
+def test_materialize_round_trips_the_store(tmp_path):
+    store = _export(tmp_path)
+    expected = [trace.to_dict() for trace in store.get_system_traces()]
+
+    with read_system_traces(str(tmp_path / "traces.json")) as reader:
+        materialized = [trace.materialize() for trace in reader]
+        assert [trace.to_dict() for trace in reader] == expected
+
+    assert [trace.to_dict() for trace in materialized] == expected
+    step = materialized[0].partition[0].events[0].agent_compute_step
+    assert isinstance(step.compute_input[0], MessageInputs)
+    assert isinstance(step.compute_output[1], ArbitraryOutputs)
+
+
+def test_missing_fields_default_to_fresh_values(tmp_path):
+    # Written by an older exporter: no environment steps or compute outputs
+    event = {
+        "event_type": "step",
+        "opened": 0.0,
+        "closed": 1.0,
+        "partition_index": 1,
+        "agent_compute_step": {"event_order": 1, "compute_input": [{"messages": []}]},
+    }
+    trace = {
+        "system_instance_id": "a",
+        "partition": [{"partition_index": 1, "events": [event, event]}],
+    }
+    path = tmp_path / "traces.json"
+    path.write_text(json.dumps([trace]))
+
+    with read_system_traces(str(path)) as reader:
+        first, second = reader[0].partition[0].events
+        first.environment_compute_steps.append("changed")
+        first.agent_compute_step.compute_output.append("changed")
+        assert second.environment_compute_steps == []
+        assert second.agent_compute_step.compute_output == []
+        assert first.environment_compute_steps == ["changed"]
+        materialized = reader[0].materialize().partition[0].events[1]
+        assert materialized.environment_compute_steps == []
+        assert materialized.agent_compute_step.compute_output == []
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from synth_sdk.tracing.trackers import (
+    SynthTracker,
+    synth_tracker_async,
+    synth_tracker_sync,
+)
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+EXPECTED_INPUTS = [
+    {
+        "origin": "agent",
+        "messages": MESSAGES,
+        "model_name": "gpt-4o-mini",
+        "model_params": {"temperature": 0.0},
+        "finetune": False,
+    }
+]
+EXPECTED_OUTPUTS = [
+    {
+        "origin": "environment",
+        "variable_name": "reward",
+        "variable_value": 1.0,
+        "annotation": None,
+    },
+    {
+        "origin": "agent",
+        "messages": MESSAGES,
+        "model_name": "gpt-4o-mini",
+        "finetune": False,
+    },
+]
+
+
+def _track(tracker) -> None:
+    tracker.track_lm(MESSAGES, "gpt-4o-mini", {"temperature": 0.0})
+    tracker.track_state("reward", 1.0, "environment")
+    tracker.track_lm_output(MESSAGES, "gpt-4o-mini")
+
+
+def _assert_baseline_shape(traced) -> None:
+    inputs, outputs = traced
+    assert all(type(record) is dict for record in inputs + outputs)
+    assert (inputs, outputs) == (EXPECTED_INPUTS, EXPECTED_OUTPUTS)
+    assert json.dumps([inputs, outputs]) == json.dumps(
+        [EXPECTED_INPUTS, EXPECTED_OUTPUTS]
+    )
+
+
+def test_sync_traced_data_is_plain_dicts():
+    synth_tracker_sync.initialize()
+    try:
+        _track(synth_tracker_sync)
+        _assert_baseline_shape(SynthTracker.get_traced_data("sync"))
+    finally:
+        synth_tracker_sync.finalize()
+
+
+def test_async_traced_data_is_plain_dicts():
+    async def run():
+        synth_tracker_async.initialize()
+        try:
+            _track(synth_tracker_async)
+            return SynthTracker.get_traced_data("async")
+        finally:
+            synth_tracker_async.finalize()
+
+    _assert_baseline_shape(asyncio.run(run()))
@@ -0,0 +1,77 @@
+from synth_sdk.tracing.abstractions import Event
+from synth_sdk.tracing.events.store import EventStore
+
+
+def _add_events(store: EventStore, system_instance_id: str, count: int) -> None:
+    for _ in range(count):
+        partition_index = store.increment_partition(
+            "wal-test", "wal-test-id", system_instance_id
+        )
+        store.add_event(
+            "wal-test",
+            "wal-test-id",
+            system_instance_id,
+            Event(
+                system_instance_id=system_instance_id,
+                event_type="step",
+                opened=1.0,
+                closed=2.0,
+                partition_index=partition_index,
+                agent_compute_step=None,
+                environment_compute_steps=[],
+            ),
+        )
+
+
+def _event_count(store: EventStore) -> int:
+    return sum(
+        len(partition.events)
+        for trace in store.get_system_traces()
+        for partition in trace.partition
+    )
+
+
+def _restart(path: str) -> EventStore:
+    store = EventStore()
+    store.enable_wal(path)
+    return store
+
+
+def test_recovers_logged_events(tmp_path):
+    path = str(tmp_path / "events.wal")
+    store = _restart(path)
+    _add_events(store, "a", 5)
+    store.disable_wal()
+
+    restarted = _restart(path)
+    assert _event_count(restarted) == 5
+    restarted.disable_wal()
+
+
+def test_drained_events_are_not_recovered(tmp_path):
+    path = str(tmp_path / "events.wal")
+    store = _restart(path)
+    _add_events(store, "a", 5)
+    drained = store.drain()
+    assert sum(len(p.events) for t in drained for p in t.partition) == 5
+    _add_events(store, "a", 2)
+    store.disable_wal()
+
+    restarted = _restart(path)
+    traces = restarted.get_system_traces()
+    # Only the events added after the drain are left to recover
+    assert [p.partition_index for p in traces[0].partition] == [6, 7]
+    restarted.disable_wal()
+
+
+def test_restored_events_are_logged_again(tmp_path):
+    path = str(tmp_path / "events.wal")
+    store = _restart(path)
+    _add_events(store, "a", 3)
+    # e.g. an upload of the drained traces failed
+    store.restore(store.drain())
+    store.disable_wal()
+
+    restarted = _restart(path)
+    assert _event_count(restarted) == 3
+    restarted.disable_wal()
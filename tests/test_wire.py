@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from synth_sdk.tracing.abstractions import (
+    AgentComputeStep,
+    ArbitraryInputs,
+    ArbitraryOutputs,
+    Dataset,
+    Event,
+    EventPartitionElement,
+    MessageInputs,
+    SystemTrace,
+)
+from synth_sdk.tracing.config import TracingConfig
+from synth_sdk.tracing.immediate_client import (
+    AsyncImmediateLogClient,
+    ImmediateLogClient,
+)
+from synth_sdk.tracing.upload import load_signed_url
+from synth_sdk.tracing.wire import CONTENT_TYPES, decode_msgpack
+
+pytest.importorskip("msgpack")
+
+
+class _BinaryEndpoint(BaseHTTPRequestHandler):
+    """Stand-in for the upload endpoints that only accepts msgpack bodies."""
+
+    def log_message(self, *args):
+        pass
+
+    def _receive(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        content_type = self.headers["Content-Type"]
+        if content_type != CONTENT_TYPES["msgpack"]:
+            self._reply(415, {"detail": f"unsupported {content_type}"})
+            return
+        self.server.received.append((self.command, self.path, body))
+        self._reply(200, {"event_id": "event-1"})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Token exchange of the async client
+        self._reply(200, {"access_token": "token"})
+
+    do_POST = _receive
+    do_PUT = _receive
+
+
+@pytest.fixture
+def endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BinaryEndpoint)
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server) -> str:
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def _event(partition_index: int) -> Event:
+    return Event(
+        system_instance_id="instance",
+        event_type="step",
+        opened=1.0,
+        closed=2.0,
+        partition_index=partition_index,
+        agent_compute_step=AgentComputeStep(
+            event_order=partition_index,
+            compute_began=1.0,
+            compute_ended=2.0,
+            compute_input=[MessageInputs(messages=[{"role": "user", "content": "hi"}])],
+            compute_output=[ArbitraryOutputs(outputs={"reward": 1.0})],
+            model_name="gpt-4o-mini",
+        ),
+        environment_compute_steps=[],
+    )
+
+
+def test_immediate_client_posts_msgpack(endpoint):
+    config = TracingConfig(
+        api_key="test-key", base_url=_url(endpoint), wire_format="msgpack"
+    )
+    event = _event(1)
+
+    assert ImmediateLogClient(config).send_event(event, {"system_id": "system"})
+    assert event.id == "event-1"
+
+    ((method, path, body),) = endpoint.received
+    assert (method, path) == ("POST", "/v1/uploads/stream")
+    payload = decode_msgpack(body)
+    assert payload["event"] == event.to_dict()
+    assert payload["system_info"] == {"system_id": "system"}
+
+
+def _unencodable_event() -> Event:
+    event = _event(1)
+    event.agent_compute_step.compute_input.append(
+        ArbitraryInputs(inputs={"handle": object()})
+    )
+    return event
+
+
+@pytest.mark.parametrize("wire_format", ["json", "msgpack"])
+def test_unencodable_event_is_not_sent_or_raised(endpoint, wire_format):
+    config = TracingConfig(
+        api_key="test-key", base_url=_url(endpoint), wire_format=wire_format
+    )
+
+    assert not ImmediateLogClient(config).send_event(_unencodable_event(), {})
+    assert not asyncio.run(
+        AsyncImmediateLogClient(config).send_event(_unencodable_event(), {})
+    )
+    assert endpoint.received == []
+
+
+def test_signed_url_put_sends_msgpack(endpoint):
+    trace = SystemTrace(
+        system_name="system",
+        system_id="system-id",
+        system_instance_id="instance",
+        metadata={"run": 1},
+        partition=[
+            EventPartitionElement(partition_index=i, events=[_event(i)]) for i in (1, 2)
+        ],
+        current_partition_index=2,
+    )
+    dataset = Dataset(questions=[], reward_signals=[])
+
+    load_signed_url(f"{_url(endpoint)}/signed", dataset, [trace], wire_format="msgpack")
+
+    ((method, path, body),) = endpoint.received
+    assert (method, path) == ("PUT", "/signed")
+    payload = decode_msgpack(body)
+    assert payload["traces"] == [trace.to_dict()]
+    assert payload["dataset"] == dataset.to_dict()